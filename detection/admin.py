@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Detection, Infraction, Amende
+from .models import Detection, DetectionJob, Infraction, Amende
 
 # Register your models here.
 
@@ -9,6 +9,12 @@ class DetectionAdmin(admin.ModelAdmin):
     list_filter = ['detection_date', 'user']
     search_fields = ['detected_plate']
 
+@admin.register(DetectionJob)
+class DetectionJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'media_type', 'status', 'progress', 'user', 'created_at']
+    list_filter = ['status', 'media_type', 'created_at']
+    readonly_fields = ['id', 'created_at', 'updated_at']
+
 @admin.register(Infraction)
 class InfractionAdmin(admin.ModelAdmin):
     list_display = ['code_article', 'category', 'description', 'get_amende']
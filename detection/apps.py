@@ -1,6 +1,35 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
+
+
+SERVER_PROGRAMS = ('gunicorn', 'uwsgi', 'daphne', 'uvicorn', 'hypercorn', 'waitress', 'mod_wsgi')
+
+
+def _is_server_process():
+    """
+    Vrai seulement pour un serveur WSGI/ASGI reconnu ou pour runserver (hors
+    processus de surveillance du rechargement automatique). Les commandes de
+    gestion, django-admin, pytest ou `python -m django` ne préchargent rien.
+    """
+    if not sys.argv:
+        return False
+    program = os.path.basename(sys.argv[0]).lower()
+    if any(server in program for server in SERVER_PROGRAMS):
+        return True
+    if 'runserver' not in sys.argv[1:2]:
+        return False
+    return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
 
 
 class DetectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'detection'
+
+    def ready(self):
+        # Préchargement et préchauffage des modèles (voir detection.warmup)
+        if getattr(settings, 'DETECTION_PRELOAD', False) and _is_server_process():
+            from .warmup import start_warm_up
+            start_warm_up()
@@ -0,0 +1,194 @@
+"""
+Écriture asynchrone des artefacts de détection (découpes de plaques, sélections manuelles).
+
+L'encodage et l'écriture sont confiés à un pool de threads: le nom du fichier
+(et donc son URL) est connu immédiatement et la réponse n'attend pas le
+disque. Les artefacts sont servis par la vue `detection:artifact`, qui attend
+la fin d'une écriture encore en cours avant de servir le fichier. Le format
+(jpg, webp, png) et la qualité ne dépendent plus du nom du fichier téléversé
+mais des réglages DETECTION_ARTIFACT_FORMAT, DETECTION_JPEG_QUALITY et
+DETECTION_WEBP_QUALITY.
+"""
+import os
+import time
+import itertools
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait as wait_futures
+
+import cv2
+from django.conf import settings
+from django.urls import reverse
+
+from .metrics import errors_total, inc, span
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    'jpg': 'image/jpeg',
+    'webp': 'image/webp',
+    'png': 'image/png',
+}
+
+
+def artifact_format():
+    fmt = getattr(settings, 'DETECTION_ARTIFACT_FORMAT', 'jpg').lower().replace('jpeg', 'jpg')
+    return fmt if fmt in CONTENT_TYPES else 'jpg'
+
+
+def encode_params(fmt):
+    """Paramètres `cv2.imencode` du format (qualité configurable)."""
+    if fmt == 'jpg':
+        return [cv2.IMWRITE_JPEG_QUALITY, getattr(settings, 'DETECTION_JPEG_QUALITY', 90)]
+    if fmt == 'webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, getattr(settings, 'DETECTION_WEBP_QUALITY', 85)]
+    return []
+
+
+def artifact_url(name):
+    """URL relative (sans « / » initial, comme `fs.url`) servant l'artefact `name`."""
+    return reverse('detection:artifact', args=[name]).lstrip('/')
+
+
+def write_atomic(path, data):
+    """
+    Écrit `data` via un fichier temporaire unique: aucun lecteur ne voit de
+    fichier partiel et deux écritures concurrentes du même nom ne se mélangent pas.
+    """
+    folder, name = os.path.split(path)
+    with tempfile.NamedTemporaryFile(dir=folder, prefix=f".{name}.", suffix='.tmp', delete=False) as f:
+        f.write(data)
+    try:
+        os.replace(f.name, path)
+    except OSError:
+        os.remove(f.name)
+        raise
+
+
+def _pending_marker(name):
+    """Marqueur d'écriture en cours, visible des autres workers du serveur."""
+    return os.path.join(settings.MEDIA_ROOT, f".{name}.pending")
+
+
+class ArtifactWriter:
+    """Pool d'écriture des artefacts, avec statistiques par type d'artefact."""
+
+    def __init__(self, workers=None):
+        self.workers = workers
+        self._executor = None
+        # nom -> (numéro d'écriture, future) de la dernière écriture planifiée
+        self._pending = {}
+        self._tickets = itertools.count()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                workers = self.workers or getattr(settings, 'DETECTION_ARTIFACT_WORKERS', 2)
+                self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='detection-artifact')
+            return self._executor
+
+    def write(self, kind, stem, image, fmt=None):
+        """
+        Planifie l'écriture de `image` sous `<stem>.<format>` dans MEDIA_ROOT.
+
+        Retourne immédiatement le nom du fichier; l'encodage a lieu en
+        arrière-plan. Un marqueur vide est créé avant de retourner, pour que la
+        vue `artifact` d'un autre worker sache que le fichier va apparaître.
+        `kind` regroupe les statistiques (plate, manual...).
+        """
+        fmt = fmt or artifact_format()
+        name = f"{stem}.{fmt}"
+        executor = self._get_executor()
+        with self._lock:
+            open(_pending_marker(name), 'wb').close()
+            ticket = next(self._tickets)
+            self._pending[name] = (ticket, executor.submit(self._write, kind, name, image, fmt, ticket))
+        return name
+
+    def _write(self, kind, name, image, fmt, ticket):
+        try:
+            start = time.perf_counter()
+            with span('artifact_encode'):
+                ok, encoded = cv2.imencode(f'.{fmt}', image, encode_params(fmt))
+            if not ok:
+                raise ValueError(f"encodage {fmt} impossible")
+            encode_time = time.perf_counter() - start
+            with span('artifact_write'):
+                write_atomic(os.path.join(settings.MEDIA_ROOT, name), encoded.tobytes())
+            self.record(kind, encoded.nbytes, encode_time)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'écriture de l'artefact {name}: {e}")
+            self.record(kind, 0, 0.0, error=True)
+            inc(errors_total, source='artifact')
+        finally:
+            # Une écriture plus récente du même nom garde son marqueur et son entrée
+            with self._lock:
+                if self._pending.get(name, (None, None))[0] == ticket:
+                    del self._pending[name]
+                    try:
+                        os.remove(_pending_marker(name))
+                    except OSError:
+                        pass
+
+    def record(self, kind, nbytes, encode_time, error=False):
+        """Comptabilise un artefact écrit (aussi utilisé par le rendu à la demande)."""
+        with self._lock:
+            entry = self._stats.setdefault(kind, {'count': 0, 'bytes': 0, 'encode_seconds': 0.0, 'errors': 0})
+            if error:
+                entry['errors'] += 1
+                return
+            entry['count'] += 1
+            entry['bytes'] += nbytes
+            entry['encode_seconds'] += encode_time
+
+    def wait(self, name, timeout=None, poll_interval=0.05):
+        """
+        Attend la fin de l'écriture de `name` si elle est encore en cours.
+
+        Une écriture de ce processus est attendue directement; celle d'un
+        autre worker est détectée par son marqueur et attendue par scrutation
+        du fichier. Retourne False si l'écriture n'est pas terminée après
+        `timeout` secondes (True si aucune écriture n'est en cours).
+        """
+        with self._lock:
+            _, future = self._pending.get(name, (None, None))
+        if future is not None:
+            done, _ = wait_futures([future], timeout=timeout)
+            return bool(done)
+
+        path = os.path.join(settings.MEDIA_ROOT, name)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while os.path.exists(_pending_marker(name)) and not os.path.exists(path):
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(poll_interval)
+        return True
+
+    def exists(self, name):
+        """Vrai si l'artefact est écrit ou en cours d'écriture (dans ce worker ou un autre)."""
+        with self._lock:
+            if name in self._pending:
+                return True
+        return os.path.exists(os.path.join(settings.MEDIA_ROOT, name)) or os.path.exists(_pending_marker(name))
+
+    def stats(self):
+        with self._lock:
+            per_kind = {}
+            for kind, entry in self._stats.items():
+                per_kind[kind] = dict(
+                    entry,
+                    mean_bytes=entry['bytes'] / entry['count'] if entry['count'] else 0,
+                    mean_encode_seconds=entry['encode_seconds'] / entry['count'] if entry['count'] else 0.0,
+                )
+            return {
+                'format': artifact_format(),
+                'pending': len(self._pending),
+                'kinds': per_kind,
+            }
+
+
+# Pool d'écriture unique du processus
+artifact_writer = ArtifactWriter()
@@ -0,0 +1,125 @@
+"""
+Moteurs d'inférence CPU pour les modèles YOLO du CarDetector.
+
+Le moteur est choisi par le paramètre DETECTION_INFERENCE_BACKEND:
+
+- 'pytorch'  : poids .pt chargés tels quels (comportement historique)
+- 'onnx'     : export ONNX exécuté par ONNX Runtime
+- 'openvino' : export OpenVINO (dossier <modèle>_openvino_model)
+
+Chaque modèle est exporté une seule fois; l'artefact est mis en cache à côté
+des poids et régénéré si le fichier .pt est plus récent que l'export.
+"""
+import os
+import time
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+PYTORCH = 'pytorch'
+ONNX = 'onnx'
+OPENVINO = 'openvino'
+
+# Format d'export ultralytics et module Python requis à l'exécution
+BACKENDS = {
+    PYTORCH: {'format': None, 'runtime': 'torch'},
+    ONNX: {'format': 'onnx', 'runtime': 'onnxruntime'},
+    OPENVINO: {'format': 'openvino', 'runtime': 'openvino'},
+}
+
+
+def default_backend():
+    """Moteur configuré dans les settings ('pytorch' par défaut)."""
+    backend = getattr(settings, 'DETECTION_INFERENCE_BACKEND', PYTORCH)
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(
+            f"DETECTION_INFERENCE_BACKEND inconnu: {backend} (choix: {', '.join(BACKENDS)})"
+        )
+    return backend
+
+
+def check_backend_available(backend):
+    """Lève ImproperlyConfigured si le module d'exécution du moteur est absent."""
+    runtime = BACKENDS[backend]['runtime']
+    try:
+        __import__(runtime)
+    except ImportError:
+        raise ImproperlyConfigured(
+            f"Le moteur d'inférence '{backend}' nécessite le paquet '{runtime}'."
+        )
+
+
+def exported_path(weights_path, backend):
+    """Chemin de l'artefact exporté pour les poids `weights_path`."""
+    root, _ = os.path.splitext(os.fspath(weights_path))
+    if backend == ONNX:
+        return f"{root}.onnx"
+    if backend == OPENVINO:
+        return f"{root}_openvino_model"
+    return os.fspath(weights_path)
+
+
+def is_export_current(weights_path, backend):
+    """Vrai si l'artefact exporté existe et n'est pas plus ancien que les poids."""
+    target = exported_path(weights_path, backend)
+    if not os.path.exists(target):
+        return False
+    return os.path.getmtime(target) >= os.path.getmtime(weights_path)
+
+
+def export_model(weights_path, backend, imgsz=640):
+    """
+    Exporte les poids .pt vers le format du moteur et retourne le chemin obtenu.
+
+    L'export est dynamique (taille de lot et d'entrée variables) afin de
+    conserver l'inférence par lots et les tailles d'entrée par étape.
+    """
+    from ultralytics import YOLO
+
+    export_format = BACKENDS[backend]['format']
+    start = time.perf_counter()
+    exported = YOLO(os.fspath(weights_path)).export(format=export_format, imgsz=imgsz, dynamic=True)
+    target = exported_path(weights_path, backend)
+    if os.fspath(exported) != target and os.path.exists(exported):
+        os.replace(exported, target)
+    logger.info(
+        f"Modèle exporté ({backend}): {os.path.basename(target)} "
+        f"en {time.perf_counter() - start:.1f}s"
+    )
+    return target
+
+
+def resolve_model_path(weights_path, backend):
+    """Retourne le fichier à charger pour ce moteur, en exportant si nécessaire."""
+    if backend == PYTORCH:
+        return os.fspath(weights_path)
+    check_backend_available(backend)
+    if not is_export_current(weights_path, backend):
+        return export_model(weights_path, backend)
+    return exported_path(weights_path, backend)
+
+
+def load_model(weights_path, backend, quantized=False):
+    """
+    Charge un modèle YOLO pour le moteur demandé.
+
+    Avec `quantized`, le modèle INT8 validé (voir detection.quantization) est
+    chargé via ONNX Runtime; sans validation, le modèle flottant est utilisé.
+    """
+    from ultralytics import YOLO
+
+    if quantized:
+        from .quantization import resolve_quantized_path
+        path = resolve_quantized_path(weights_path)
+        if path is not None:
+            check_backend_available(ONNX)
+            return YOLO(path, task='detect')
+
+    path = resolve_model_path(weights_path, backend)
+    if backend == PYTORCH:
+        return YOLO(path)
+    # Les modèles exportés ne contiennent pas la tâche: la préciser explicitement
+    return YOLO(path, task='detect')
@@ -0,0 +1,142 @@
+"""
+Outils communs aux commandes de mesure de performance du CarDetector.
+"""
+import os
+import time
+import resource
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def list_images(folder):
+    """Chemins triés des images d'un dossier."""
+    return sorted(
+        os.path.join(folder, name)
+        for name in os.listdir(folder)
+        if name.lower().endswith(IMAGE_EXTENSIONS)
+    )
+
+
+def load_images(folder, limit=None):
+    """Charge les images d'un dossier: liste de (nom, image BGR)."""
+    images = []
+    for path in list_images(folder)[:limit]:
+        image = cv2.imread(path)
+        if image is not None:
+            images.append((os.path.basename(path), image))
+    return images
+
+
+def timed(fn, *args, **kwargs):
+    """Exécute `fn` et retourne (résultat, durée en secondes)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+@contextmanager
+def without_ocr_cache(*detectors):
+    """
+    Désactive le cache OCR des détecteurs le temps d'une mesure.
+
+    Une lecture mémoïsée (passage de référence, préchauffage, modèle partagé)
+    serait comptée à ~0 ms et toujours identique à la référence.
+    """
+    saved = [detector.ocr_cache for detector in detectors]
+    for detector in detectors:
+        detector.ocr_cache = None
+    try:
+        yield
+    finally:
+        for detector, cache in zip(detectors, saved):
+            detector.ocr_cache = cache
+
+
+def stage_timings(detector, image):
+    """
+    Exécute les étapes du détecteur sur une image et chronomètre chacune.
+
+    Le cache OCR n'est pas utilisé. Retourne (textes_des_plaques, {étape: durée_s}).
+    """
+    vehicles, t_vehicles = timed(detector.detect_vehicles, image)
+    crops = detector._vehicle_crops(image, vehicles)
+    plates_per_region, t_plates = timed(detector.detect_plates_batch, [c[3] for c in crops])
+
+    plate_imgs = []
+    for (_, v_x1, v_y1, _), plates in zip(crops, plates_per_region):
+        for plate in plates:
+            px1, py1, px2, py2 = plate['bbox']
+            plate_img, _ = detector.crop_plate(image, [v_x1 + px1, v_y1 + py1, v_x1 + px2, v_y1 + py2])
+            if plate_img is not None:
+                plate_imgs.append(plate_img)
+    with without_ocr_cache(detector):
+        outputs, t_ocr = timed(detector.extract_text_batch, plate_imgs)
+
+    texts = sorted(text for text, _ in outputs)
+    return texts, {'vehicle': t_vehicles, 'plate': t_plates, 'ocr': t_ocr}
+
+
+DETAILED_STAGES = ('vehicle', 'plate', 'preprocess', 'ocr', 'postprocess')
+
+
+def detailed_stage_timings(detector, image):
+    """
+    Chronomètre les étapes de production sur une image, selon `plate_mode`:
+    `vehicle_stage` (modèle véhicule, et passe plaques sur l'image entière
+    hors mode 'vehicle'), `plate_stage`, `prepare_ocr_batch` (prétraitement
+    OpenCV), `infer_ocr_batch` (inférence OCR) et `decode_ocr_batch`
+    (post-traitement des caractères).
+
+    Le cache OCR n'est pas utilisé. Retourne (textes, {étape: durée_s},
+    nombre_de_véhicules, nombre_de_plaques).
+    """
+    with without_ocr_cache(detector):
+        staged, t_vehicles = timed(detector.vehicle_stage, [image])
+        located, t_plates = timed(detector.plate_stage, [image], staged)
+        vehicles = located[0]
+        plates = [plate for vehicle in vehicles for plate in vehicle['plates']]
+        prepared, t_preprocess = timed(detector.prepare_ocr_batch, [plate['image'] for plate in plates])
+        inferred, t_ocr = timed(detector.infer_ocr_batch, prepared)
+        outputs, t_postprocess = timed(detector.decode_ocr_batch, inferred)
+
+    texts = sorted(text for text, _ in outputs if text)
+    timings = {
+        'vehicle': t_vehicles, 'plate': t_plates, 'preprocess': t_preprocess,
+        'ocr': t_ocr, 'postprocess': t_postprocess,
+    }
+    return texts, timings, len(vehicles), len(plates)
+
+
+def percentiles(values, points=(50, 95, 99)):
+    """Percentiles {'p50': ..., ...} d'une liste de durées (None si vide)."""
+    if not values:
+        return {f"p{p}": None for p in points}
+    return {f"p{p}": float(np.percentile(values, p)) for p in points}
+
+
+def peak_rss_bytes():
+    """Mémoire résidente maximale du processus depuis son démarrage (Linux: ru_maxrss en Ko)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def generated_images(count, sizes=(640, 1280, 1920), seed=0):
+    """
+    Images synthétiques de véhicules avec plaque (voir detection.synthetic), de
+    plusieurs largeurs (format 4:3), pour mesurer la latence en fonction de la
+    résolution sans jeu d'images réel.
+    """
+    from .synthetic import generate_sample
+
+    rng = np.random.default_rng(seed)
+    images = []
+    for i in range(count):
+        width = sizes[i % len(sizes)]
+        height = width * 3 // 4
+        plate_width = max(40, width // 8)
+        sample = generate_sample(rng, image_size=(width, height), plate_width=(plate_width, plate_width * 2))
+        images.append((f"synthetic_{i:03d}_{width}x{height}_{sample['text']}", sample['image']))
+    return images
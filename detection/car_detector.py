@@ -1,19 +1,96 @@
 import os
 import cv2
 import numpy as np
-from ultralytics import YOLO
 from django.conf import settings
 import re
+import time
+import threading
 import logging
+from .backends import default_backend
+from .tiling import split_tiles, merge_detections
+from .ocr_cache import ocr_cache, plate_fingerprint
+from .metrics import errors_total, frames_total, inc, metrics, plates_pattern_total, plates_read_total, span
 
 logger = logging.getLogger(__name__)
 
+
+def parse_imgsz(value):
+    """
+    Convertit une taille d'entrée YOLO: 640 / "640" (carré) ou "96x320" / (96, 320)
+    (rectangulaire, hauteur x largeur, pour limiter le remplissage des plaques).
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple(int(v) for v in value)
+    if isinstance(value, str) and 'x' in value.lower():
+        height, width = value.lower().split('x')
+        return (int(height), int(width))
+    return int(value)
+
+
+def model_weight_paths():
+    """Chemins des fichiers de poids des trois modèles (véhicule, plaque, OCR)."""
+    return {
+        'vehicle': os.path.join(settings.BASE_DIR, 'yolov8n.pt'),
+        'plate': os.path.join(settings.BASE_DIR, 'best.pt'),
+        'ocr': os.path.join(settings.BASE_DIR, 'ocr_yolov8_best.pt'),
+    }
+
+
+def decode_image(data):
+    """
+    Décode une image encodée (JPEG, PNG...) depuis des octets en mémoire.
+
+    Le tampon est lu sans copie (`np.frombuffer`); retourne None si le contenu
+    n'est pas une image lisible par OpenCV.
+    """
+    if not data:
+        return None
+    buffer = np.frombuffer(data, dtype=np.uint8)
+    return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+
+
+def letterbox_resize(image, imgsz):
+    """
+    Met l'image à l'échelle de l'entrée YOLO `imgsz`, comme le letterbox
+    d'ultralytics (même facteur, même arrondi, interpolation linéaire) mais
+    sans remplissage. Retourne (image, facteur).
+
+    Des découpes de proportions voisines prennent ainsi la même forme: elles
+    peuvent partager un lot sans que YOLO passe au remplissage carré qu'il
+    applique aux lots de formes différentes.
+    """
+    target_h, target_w = imgsz if isinstance(imgsz, tuple) else (imgsz, imgsz)
+    height, width = image.shape[:2]
+    ratio = min(target_h / height, target_w / width)
+    size = (int(round(width * ratio)), int(round(height * ratio)))
+    if size == (width, height):
+        return image, 1.0
+    return cv2.resize(image, size, interpolation=cv2.INTER_LINEAR), ratio
+
+
+def shape_batches(items, image_of, batch_size):
+    """
+    Lots d'au plus `batch_size` éléments dont les images (`image_of(élément)`)
+    ont toutes la même forme: YOLO applique alors à chaque image le même
+    letterbox (remplissage minimal) que si elle était seule.
+    """
+    groups = {}
+    for item in items:
+        groups.setdefault(image_of(item).shape, []).append(item)
+    return [
+        group[start:start + batch_size]
+        for group in groups.values()
+        for start in range(0, len(group), batch_size)
+    ]
+
+
 class CarDetector:
-    def __init__(self):
+    def __init__(self, registry=None, backend=None, quantized=None, replica=0):
         # Chemins des modèles
-        self.vehicle_model_path = os.path.join(settings.BASE_DIR, 'yolov8n.pt')
-        self.plate_model_path = os.path.join(settings.BASE_DIR, 'best.pt')
-        self.ocr_model_path = os.path.join(settings.BASE_DIR, 'ocr_yolov8_best.pt')
+        weight_paths = model_weight_paths()
+        self.vehicle_model_path = weight_paths['vehicle']
+        self.plate_model_path = weight_paths['plate']
+        self.ocr_model_path = weight_paths['ocr']
 
         if not os.path.exists(self.vehicle_model_path):
             logger.error(f"Modèle véhicule non trouvé: {self.vehicle_model_path}")
@@ -25,11 +102,27 @@ class CarDetector:
             logger.error(f"Modèle OCR non trouvé: {self.ocr_model_path}")
             raise FileNotFoundError(f"Modèle OCR non trouvé: {self.ocr_model_path}")
 
+        # Les modèles sont fournis par le registre du processus (chargés une seule fois par réplique)
+        if registry is None:
+            from .model_registry import model_registry as registry
+
+        # Moteur d'inférence (pytorch, onnx, openvino) — voir detection.backends
+        self.backend = backend or default_backend()
+        # Modèles en mode INT8 ('vehicle', 'plate', 'ocr') — voir detection.quantization
+        if quantized is None:
+            quantized = getattr(settings, 'DETECTION_QUANTIZED_MODELS', [])
+        self.quantized_models = set(quantized)
+        # Indice de la réplique dans le pool: chaque réplique a ses propres modèles
+        self.replica = replica
+
         try:
-            self.vehicle_model = YOLO(self.vehicle_model_path)
-            self.plate_model = YOLO(self.plate_model_path)
-            self.ocr_model = YOLO(self.ocr_model_path)
-            logger.info("Modèles YOLO chargés avec succès (véhicule, plaque, OCR)")
+            self.vehicle_model = registry.get_model(
+                self.vehicle_model_path, self.backend, self.is_quantized('vehicle_model'), replica)
+            self.plate_model = registry.get_model(
+                self.plate_model_path, self.backend, self.is_quantized('plate_model'), replica)
+            self.ocr_model = registry.get_model(
+                self.ocr_model_path, self.backend, self.is_quantized('ocr_model'), replica)
+            logger.info(f"Modèles YOLO chargés avec succès (véhicule, plaque, OCR) [{self.backend}]")
         except Exception as e:
             logger.error(f"Erreur lors du chargement des modèles YOLO: {e}")
             raise
@@ -46,43 +139,192 @@ class CarDetector:
         # Format strict congolais: 4 chiffres, 2 lettres, 2 chiffres
         self.congolese_plate_pattern = re.compile(r'^\d{4}[A-Z]{2}\d{2}$')
 
+        # Nombre maximal de découpes de véhicules par inférence du modèle de plaques
+        self.plate_batch_size = getattr(settings, 'DETECTION_PLATE_BATCH_SIZE', 16)
+        # Nombre maximal de plaques par inférence du modèle OCR
+        self.ocr_batch_size = getattr(settings, 'DETECTION_OCR_BATCH_SIZE', 32)
+
+        # Le modèle de plaques peut être appelé par deux étapes du pipeline (voir detection.pipeline)
+        self._plate_model_lock = threading.Lock()
+
+        # Détection des plaques: 'vehicle', 'direct' (sans modèle véhicule) ou 'auto'
+        self.plate_mode = getattr(settings, 'DETECTION_PLATE_MODE', 'vehicle')
+        self.direct_min_plate_ratio = getattr(settings, 'DETECTION_DIRECT_MIN_PLATE_RATIO', 0.15)
+
+        # Mémoïsation des lectures OCR par empreinte perceptuelle (None = désactivée)
+        self.ocr_cache = ocr_cache
+
+        # Découpage en tuiles des grandes images pour le modèle véhicule (0 = désactivé)
+        self.tiling_min_side = getattr(settings, 'DETECTION_TILING_MIN_SIDE', 2500)
+        self.tile_size = getattr(settings, 'DETECTION_TILE_SIZE', 1280)
+        self.tile_overlap = getattr(settings, 'DETECTION_TILE_OVERLAP', 0.2)
+
+        # Taille d'entrée de chaque étape (carrée ou rectangulaire hauteur x largeur)
+        stage_imgsz = getattr(settings, 'DETECTION_STAGE_IMGSZ', {})
+        self.stage_imgsz = {
+            stage: parse_imgsz(stage_imgsz.get(stage, 640))
+            for stage in ('vehicle', 'plate', 'ocr')
+        }
+
+    def is_quantized(self, attr):
+        """Indique si le modèle `attr` ('plate_model', ...) doit tourner en INT8."""
+        return attr[:-len('_model')] in self.quantized_models
+
+    def model_paths(self):
+        """Associe chaque attribut de modèle à son fichier de poids."""
+        return {
+            'vehicle_model': self.vehicle_model_path,
+            'plate_model': self.plate_model_path,
+            'ocr_model': self.ocr_model_path,
+        }
+
     # ==============================================================================
     # MÉTHODES DE DÉTECTION (NÉCESSAIRES POUR ÉVITER L'ERREUR 'detect_vehicles')
     # ==============================================================================
 
-    def detect_vehicles(self, image):
-        """Détecte les véhicules dans l'image."""
-        results = self.vehicle_model(image, conf=0.4, verbose=False)
+    def _parse_vehicle_result(self, result):
+        """Convertit un résultat YOLO du modèle véhicule en liste de véhicules."""
         vehicles = []
-        for result in results:
-            if result.boxes is not None:
-                for box in result.boxes:
-                    class_id = int(box.cls[0])
-                    if class_id in self.vehicle_classes:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0].cpu().numpy())
-                        confidence = float(box.conf[0])
-                        vehicles.append({
-                            'bbox': [x1, y1, x2, y2],
-                            'confidence': confidence,
-                            'class_id': class_id
-                        })
-        return vehicles
-
-    def detect_plates(self, vehicle_region):
-        """Détecte les plaques d'immatriculation dans une région de véhicule."""
-        results = self.plate_model(vehicle_region, conf=0.5, verbose=False)
-        plates = []
-        for result in results:
-            if result.boxes is not None:
-                for box in result.boxes:
+        if result.boxes is not None:
+            for box in result.boxes:
+                class_id = int(box.cls[0])
+                if class_id in self.vehicle_classes:
                     x1, y1, x2, y2 = map(int, box.xyxy[0].cpu().numpy())
                     confidence = float(box.conf[0])
-                    plates.append({
+                    vehicles.append({
                         'bbox': [x1, y1, x2, y2],
-                        'confidence': confidence
+                        'confidence': confidence,
+                        'class_id': class_id
                     })
+        return vehicles
+
+    def detect_vehicles(self, image):
+        """Détecte les véhicules dans l'image."""
+        return self.detect_vehicles_batch([image])[0]
+
+    def detect_vehicles_batch(self, images):
+        """
+        Détecte les véhicules de plusieurs images (une liste par image).
+
+        Les images dont le plus grand côté dépasse `tiling_min_side` sont
+        découpées en tuiles. Les entrées ne partagent un passage du modèle
+        qu'avec des entrées de même forme (l'image entière n'est pas mêlée à
+        ses tuiles et garde le letterbox minimal); les doublons entre sources
+        sont ensuite retirés par une NMS inter-tuiles (voir `merge_detections`).
+        """
+        if not images:
+            return []
+
+        # Entrées du modèle: (indice_image, décalage_x, décalage_y, image_ou_tuile, source)
+        # où la source vaut None pour l'image entière et [x1, y1, x2, y2] pour une tuile
+        inputs = []
+        tiled = set()
+        for index, image in enumerate(images):
+            inputs.append((index, 0, 0, image, None))
+            if self.tiling_min_side and max(image.shape[:2]) > self.tiling_min_side:
+                tiled.add(index)
+                for x, y, tile in split_tiles(image, self.tile_size, self.tile_overlap):
+                    inputs.append((index, x, y, tile, [x, y, x + tile.shape[1], y + tile.shape[0]]))
+
+        vehicles_per_image = [[] for _ in images]
+        for batch in shape_batches(inputs, lambda item: item[3], len(inputs)):
+            with span('vehicle'):
+                results = self.vehicle_model(
+                    [item[3] for item in batch], conf=0.4, imgsz=self.stage_imgsz['vehicle'], verbose=False
+                )
+            for (index, offset_x, offset_y, _, source), result in zip(batch, results):
+                for vehicle in self._parse_vehicle_result(result):
+                    x1, y1, x2, y2 = vehicle['bbox']
+                    vehicle['bbox'] = [x1 + offset_x, y1 + offset_y, x2 + offset_x, y2 + offset_y]
+                    if index in tiled:
+                        vehicle['tile'] = source
+                    vehicles_per_image[index].append(vehicle)
+
+        for index in tiled:
+            height, width = images[index].shape[:2]
+            vehicles_per_image[index] = merge_detections(vehicles_per_image[index], (width, height))
+        return vehicles_per_image
+
+    def _parse_plate_result(self, result, scale=1.0):
+        """
+        Convertit un résultat YOLO du modèle de plaques en liste de boîtes,
+        ramenées à la région d'origine si celle-ci a été mise à l'échelle `scale`.
+        """
+        plates = []
+        if result.boxes is not None:
+            for box in result.boxes:
+                x1, y1, x2, y2 = (int(c / scale) for c in box.xyxy[0].cpu().numpy())
+                confidence = float(box.conf[0])
+                plates.append({
+                    'bbox': [x1, y1, x2, y2],
+                    'confidence': confidence
+                })
         return plates
 
+    def detect_plates(self, vehicle_region):
+        """Détecte les plaques d'immatriculation dans une région de véhicule."""
+        return self.detect_plates_batch([vehicle_region])[0]
+
+    def detect_plates_batch(self, vehicle_regions):
+        """
+        Détecte les plaques dans plusieurs régions en un seul passage du modèle.
+
+        Les régions sont mises à l'échelle de l'entrée du modèle
+        (`letterbox_resize`) puis envoyées par lots d'au plus
+        `plate_batch_size` régions de même forme: les plaques trouvées dans un
+        véhicule ne dépendent pas des autres véhicules de l'image. Retourne une
+        liste de plaques par région, dans l'ordre des régions (coordonnées
+        relatives à chaque région).
+        """
+        imgsz = self.stage_imgsz['plate']
+        scaled = [(index,) + letterbox_resize(region, imgsz) for index, region in enumerate(vehicle_regions)]
+
+        plates_per_region = [[] for _ in vehicle_regions]
+        for batch in shape_batches(scaled, lambda item: item[1], self.plate_batch_size):
+            with self._plate_model_lock, span('plate'):
+                results = self.plate_model([item[1] for item in batch], conf=0.5, imgsz=imgsz, verbose=False)
+            for (index, _, scale), result in zip(batch, results):
+                plates_per_region[index] = self._parse_plate_result(result, scale)
+        return plates_per_region
+
+    def _vehicle_crops(self, image, vehicles, margin=20):
+        """Découpe chaque véhicule avec une marge: liste de (indice, x, y, région)."""
+        img_h, img_w = image.shape[:2]
+        crops = []
+        for i, vehicle in enumerate(vehicles):
+            x1, y1, x2, y2 = vehicle['bbox']
+            v_x1 = max(0, x1 - margin)
+            v_y1 = max(0, y1 - margin)
+            v_x2 = min(img_w, x2 + margin)
+            v_y2 = min(img_h, y2 + margin)
+
+            vehicle_region = image[v_y1:v_y2, v_x1:v_x2]
+            if vehicle_region.size == 0:
+                logger.warning(f"Région du véhicule {i+1} est vide, skip.")
+                continue
+            crops.append((i, v_x1, v_y1, vehicle_region))
+        return crops
+
+    def crop_plate(self, image, abs_bbox, plate_margin=5):
+        """
+        Découpe une plaque (avec une marge) dans l'image complète.
+
+        Retourne (image_plaque, bbox) ou (None, None) si la zone est vide.
+        """
+        px1, py1, px2, py2 = abs_bbox
+        abs_x1 = max(0, px1 - plate_margin)
+        abs_y1 = max(0, py1 - plate_margin)
+        abs_x2 = min(image.shape[1], px2 + plate_margin)
+        abs_y2 = min(image.shape[0], py2 + plate_margin)
+
+        if abs_x2 <= abs_x1 or abs_y2 <= abs_y1:
+            return None, None
+
+        plate_img = image[abs_y1:abs_y2, abs_x1:abs_x2]
+        if plate_img.size == 0:
+            return None, None
+        return plate_img, [abs_x1, abs_y1, abs_x2, abs_y2]
+
     # ==============================================================================
     # MÉTHODES DE PRÉTRAITEMENT ET OCR
     # ==============================================================================
@@ -133,71 +375,175 @@ class CarDetector:
         cleaned_text = re.sub(r'[^A-Za-z0-9]', '', text)
         return cleaned_text.upper() 
 
+    def _decode_ocr_result(self, result):
+        """Assemble les caractères détectés par YOLO OCR en (texte, confiance)."""
+        detections = []
+        if result.boxes is not None:
+            for box in result.boxes:
+                x1, y1, x2, y2 = map(int, box.xyxy[0].cpu().numpy())
+                class_id = int(box.cls[0].cpu().numpy())
+                confidence = float(box.conf[0].cpu().numpy())
+                
+                # Convertir l'ID de classe en caractère
+                char = self.CLASS_TO_CHAR.get(class_id, '?')
+                x_center = (x1 + x2) / 2
+                
+                detections.append({
+                    'char': char,
+                    'confidence': confidence,
+                    'x_center': x_center
+                })
+        
+        # Trier par position X (gauche à droite)
+        detections.sort(key=lambda d: d['x_center'])
+        
+        # Construire le texte
+        if not detections:
+            return "", 0.0
+        
+        text = ''.join([d['char'] for d in detections])
+        avg_confidence = sum([d['confidence'] for d in detections]) / len(detections)
+        
+        # Nettoyer et post-traiter
+        cleaned_text = self.clean_and_normalize_text(text)
+        
+        # Supprimer le préfixe 'CGO' si présent
+        if cleaned_text.startswith('CGO'):
+            cleaned_text = cleaned_text[3:]
+        
+        corrected_text = self.post_process_ocr_output(cleaned_text)
+        
+        if self.congolese_plate_pattern.match(corrected_text):
+            return corrected_text, avg_confidence
+        
+        if corrected_text:
+            return corrected_text, avg_confidence
+        
+        return "", 0.0
+
     def extract_text_with_yolo_ocr(self, plate_img, conf_threshold=0.25):
         """
         Extraction des caractères de la plaque avec le modèle YOLO OCR.
         Applique le prétraitement puis utilise YOLO pour détecter les caractères.
         """
-        if plate_img is None or plate_img.size == 0:
-            return "", 0.0
+        return self.extract_text_batch([plate_img], conf_threshold=conf_threshold)[0]
+
+    def extract_text_batch(self, plate_imgs, conf_threshold=0.25):
+        """
+        Extraction OCR par lot pour plusieurs images de plaques.
 
+        Prétraite toutes les plaques, les envoie au modèle YOLO OCR par lots
+        d'au plus `ocr_batch_size` plaques de même forme et retourne une liste de (texte, confiance) dans
+        l'ordre des images reçues. Une plaque vide ou illisible donne ("", 0.0).
+        Les découpes presque identiques à une plaque déjà lue sont servies par
+        le cache OCR (`ocr_cache`) sans prétraitement ni inférence.
+        """
+        prepared = self.prepare_ocr_batch(plate_imgs, conf_threshold)
+        return self.run_ocr_batch(prepared, conf_threshold)
+
+    def _ocr_token(self, conf_threshold):
+        """
+        Jeton du cache OCR: poids du modèle (chemin, moteur, INT8, date et taille
+        du fichier, comme `detection_version_key`), seuil et taille d'entrée.
+        """
         try:
-            # Prétraiter l'image de la plaque
-            processed_img = self.preprocess_plate_for_ocr(plate_img)
-            if processed_img is None:
-                return "", 0.0
+            stat = os.stat(self.ocr_model_path)
+            weights = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            weights = None
+        return (self.ocr_model_path, self.backend, self.is_quantized('ocr_model'), weights,
+                conf_threshold, str(self.stage_imgsz['ocr']))
+
+    def prepare_ocr_batch(self, plate_imgs, conf_threshold=0.25):
+        """
+        Partie CPU de `extract_text_batch`: cache OCR et prétraitement OpenCV.
 
-            # Détecter les caractères avec le modèle YOLO OCR
-            results = self.ocr_model(processed_img, conf=conf_threshold, verbose=False)
-            
-            detections = []
-            for result in results:
-                if result.boxes is not None:
-                    for box in result.boxes:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0].cpu().numpy())
-                        class_id = int(box.cls[0].cpu().numpy())
-                        confidence = float(box.conf[0].cpu().numpy())
-                        
-                        # Convertir l'ID de classe en caractère
-                        char = self.CLASS_TO_CHAR.get(class_id, '?')
-                        x_center = (x1 + x2) / 2
-                        
-                        detections.append({
-                            'char': char,
-                            'confidence': confidence,
-                            'x_center': x_center
-                        })
-            
-            # Trier par position X (gauche à droite)
-            detections.sort(key=lambda d: d['x_center'])
-            
-            # Construire le texte
-            if not detections:
-                return "", 0.0
-            
-            text = ''.join([d['char'] for d in detections])
-            avg_confidence = sum([d['confidence'] for d in detections]) / len(detections)
-            
-            # Nettoyer et post-traiter
-            cleaned_text = self.clean_and_normalize_text(text)
-            
-            # Supprimer le préfixe 'CGO' si présent
-            if cleaned_text.startswith('CGO'):
-                cleaned_text = cleaned_text[3:]
-            
-            corrected_text = self.post_process_ocr_output(cleaned_text)
-            
-            if self.congolese_plate_pattern.match(corrected_text):
-                return corrected_text, avg_confidence
-            
-            if corrected_text:
-                return corrected_text, avg_confidence
-            
-            return "", 0.0
-            
-        except Exception as e:
-            logger.error(f"Erreur lors de l'extraction OCR YOLO: {e}")
-            return "", 0.0
+        Retourne (sorties, en_attente): les sorties déjà connues (cache, plaques
+        invalides) et les plaques prétraitées à soumettre à `run_ocr_batch`.
+        """
+        outputs = [("", 0.0)] * len(plate_imgs)
+        cache = self.ocr_cache if self.ocr_cache is not None and self.ocr_cache.enabled else None
+        token = self._ocr_token(conf_threshold)
+
+        # Prétraiter les plaques non mémoïsées (les images invalides restent à ("", 0.0))
+        pending = []
+        for index, plate_img in enumerate(plate_imgs):
+            if plate_img is None or plate_img.size == 0:
+                continue
+            fingerprint = None
+            if cache is not None:
+                fingerprint = plate_fingerprint(plate_img)
+                cached = cache.lookup(token, fingerprint)
+                if cached is not None:
+                    outputs[index] = cached
+                    continue
+            with span('preprocess'):
+                processed_img = self.preprocess_plate_for_ocr(plate_img)
+                if processed_img is not None:
+                    processed_img, _ = letterbox_resize(processed_img, self.stage_imgsz['ocr'])
+            if processed_img is not None:
+                pending.append((index, processed_img, fingerprint))
+        return outputs, pending
+
+    def run_ocr_batch(self, prepared, conf_threshold=0.25):
+        """
+        Partie inférence et post-traitement de `extract_text_batch` sur le
+        résultat de `prepare_ocr_batch` (`infer_ocr_batch` puis `decode_ocr_batch`).
+        """
+        return self.decode_ocr_batch(self.infer_ocr_batch(prepared, conf_threshold), conf_threshold)
+
+    def infer_ocr_batch(self, prepared, conf_threshold=0.25):
+        """
+        Inférence OCR sur les plaques prétraitées.
+
+        Un lot ne regroupe que des plaques de même forme: YOLO applique alors à
+        chacune le même letterbox (remplissage minimal) qu'à une plaque seule, et
+        la lecture ne dépend pas des autres plaques du lot. Retourne (sorties,
+        résultats), résultats étant une liste de (indice, empreinte, résultat YOLO).
+        """
+        outputs, pending = prepared
+        cache = self.ocr_cache if self.ocr_cache is not None and self.ocr_cache.enabled else None
+
+        inferred = []
+        for batch in shape_batches(pending, lambda item: item[1], self.ocr_batch_size):
+            try:
+                # Détecter les caractères avec le modèle YOLO OCR
+                started = time.perf_counter()
+                with span('ocr'):
+                    results = self.ocr_model([item[1] for item in batch], conf=conf_threshold,
+                                             imgsz=self.stage_imgsz['ocr'], verbose=False)
+                inferred.extend(
+                    (index, fingerprint, result) for (index, _, fingerprint), result in zip(batch, results)
+                )
+                if cache is not None:
+                    cache.record_ocr_time(time.perf_counter() - started, len(batch))
+            except Exception as e:
+                logger.error(f"Erreur lors de l'extraction OCR YOLO: {e}")
+                inc(errors_total, source='ocr')
+        return outputs, inferred
+
+    def decode_ocr_batch(self, inferred, conf_threshold=0.25):
+        """Post-traitement OCR: texte de chaque résultat, mise en cache et compteurs."""
+        outputs, results = inferred
+        cache = self.ocr_cache if self.ocr_cache is not None and self.ocr_cache.enabled else None
+        token = self._ocr_token(conf_threshold)
+
+        for index, fingerprint, result in results:
+            try:
+                with span('postprocess'):
+                    outputs[index] = self._decode_ocr_result(result)
+            except Exception as e:
+                logger.error(f"Erreur lors du décodage OCR YOLO: {e}")
+                inc(errors_total, source='ocr')
+                continue
+            if cache is not None:
+                cache.store(token, fingerprint, outputs[index])
+
+        if metrics.enabled:
+            inc(plates_read_total, sum(1 for text, _ in outputs if text))
+            inc(plates_pattern_total, sum(1 for text, _ in outputs if self.congolese_plate_pattern.match(text)))
+
+        return outputs
 
     def extract_text(self, plate_img):
         return self.extract_text_with_yolo_ocr(plate_img)
@@ -263,80 +609,164 @@ class CarDetector:
     # MÉTHODE PRINCIPALE DE TRAITEMENT
     # ==============================================================================
 
-    def process_detection(self, image_path):
-        """Fonction principale pour détecter les véhicules et extraire les plaques."""
-        image = cv2.imread(image_path)
-        if image is None:
-            logger.error(f"Impossible de charger l'image: {image_path}")
-            raise ValueError(f"Impossible de charger: {image_path}")
-        
-        result_image = image.copy()
-        detection_results = []
-
-        vehicles = self.detect_vehicles(image)
-
-        for i, vehicle in enumerate(vehicles):
-            x1, y1, x2, y2 = vehicle['bbox']
+    def is_close_up(self, image, plates):
+        """
+        Vrai si l'image est un gros plan d'un véhicule: une plaque détectée sur
+        l'image entière occupe au moins `direct_min_plate_ratio` de sa largeur
+        (le véhicule couvre alors l'essentiel du cadre).
+        """
+        width = image.shape[1]
+        return any(
+            (plate['bbox'][2] - plate['bbox'][0]) / width >= self.direct_min_plate_ratio
+            for plate in plates
+        )
 
-            cv2.rectangle(result_image, (x1, y1), (x2, y2), (0, 255, 0), 2)
-            cv2.putText(result_image, f'Vehicle {i+1}', (x1, y1-10),
-                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-            
-            # Marge augmentée pour la région du véhicule
-            margin = 20 
-            v_x1 = max(0, x1 - margin)
-            v_y1 = max(0, y1 - margin)
-            v_x2 = min(image.shape[1], x2 + margin)
-            v_y2 = min(image.shape[0], y2 + margin)
+    def locate_plates(self, frames):
+        """
+        Exécute les étapes véhicules et plaques sur une liste d'images, sans OCR.
+
+        Selon `plate_mode`:
+        - 'vehicle': modèle véhicule puis modèle de plaques sur chaque découpe
+          (défaut, sortie identique au traitement historique);
+        - 'direct' : modèle de plaques directement sur l'image entière;
+        - 'auto'   : modèle de plaques sur l'image entière, conservé pour les
+          gros plans (voir `is_close_up`), sinon passage par les véhicules
+          (une passe de plus que 'vehicle' sur les scènes qui ne sont pas des
+          gros plans).
+
+        Retourne, pour chaque image, la liste des véhicules avec leurs plaques
+        ('image', 'bbox', 'plate_confidence'); le texte n'est pas encore lu.
+        En mode direct, l'image entière tient lieu de véhicule.
+        """
+        return self.plate_stage(frames, self.vehicle_stage(frames))
 
-            vehicle_region = image[v_y1:v_y2, v_x1:v_x2]
+    def vehicle_stage(self, frames):
+        """
+        Première étape de `locate_plates` (modèle véhicule, et plaques sur
+        l'image entière hors mode 'vehicle').
 
-            if vehicle_region.size == 0:
-                logger.warning(f"Région du véhicule {i+1} est vide, skip.")
+        Retourne, pour chaque image, ('direct', résultat final) ou
+        ('vehicles', véhicules détectés) à compléter par `plate_stage`.
+        """
+        inc(frames_total, len(frames))
+        if self.plate_mode == 'vehicle' or not frames:
+            return [('vehicles', vehicles) for vehicles in self.detect_vehicles_batch(frames)]
+
+        plates_per_frame = self.detect_plates_batch(frames)
+        staged = [None] * len(frames)
+        fallback = []
+        for f, (image, plates) in enumerate(zip(frames, plates_per_frame)):
+            if self.plate_mode == 'direct' or self.is_close_up(image, plates):
+                staged[f] = ('direct', self._direct_result(image, plates))
+            else:
+                fallback.append(f)
+
+        if fallback:
+            vehicles_per_frame = self.detect_vehicles_batch([frames[f] for f in fallback])
+            for f, vehicles in zip(fallback, vehicles_per_frame):
+                staged[f] = ('vehicles', vehicles)
+        return staged
+
+    def plate_stage(self, frames, staged):
+        """Seconde étape de `locate_plates`: plaques dans les découpes de véhicules."""
+        results = [value if kind == 'direct' else None for kind, value in staged]
+        pending = [f for f, (kind, _) in enumerate(staged) if kind == 'vehicles']
+        if pending:
+            located = self._plates_in_vehicles(
+                [frames[f] for f in pending], [staged[f][1] for f in pending]
+            )
+            for f, vehicles in zip(pending, located):
+                results[f] = vehicles
+        return results
+
+    def _direct_result(self, image, plates):
+        """Résultat d'une détection directe: l'image entière comme unique véhicule."""
+        height, width = image.shape[:2]
+        vehicle_plates = []
+        for j, plate in enumerate(plates):
+            plate_img, bbox = self.crop_plate(image, plate['bbox'])
+            if plate_img is None:
+                logger.warning(f"Plaque {j+1} invalide ou vide, skip.")
                 continue
-
-            plates = self.detect_plates(vehicle_region)
-            
+            vehicle_plates.append({
+                'image': plate_img,
+                'bbox': bbox,
+                'plate_confidence': plate['confidence']
+            })
+        return [{
+            'vehicle_bbox': [0, 0, width, height],
+            'vehicle_confidence': None,
+            'plates': vehicle_plates,
+            'mode': 'direct'
+        }]
+
+    def _plates_in_vehicles(self, frames, vehicles_per_frame):
+        """Étape plaques sur les véhicules détectés, en un seul lot pour toutes les images."""
+        # Découpes de véhicules de toutes les images, envoyées en un seul lot
+        vehicle_crops = []
+        for f, (image, vehicles) in enumerate(zip(frames, vehicles_per_frame)):
+            for i, v_x1, v_y1, region in self._vehicle_crops(image, vehicles):
+                vehicle_crops.append((f, i, v_x1, v_y1, region))
+        plates_per_region = self.detect_plates_batch([crop[4] for crop in vehicle_crops])
+
+        results = [[] for _ in frames]
+        for (f, i, v_x1, v_y1, _), plates in zip(vehicle_crops, plates_per_region):
+            vehicle = vehicles_per_frame[f][i]
             vehicle_plates = []
             for j, plate in enumerate(plates):
+                # Coordonnées absolues de la plaque dans l'image
                 px1, py1, px2, py2 = plate['bbox']
-
-                # Marge de 5 pixels ajoutée pour la plaque elle-même
-                plate_margin = 5  
-                abs_x1 = max(0, v_x1 + px1 - plate_margin)
-                abs_y1 = max(0, v_y1 + py1 - plate_margin)
-                abs_x2 = min(image.shape[1], v_x1 + px2 + plate_margin)
-                abs_y2 = min(image.shape[0], v_y1 + py2 + plate_margin)
-
-                if abs_x2 <= abs_x1 or abs_y2 <= abs_y1:
-                    logger.warning(f"Coordonnées de la plaque {j+1} du véhicule {i+1} invalides, skip.")
+                abs_bbox = [v_x1 + px1, v_y1 + py1, v_x1 + px2, v_y1 + py2]
+                plate_img, bbox = self.crop_plate(frames[f], abs_bbox)
+                if plate_img is None:
+                    logger.warning(f"Plaque {j+1} du véhicule {i+1} invalide ou vide, skip.")
                     continue
-
-                plate_img = image[abs_y1:abs_y2, abs_x1:abs_x2]
-
-                if plate_img.size == 0:
-                    logger.warning(f"Image de la plaque {j+1} du véhicule {i+1} est vide, skip.")
-                    continue
-
-                text, confidence = self.extract_text(plate_img)
-                
-                cv2.rectangle(result_image, (abs_x1, abs_y1), (abs_x2, abs_y2), (0, 0, 255), 2)
-                
-                display_text = text if text else "N/A"
-                cv2.putText(result_image, display_text, (abs_x1, abs_y1 - 10),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
-                
                 vehicle_plates.append({
                     'image': plate_img,
-                    'text': text,
-                    'confidence': confidence,
-                    'bbox': [abs_x1, abs_y1, abs_x2, abs_y2]
+                    'bbox': bbox,
+                    'plate_confidence': plate['confidence']
                 })
-            
-            detection_results.append({
+            results[f].append({
                 'vehicle_bbox': vehicle['bbox'],
                 'vehicle_confidence': vehicle['confidence'],
                 'plates': vehicle_plates
             })
-        
-        return result_image, detection_results
\ No newline at end of file
+        return results
+
+    def read_plates(self, plates):
+        """Lit en un seul lot OCR les plaques données et complète 'text'/'confidence'."""
+        outputs = self.extract_text_batch([plate['image'] for plate in plates])
+        for plate, (text, confidence) in zip(plates, outputs):
+            plate['text'] = text
+            plate['confidence'] = confidence
+        return plates
+
+    def analyze_frames(self, frames):
+        """
+        Exécute les trois étapes (véhicules, plaques, OCR) sur une liste d'images.
+
+        Retourne, pour chaque image, la liste des véhicules avec leurs plaques
+        lues (sans annotation de l'image). Toutes les plaques des images sont
+        lues en un seul lot OCR.
+        """
+        results = self.locate_plates(frames)
+        self.read_plates([
+            plate for vehicles in results for vehicle in vehicles for plate in vehicle['plates']
+        ])
+        return results
+
+    def process_detection(self, image):
+        """
+        Fonction principale pour détecter les véhicules et extraire les plaques.
+
+        `image` est une image déjà décodée (tableau BGR) ou un chemin de fichier.
+        """
+        if isinstance(image, str):
+            image_path = image
+            image = cv2.imread(image_path)
+            if image is None:
+                logger.error(f"Impossible de charger l'image: {image_path}")
+                raise ValueError(f"Impossible de charger: {image_path}")
+
+        # Boîtes structurées uniquement: l'image annotée est rendue à la demande (voir rendering)
+        return self.analyze_frames([image])[0]
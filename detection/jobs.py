@@ -0,0 +1,148 @@
+"""
+Exécution des tâches de détection en arrière-plan.
+
+Un pool de threads local au processus exécute les tâches `DetectionJob`
+créées par `detect_home`. Le client interroge ensuite `job_status` jusqu'à
+la fin de la tâche, au lieu de bloquer une requête HTTP pendant l'inférence.
+
+L'original est enregistré avant la mise en file, mais l'analyse d'une image
+ne le relit pas: la tâche reçoit l'image déjà décodée en mémoire par la vue.
+Au plus DETECTION_JOB_QUEUE_SIZE tâches (en attente ou en cours) sont retenues
+par processus, ce qui borne aussi la mémoire occupée par ces images. Une tâche dont l'état n'a pas changé depuis
+DETECTION_JOB_TIMEOUT secondes (processus redémarré, worker bloqué) est
+considérée comme échouée par `expire_stale_job`.
+"""
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .metrics import errors_total, inc
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_in_flight = 0
+
+
+class JobQueueFull(Exception):
+    """File des tâches de détection pleine (DETECTION_JOB_QUEUE_SIZE)."""
+
+
+def get_executor():
+    """Retourne le pool de workers du processus (créé à la demande)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = getattr(settings, 'DETECTION_JOB_WORKERS', 2)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='detection-job')
+        return _executor
+
+
+def _release_slot(future):
+    global _in_flight
+    with _executor_lock:
+        _in_flight -= 1
+
+
+def submit_detection_job(job_id, cache_key=None, image=None):
+    """
+    Place une tâche de détection (fichier déjà enregistré) dans la file des workers.
+
+    Pour une image, `image` est l'image décodée en mémoire, analysée sans
+    relecture du fichier enregistré.
+
+    Lève JobQueueFull si DETECTION_JOB_QUEUE_SIZE tâches sont déjà en attente
+    ou en cours dans ce processus.
+    """
+    global _in_flight
+    executor = get_executor()
+    with _executor_lock:
+        if _in_flight >= getattr(settings, 'DETECTION_JOB_QUEUE_SIZE', 16):
+            raise JobQueueFull(f"{_in_flight} tâche(s) de détection déjà en file")
+        _in_flight += 1
+    try:
+        future = executor.submit(run_detection_job, job_id, cache_key, image)
+    except Exception:
+        _release_slot(None)
+        raise
+    future.add_done_callback(_release_slot)
+    return future
+
+
+def _update_job(job_id, **fields):
+    from .models import DetectionJob
+    # update() ne met pas à jour les champs auto_now: updated_at sert à repérer les tâches bloquées
+    DetectionJob.objects.filter(id=job_id).update(updated_at=timezone.now(), **fields)
+
+
+def expire_stale_job(job):
+    """
+    Marque comme échouée une tâche en attente ou en cours restée sans nouvelles
+    depuis DETECTION_JOB_TIMEOUT secondes; retourne vrai si c'est le cas.
+    """
+    from .models import DetectionJob
+
+    if job.status not in (DetectionJob.STATUS_PENDING, DetectionJob.STATUS_RUNNING):
+        return False
+    limit = timezone.now() - timedelta(seconds=getattr(settings, 'DETECTION_JOB_TIMEOUT', 600))
+    if job.updated_at >= limit:
+        return False
+    error = "Tâche interrompue (aucune progression dans le délai imparti)"
+    updated = DetectionJob.objects.filter(
+        id=job.id, status=job.status, updated_at__lt=limit,
+    ).update(status=DetectionJob.STATUS_FAILED, error=error, updated_at=timezone.now())
+    if updated:
+        logger.warning(f"Tâche de détection {job.id} expirée ({job.status})")
+        job.status, job.error = DetectionJob.STATUS_FAILED, error
+    return bool(updated)
+
+
+def run_detection_job(job_id, cache_key=None, image=None):
+    """
+    Exécute une tâche: détection, puis enregistrement du résultat ou de l'erreur.
+
+    Avec `cache_key`, le résultat est aussi placé dans le cache de résultats.
+    """
+    from .models import DetectionJob
+    from .processing import detect_image_file, detect_video_file
+    from .result_cache import result_cache
+
+    close_old_connections()
+    try:
+        job = DetectionJob.objects.get(id=job_id)
+        if job.status != DetectionJob.STATUS_PENDING:
+            logger.warning(f"Tâche de détection {job_id} ignorée ({job.status})")
+            return
+        _update_job(job_id, status=DetectionJob.STATUS_RUNNING, progress=5)
+
+        fs = FileSystemStorage()
+        file_path = os.path.join(settings.MEDIA_ROOT, job.filename)
+
+        if job.media_type == 'video':
+            def on_progress(done, expected):
+                progress = 5 + int(90 * min(done, expected) / max(expected, 1))
+                _update_job(job_id, progress=progress)
+
+            result = detect_video_file(fs, job.filename, file_path, on_progress=on_progress)
+        else:
+            # Image décodée par la vue; le fichier enregistré n'est relu qu'à défaut
+            result = detect_image_file(fs, job.filename, image if image is not None else file_path)
+
+        _update_job(job_id, status=DetectionJob.STATUS_DONE, progress=100, result=result)
+        if cache_key:
+            result_cache.put(cache_key, result)
+        logger.info(f"Tâche de détection {job_id} terminée")
+    except Exception as e:
+        logger.error(f"Erreur lors de la tâche de détection {job_id}: {e}")
+        inc(errors_total, source='job')
+        _update_job(job_id, status=DetectionJob.STATUS_FAILED, error=str(e))
+    finally:
+        close_old_connections()
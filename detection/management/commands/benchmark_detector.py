@@ -0,0 +1,146 @@
+"""
+Banc d'essai du CarDetector: latence par étape, débit et mémoire.
+
+Exemples:
+    python manage.py benchmark_detector --images samples/ --repeat 3 --json bench.json
+    python manage.py benchmark_detector --generate 30 --sizes 640 1280 1920
+
+Les étapes de production sont chronométrées telles que DETECTION_PLATE_MODE
+les enchaîne (`vehicle_stage`, `plate_stage`, prétraitement OCR, inférence
+OCR avec post-traitement); les percentiles p50/p95/p99 de chacune sont
+calculés sur toutes les exécutions. Le débit (images/s) est aussi ventilé par taille d'image et par
+nombre de véhicules détectés. La sortie JSON (commit, réglages, mesures)
+permet de comparer les exécutions d'un commit à l'autre.
+"""
+import json
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.benchmark import (
+    DETAILED_STAGES, detailed_stage_timings, generated_images, load_images, peak_rss_bytes, percentiles,
+    without_ocr_cache,
+)
+from detection.model_registry import current_rss_bytes, model_registry
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = "Mesure la latence par étape (p50/p95/p99), le débit et la mémoire du CarDetector"
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--images', help="Dossier d'images de test")
+        source.add_argument('--generate', type=int, help="Nombre d'images synthétiques à générer")
+        parser.add_argument('--sizes', nargs='+', type=int, default=[640, 1280, 1920],
+                            help="Largeurs des images générées")
+        parser.add_argument('--limit', type=int, default=None, help="Nombre maximal d'images")
+        parser.add_argument('--repeat', type=int, default=1, help="Passages sur l'ensemble des images")
+        parser.add_argument('--warmup', type=int, default=1, help="Images de préchauffage non mesurées")
+        parser.add_argument('--json', help="Fichier de sortie JSON")
+
+    def handle(self, *args, **options):
+        if options['images']:
+            images = load_images(options['images'], options['limit'])
+            if not images:
+                raise CommandError(f"Aucune image dans {options['images']}")
+        else:
+            images = generated_images(options['generate'], options['sizes'])
+
+        rss_before = current_rss_bytes()
+        detector = model_registry.get_detector()
+        rss_models = current_rss_bytes()
+
+        # Le cache OCR fausserait les mesures des passages répétés
+        with without_ocr_cache(detector):
+            for _, image in images[:options['warmup']]:
+                detailed_stage_timings(detector, image)
+
+            stage_samples = defaultdict(list)
+            totals = []
+            by_size = defaultdict(list)
+            by_vehicles = defaultdict(list)
+            plates_read = 0
+            start = time.perf_counter()
+            for _ in range(options['repeat']):
+                for _, image in images:
+                    _, timings, vehicles, plates = detailed_stage_timings(detector, image)
+                    total = sum(timings.values())
+                    for stage, value in timings.items():
+                        stage_samples[stage].append(value)
+                    totals.append(total)
+                    height, width = image.shape[:2]
+                    by_size[f"{width}x{height}"].append(total)
+                    by_vehicles[vehicles].append(total)
+                    plates_read += plates
+            wall = time.perf_counter() - start
+
+        runs = len(totals)
+        report = {
+            'commit': git_commit(),
+            'timestamp': time.time(),
+            'python': sys.version.split()[0],
+            'settings': {
+                'backend': detector.backend,
+                'quantized_models': sorted(detector.quantized_models),
+                'stage_imgsz': {k: str(v) for k, v in detector.stage_imgsz.items()},
+                'plate_mode': detector.plate_mode,
+            },
+            'images': len(images),
+            'runs': runs,
+            'plates_read': plates_read,
+            'images_per_second': runs / wall if wall else None,
+            'stages': {stage: percentiles(stage_samples[stage]) for stage in DETAILED_STAGES},
+            'total': percentiles(totals),
+            'by_image_size': {
+                size: {'runs': len(values), 'images_per_second': len(values) / sum(values), **percentiles(values)}
+                for size, values in sorted(by_size.items())
+            },
+            'by_vehicle_count': {
+                str(count): {'runs': len(values), 'images_per_second': len(values) / sum(values), **percentiles(values)}
+                for count, values in sorted(by_vehicles.items())
+            },
+            'memory': {
+                'peak_rss_bytes': peak_rss_bytes(),
+                'models_rss_bytes': (rss_models - rss_before) if rss_before and rss_models else None,
+            },
+        }
+
+        self._print(report)
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Résultats écrits dans {options['json']}")
+
+    def _print(self, report):
+        self.stdout.write(
+            f"{report['runs']} exécution(s) sur {report['images']} image(s), "
+            f"{report['images_per_second']:.2f} images/s, RSS max {report['memory']['peak_rss_bytes'] / 1e6:.0f} Mo"
+        )
+        self.stdout.write(f"  {'étape':<12s}  {'p50 (ms)':>9s}  {'p95 (ms)':>9s}  {'p99 (ms)':>9s}")
+        rows = list(report['stages'].items()) + [('total', report['total'])]
+        for stage, values in rows:
+            self.stdout.write(f"  {stage:<12s}  " + "  ".join(
+                f"{values[p] * 1000:9.1f}" if values[p] is not None else f"{'-':>9s}"
+                for p in ('p50', 'p95', 'p99')
+            ))
+        for title, key in (("taille d'image", 'by_image_size'), ('véhicules', 'by_vehicle_count')):
+            self.stdout.write(f"  Débit par {title}:")
+            for group, values in report[key].items():
+                self.stdout.write(
+                    f"    {group:>10s}: {values['images_per_second']:6.2f} images/s "
+                    f"(p50 {values['p50'] * 1000:.1f} ms, {values['runs']} exécution(s))"
+                )
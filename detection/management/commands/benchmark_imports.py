@@ -0,0 +1,110 @@
+"""
+Mesure le coût de démarrage d'un processus Django sans trafic de détection.
+
+Exemple:
+    python manage.py benchmark_imports --repeat 5 --json imports.json
+
+Chaque scénario est exécuté dans un nouvel interpréteur Python:
+- check     : `manage.py check`;
+- worker    : application WSGI chargée et toutes les URL résolues (vues
+              importées), comme un worker web qui n'a pas encore reçu
+              de détection;
+- detection : worker + import du CarDetector et d'ultralytics (coût payé à
+              la première détection).
+
+Le temps médian, la mémoire résidente maximale et les modules lourds chargés
+(cv2, numpy, torch, ultralytics) sont affichés pour chaque scénario.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+HEAVY_MODULES = ('cv2', 'numpy', 'torch', 'ultralytics')
+
+_PRELUDE = """
+import sys, json, resource
+"""
+
+_REPORT = """
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print('@@' + json.dumps({{
+    'max_rss_bytes': rss_kb * 1024,
+    'heavy_modules': [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+_WORKER = """
+from memoire.wsgi import application
+from django.urls import get_resolver
+get_resolver().reverse_dict
+"""
+
+SCENARIOS = {
+    'check': """
+from django.core.management import execute_from_command_line
+execute_from_command_line(['manage.py', 'check'])
+""",
+    'worker': _WORKER,
+    'detection': _WORKER + """
+import detection.car_detector
+import ultralytics
+""",
+}
+
+
+class Command(BaseCommand):
+    help = "Mesure le temps d'import et la mémoire de démarrage (manage.py check, worker web)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=3, help="Exécutions par scénario (médiane)")
+        parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+        parser.add_argument('--json', help="Fichier de sortie JSON")
+
+    def _run(self, code):
+        script = _PRELUDE + code + _REPORT.format(heavy=HEAVY_MODULES)
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, '-c', script], cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE),
+            capture_output=True, text=True,
+        )
+        elapsed = time.perf_counter() - start
+        if completed.returncode != 0:
+            raise CommandError(completed.stderr.strip().splitlines()[-1] if completed.stderr else 'échec')
+        report = next(line for line in completed.stdout.splitlines() if line.startswith('@@'))
+        return dict(json.loads(report[2:]), seconds=elapsed)
+
+    def handle(self, *args, **options):
+        results = {}
+        for name in options['scenarios']:
+            runs = [self._run(SCENARIOS[name]) for _ in range(options['repeat'])]
+            results[name] = {
+                'seconds_median': statistics.median(run['seconds'] for run in runs),
+                'seconds_min': min(run['seconds'] for run in runs),
+                'max_rss_bytes': max(run['max_rss_bytes'] for run in runs),
+                'heavy_modules': runs[-1]['heavy_modules'],
+            }
+
+        self.stdout.write(f"  {'scénario':<10s}  {'médiane (s)':>11s}  {'RSS max (Mo)':>12s}  modules lourds")
+        for name, result in results.items():
+            self.stdout.write(
+                f"  {name:<10s}  {result['seconds_median']:11.2f}  "
+                f"{result['max_rss_bytes'] / 1e6:12.0f}  {', '.join(result['heavy_modules']) or '-'}"
+            )
+
+        lazy = [name for name in ('check', 'worker') if name in results and results[name]['heavy_modules']]
+        if lazy:
+            self.stdout.write(self.style.WARNING(
+                f"Pile ML chargée sans détection dans: {', '.join(lazy)}"
+            ))
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump({'python': sys.version.split()[0], 'timestamp': time.time(), 'scenarios': results}, f, indent=2)
+            self.stdout.write(f"Résultats écrits dans {options['json']}")
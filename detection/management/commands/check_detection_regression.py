@@ -0,0 +1,110 @@
+"""
+Vérifie que la précision et la latence du CarDetector n'ont pas régressé.
+
+Exemples:
+    python manage.py check_detection_regression --corpus synthetic/ --baseline regression.json --update-baseline
+    python manage.py check_detection_regression --corpus synthetic/ --baseline regression.json
+
+Le corpus étiqueté (`labels.json`, voir `generate_synthetic_plates`) ou un
+corpus synthétique (`--generate`) passe par les étapes de production. Le
+rapport (plaques exactes, CER, précision des lectures, p50/p95 par étape) est comparé au rapport de
+référence; la commande échoue si un budget DETECTION_REGRESSION_* est dépassé.
+`--update-baseline` enregistre le rapport courant comme nouvelle référence.
+"""
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.model_registry import model_registry
+from detection.regression import budgets, compare, evaluate, generated_corpus, load_corpus
+
+from .benchmark_detector import git_commit
+
+
+class Command(BaseCommand):
+    help = "Compare précision (plaques exactes, CER, faux positifs) et latence du CarDetector à un rapport de référence"
+
+    def add_arguments(self, parser):
+        source = parser.add_mutually_exclusive_group(required=True)
+        source.add_argument('--corpus', help="Dossier contenant les images et labels.json")
+        source.add_argument('--generate', type=int, help="Nombre d'images synthétiques à générer")
+        parser.add_argument('--seed', type=int, default=0, help="Graine du corpus généré")
+        parser.add_argument('--baseline', required=True, help="Rapport de référence (JSON)")
+        parser.add_argument('--update-baseline', action='store_true',
+                            help="Enregistre le rapport courant comme référence au lieu de comparer")
+        parser.add_argument('--max-accuracy-drop', type=float, default=None)
+        parser.add_argument('--max-cer-increase', type=float, default=None)
+        parser.add_argument('--max-precision-drop', type=float, default=None)
+        parser.add_argument('--max-latency-increase', type=float, default=None)
+        parser.add_argument('--json', help="Fichier de sortie JSON du rapport courant")
+
+    def handle(self, *args, **options):
+        if options['corpus']:
+            corpus = load_corpus(options['corpus'])
+        else:
+            corpus = generated_corpus(options['generate'], seed=options['seed'])
+        if not corpus:
+            raise CommandError("Corpus vide")
+
+        detector = model_registry.get_detector()
+        # Un passage non mesuré pour ne pas compter l'initialisation des modèles
+        evaluate(detector, corpus[:1])
+        report = evaluate(detector, corpus)
+        report.update({
+            'commit': git_commit(),
+            'timestamp': time.time(),
+            'corpus': options['corpus'] or {'generate': options['generate'], 'seed': options['seed']},
+            'settings': {
+                'backend': detector.backend,
+                'quantized_models': sorted(detector.quantized_models),
+                'stage_imgsz': {k: str(v) for k, v in detector.stage_imgsz.items()},
+                'plate_mode': detector.plate_mode,
+            },
+        })
+        self._print(report)
+
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report, f, indent=2)
+
+        if options['update_baseline']:
+            with open(options['baseline'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Référence enregistrée dans {options['baseline']}"))
+            return
+
+        if not os.path.exists(options['baseline']):
+            raise CommandError(f"Référence absente: {options['baseline']} (créez-la avec --update-baseline)")
+        with open(options['baseline']) as f:
+            baseline = json.load(f)
+
+        limits = budgets()
+        for key in limits:
+            if options[key] is not None:
+                limits[key] = options[key]
+        problems = compare(report, baseline, limits)
+        if problems:
+            for problem in problems:
+                self.stderr.write(f"  {problem}")
+            raise CommandError(f"{len(problems)} régression(s) face à {options['baseline']} "
+                               f"(commit de référence: {baseline.get('commit') or 'inconnu'})")
+        self.stdout.write(self.style.SUCCESS("Aucune régression de précision ni de latence"))
+
+    def _print(self, report):
+        self.stdout.write(
+            f"{report['plates']} plaque(s) sur {report['images']} image(s): "
+            f"{report['exact_match_rate']:.1%} exactes, CER {report['char_error_rate']:.2%}, "
+            f"précision {report['precision']:.1%} ({report['false_positives']} faux positif(s))"
+        )
+        self.stdout.write(f"  {'étape':<12s}  {'p50 (ms)':>9s}  {'p95 (ms)':>9s}")
+        for stage, values in list(report['stages'].items()) + [('total', report['total'])]:
+            self.stdout.write(f"  {stage:<12s}  " + "  ".join(
+                f"{values[p] * 1000:9.1f}" if values[p] is not None else f"{'-':>9s}"
+                for p in ('p50', 'p95')
+            ))
+        for mismatch in report['mismatches'][:10]:
+            self.stdout.write(
+                f"  {mismatch['image']}: attendu {mismatch['expected'] or '(rien)'}, lu {mismatch['read'] or '(rien)'}"
+            )
@@ -0,0 +1,75 @@
+"""
+Exporte les modèles YOLO vers un moteur d'inférence CPU et vérifie le résultat.
+
+Exemples:
+    python manage.py export_detection_models --backend onnx
+    python manage.py export_detection_models --backend openvino --images samples/
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from detection import backends
+from detection.benchmark import load_images, stage_timings
+from detection.car_detector import CarDetector
+from detection.model_registry import ModelRegistry
+
+
+class Command(BaseCommand):
+    help = "Exporte les trois modèles du CarDetector et compare au chemin PyTorch"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--backend', choices=[b for b in backends.BACKENDS if b != backends.PYTORCH],
+                            default=backends.ONNX)
+        parser.add_argument('--images', help="Dossier d'images pour comparer les plaques et les temps")
+        parser.add_argument('--force', action='store_true', help="Réexporter même si l'export est à jour")
+
+    def handle(self, *args, **options):
+        backend = options['backend']
+        try:
+            backends.check_backend_available(backend)
+        except Exception as e:
+            raise CommandError(str(e))
+
+        registry = ModelRegistry()
+        # Référence en pleine précision, quels que soient les modèles INT8 configurés
+        reference = CarDetector(registry=registry, backend=backends.PYTORCH, quantized=())
+        for name, path in reference.model_paths().items():
+            if options['force'] or not backends.is_export_current(path, backend):
+                target = backends.export_model(path, backend)
+                self.stdout.write(f"{name}: exporté vers {target}")
+            else:
+                self.stdout.write(f"{name}: export à jour ({backends.exported_path(path, backend)})")
+
+        if not options['images']:
+            return
+
+        candidate = CarDetector(registry=registry, backend=backend)
+        images = load_images(options['images'])
+        if not images:
+            raise CommandError(f"Aucune image dans {options['images']}")
+
+        totals = {backends.PYTORCH: {}, backend: {}}
+        mismatches = 0
+        for name, image in images:
+            ref_texts, ref_times = stage_timings(reference, image)
+            cand_texts, cand_times = stage_timings(candidate, image)
+            for stage, value in ref_times.items():
+                totals[backends.PYTORCH][stage] = totals[backends.PYTORCH].get(stage, 0.0) + value
+                totals[backend][stage] = totals[backend].get(stage, 0.0) + cand_times[stage]
+            if ref_texts != cand_texts:
+                mismatches += 1
+                self.stdout.write(self.style.WARNING(
+                    f"{name}: plaques différentes (pytorch={ref_texts}, {backend}={cand_texts})"
+                ))
+
+        self.stdout.write(f"\nTemps moyens par image ({len(images)} images):")
+        for stage in ('vehicle', 'plate', 'ocr'):
+            ref = totals[backends.PYTORCH][stage] / len(images)
+            cand = totals[backend][stage] / len(images)
+            speedup = ref / cand if cand else float('inf')
+            self.stdout.write(
+                f"  {stage:8s} pytorch={ref * 1000:8.1f} ms  {backend}={cand * 1000:8.1f} ms  x{speedup:.2f}"
+            )
+
+        if mismatches:
+            raise CommandError(f"{mismatches} image(s) avec des plaques différentes du chemin PyTorch")
+        self.stdout.write(self.style.SUCCESS("Plaques identiques au chemin PyTorch sur toutes les images"))
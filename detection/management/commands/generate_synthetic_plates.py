@@ -0,0 +1,62 @@
+"""
+Génère un corpus étiqueté de plaques congolaises synthétiques.
+
+Exemple:
+    python manage.py generate_synthetic_plates --output synthetic/ --count 200 --blur 2 --noise 10
+
+Le dossier contient les images (`sample_XXXX.jpg`), les découpes de plaques
+(`plates/sample_XXXX.jpg`) et `labels.json` (texte attendu et boîte de chaque
+plaque). La même graine produit le même corpus.
+"""
+import json
+import os
+
+import cv2
+from django.core.management.base import BaseCommand
+
+from detection.synthetic import DEFAULT_OPTIONS, generate_corpus
+
+
+class Command(BaseCommand):
+    help = "Génère des images synthétiques de plaques congolaises étiquetées (sans données réelles)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', required=True, help="Dossier de sortie")
+        parser.add_argument('--count', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--blur', type=float, default=DEFAULT_OPTIONS['blur'])
+        parser.add_argument('--perspective', type=float, default=DEFAULT_OPTIONS['perspective'])
+        parser.add_argument('--noise', type=float, default=DEFAULT_OPTIONS['noise'])
+        parser.add_argument('--lighting', type=float, default=DEFAULT_OPTIONS['lighting'])
+        parser.add_argument('--prefix-probability', type=float, default=DEFAULT_OPTIONS['prefix_probability'])
+        parser.add_argument('--plate-width', type=int, nargs=2, default=list(DEFAULT_OPTIONS['plate_width']),
+                            metavar=('MIN', 'MAX'), help="Largeur des plaques incrustées (pixels)")
+        parser.add_argument('--image-size', type=int, nargs=2, default=list(DEFAULT_OPTIONS['image_size']),
+                            metavar=('LARGEUR', 'HAUTEUR'))
+
+    def handle(self, *args, **options):
+        output = options['output']
+        os.makedirs(os.path.join(output, 'plates'), exist_ok=True)
+
+        corpus = generate_corpus(
+            options['count'], seed=options['seed'],
+            blur=options['blur'], perspective=options['perspective'], noise=options['noise'],
+            lighting=options['lighting'], prefix_probability=options['prefix_probability'],
+            plate_width=tuple(options['plate_width']), image_size=tuple(options['image_size']),
+        )
+
+        labels = []
+        for i, sample in enumerate(corpus):
+            name = f"sample_{i:04d}.jpg"
+            cv2.imwrite(os.path.join(output, name), sample['image'])
+            cv2.imwrite(os.path.join(output, 'plates', name), sample['plate_image'])
+            labels.append({
+                'image': name,
+                'text': sample['text'],
+                'shown_text': sample['shown_text'],
+                'bbox': sample['bbox'],
+            })
+
+        with open(os.path.join(output, 'labels.json'), 'w') as f:
+            json.dump({'seed': options['seed'], 'samples': labels}, f, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"{len(labels)} image(s) générée(s) dans {output}"))
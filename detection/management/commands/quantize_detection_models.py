@@ -0,0 +1,74 @@
+"""
+Quantifie en INT8 les modèles du CarDetector et applique le garde-fou de précision.
+
+Exemple:
+    python manage.py quantize_detection_models --images calibration/ --models plate ocr
+
+Chaque modèle quantifié est comparé au modèle flottant sur les mêmes images;
+il n'est activable (DETECTION_QUANTIZED_MODELS) que s'il passe le garde-fou.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from detection import backends, quantization
+from detection.benchmark import load_images
+from detection.car_detector import CarDetector
+from detection.model_registry import ModelRegistry
+
+
+class Command(BaseCommand):
+    help = "Quantifie les modèles YOLO en INT8 et vérifie la perte de précision"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', required=True, help="Dossier d'images de calibration")
+        parser.add_argument('--models', nargs='+', choices=quantization.MODEL_NAMES,
+                            default=list(quantization.MODEL_NAMES))
+        parser.add_argument('--max-drop', type=float, default=None,
+                            help="Perte de précision maximale (défaut: DETECTION_QUANTIZATION_MAX_ACCURACY_DROP)")
+        parser.add_argument('--limit', type=int, default=200, help="Nombre maximal d'entrées de calibration")
+
+    def handle(self, *args, **options):
+        try:
+            backends.check_backend_available(backends.ONNX)
+        except Exception as e:
+            raise CommandError(str(e))
+
+        images = [image for _, image in load_images(options['images'])]
+        if not images:
+            raise CommandError(f"Aucune image dans {options['images']}")
+
+        from ultralytics import YOLO
+
+        registry = ModelRegistry()
+        reference = CarDetector(registry=registry, backend=backends.PYTORCH, quantized=())
+        inputs = quantization.calibration_inputs(reference, images, limit=options['limit'])
+
+        rejected = []
+        for name in options['models']:
+            attr = f"{name}_model"
+            weights_path = reference.model_paths()[attr]
+            if not inputs[name]:
+                self.stdout.write(self.style.WARNING(f"{name}: aucune entrée de calibration, ignoré"))
+                continue
+
+            target = quantization.quantize_model(weights_path, inputs[name])
+
+            # Détecteur candidat: seul ce modèle est remplacé par sa version INT8
+            candidate = CarDetector(registry=registry, backend=backends.PYTORCH, quantized=())
+            setattr(candidate, attr, YOLO(target, task='detect'))
+
+            metrics = quantization.evaluate(reference, candidate, images)
+            report = quantization.validate(weights_path, metrics, options['max_drop'], candidate=target)
+
+            line = (
+                f"{name}: rappel boîtes={report['box_recall']:.3f}, "
+                f"plaques identiques={report['plate_string_agreement']:.3f}, "
+                f"perte={report['accuracy_drop']:.3f} (max {report['max_accuracy_drop']:.3f})"
+            )
+            if report['accepted']:
+                self.stdout.write(self.style.SUCCESS(f"{line} -> accepté"))
+            else:
+                self.stdout.write(self.style.ERROR(f"{line} -> refusé"))
+                rejected.append(name)
+
+        if rejected:
+            raise CommandError(f"Modèle(s) INT8 refusé(s): {', '.join(rejected)}")
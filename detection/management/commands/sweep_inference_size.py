@@ -0,0 +1,74 @@
+"""
+Mesure la latence d'une étape du CarDetector en fonction de sa taille d'entrée.
+
+Exemple:
+    python manage.py sweep_inference_size --images samples/ --stage ocr --sizes 640 320 160x320 96x320
+
+Pour chaque taille, la latence moyenne de l'étape est comparée à la
+concordance des plaques lues avec la configuration de référence (640 pour
+toutes les étapes). La plus petite taille sans perte est indiquée pour
+DETECTION_STAGE_IMGSZ.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from detection.benchmark import load_images, stage_timings
+from detection.car_detector import parse_imgsz
+from detection.model_registry import model_registry
+
+
+class Command(BaseCommand):
+    help = "Balaye les tailles d'entrée d'une étape: latence contre précision des plaques"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--images', required=True, help="Dossier d'images de test")
+        parser.add_argument('--stage', choices=['vehicle', 'plate', 'ocr'], required=True)
+        parser.add_argument('--sizes', nargs='+', default=['640', '480', '320', '256', '160'],
+                            help="Tailles à tester: 320 (carré) ou 96x320 (hauteur x largeur)")
+        parser.add_argument('--limit', type=int, default=None, help="Nombre maximal d'images")
+
+    def handle(self, *args, **options):
+        stage = options['stage']
+        images = load_images(options['images'], options['limit'])
+        if not images:
+            raise CommandError(f"Aucune image dans {options['images']}")
+
+        detector = model_registry.get_detector()
+        original = dict(detector.stage_imgsz)
+
+        # `stage_timings` lit les plaques sans cache OCR: la référence et le préchauffage
+        # rempliraient sinon le cache et l'OCR serait mesuré à ~0 ms, concordant à 100 %
+        try:
+            # Référence: 640 pour toutes les étapes
+            detector.stage_imgsz = {name: 640 for name in original}
+            reference = [stage_timings(detector, image)[0] for _, image in images]
+
+            rows = []
+            for size in options['sizes']:
+                detector.stage_imgsz = {name: 640 for name in original}
+                detector.stage_imgsz[stage] = parse_imgsz(size)
+
+                # Première inférence à cette taille: préchauffage non mesuré
+                stage_timings(detector, images[0][1])
+
+                total, agreements = 0.0, 0
+                for (_, image), expected in zip(images, reference):
+                    texts, timings = stage_timings(detector, image)
+                    total += timings[stage]
+                    agreements += texts == expected
+                rows.append((size, total / len(images), agreements / len(images)))
+        finally:
+            detector.stage_imgsz = original
+
+        self.stdout.write(f"Étape '{stage}' sur {len(images)} image(s):")
+        self.stdout.write(f"  {'taille':>10s}  {'latence (ms)':>12s}  {'plaques identiques':>18s}")
+        for size, latency, agreement in rows:
+            self.stdout.write(f"  {size:>10s}  {latency * 1000:12.1f}  {agreement:18.1%}")
+
+        lossless = [row for row in rows if row[2] >= 1.0]
+        if lossless:
+            best = min(lossless, key=lambda row: row[1])
+            self.stdout.write(self.style.SUCCESS(
+                f"Taille la plus rapide sans perte: {best[0]} ({best[1] * 1000:.1f} ms)"
+            ))
+        else:
+            self.stdout.write(self.style.WARNING("Aucune taille ne conserve toutes les plaques"))
@@ -0,0 +1,219 @@
+"""
+Compteurs et histogrammes du service de détection, au format texte Prometheus.
+
+Les étapes coûteuses (inférence des modèles, prétraitement OpenCV, écriture
+des artefacts, base de données, courriels) sont entourées de `span(étape)`,
+qui alimente l'histogramme `detection_stage_seconds`. Les volumes (images,
+plaques lues, plaques au format congolais, erreurs) sont des compteurs.
+
+Tout est désactivé par défaut (DETECTION_METRICS): `span()` retourne alors un
+contexte vide partagé et `inc()` s'arrête au premier test, sans horloge ni
+verrou. Le module ne dépend que de la bibliothèque standard.
+"""
+import math
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_NO_SPAN = nullcontext()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur croissant, une valeur par combinaison d'étiquettes."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_labels(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    """Histogramme à seaux cumulés (`_bucket`, `_sum`, `_count`)."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][index] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def samples(self):
+        with self._lock:
+            series = {key: dict(value, buckets=list(value['buckets'])) for key, value in self._series.items()}
+        for key, value in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, value['buckets']):
+                cumulative += count
+                labels = _labels(self.labelnames, key, [('le', _number(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_number(value['sum'])}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {value['count']}"
+
+
+class MetricsRegistry:
+    """Ensemble des métriques du processus et leur rendu au format texte Prometheus."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+        self._enabled = None
+
+    @property
+    def enabled(self):
+        # Lu une seule fois: le test du chemin chaud reste un accès d'attribut
+        if self._enabled is None:
+            self._enabled = bool(getattr(settings, 'DETECTION_METRICS', False))
+        return self._enabled
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Exposition texte (version 0.0.4) de toutes les métriques."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+stage_seconds = metrics.histogram(
+    'detection_stage_seconds', "Durée des étapes de détection (secondes)", ['stage'],
+)
+request_seconds = metrics.histogram(
+    'detection_request_seconds', "Durée des vues de détection (secondes)", ['view'],
+)
+images_total = metrics.counter(
+    'detection_images_total', "Images et vidéos analysées", ['kind'],
+)
+frames_total = metrics.counter(
+    'detection_frames_total', "Images passées par les modèles (photos et images de vidéos)",
+)
+plates_read_total = metrics.counter(
+    'detection_plates_read_total', "Plaques lues par l'OCR (texte non vide)",
+)
+plates_pattern_total = metrics.counter(
+    'detection_plates_pattern_match_total', "Plaques lues conformes au format congolais 0000AA00",
+)
+errors_total = metrics.counter(
+    'detection_errors_total', "Erreurs du service de détection", ['source'],
+)
+
+
+class _Span:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def span(stage):
+    """Mesure la durée du bloc dans `detection_stage_seconds`, si les métriques sont actives."""
+    if not metrics.enabled:
+        return _NO_SPAN
+    return _Span(stage_seconds, {'stage': stage})
+
+
+def instrumented_view(name):
+    """
+    Décorateur de vue: durée dans `detection_request_seconds` et erreurs
+    (exception ou réponse 5xx) dans `detection_errors_total`.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not metrics.enabled:
+                return view(request, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                response = view(request, *args, **kwargs)
+            except Exception:
+                errors_total.inc(source=name)
+                raise
+            finally:
+                request_seconds.observe(time.perf_counter() - start, view=name)
+            if response.status_code >= 500:
+                errors_total.inc(source=name)
+            return response
+        return wrapper
+    return decorator
+
+
+def inc(counter, amount=1, **labels):
+    """Incrémente `counter` si les métriques sont actives."""
+    if metrics.enabled and amount:
+        counter.inc(amount, **labels)
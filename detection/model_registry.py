@@ -0,0 +1,336 @@
+"""
+Registre des modèles YOLO partagés au sein d'un processus worker.
+
+Chaque fichier de poids (véhicule, plaque, OCR) n'est désérialisé qu'une seule
+fois par réplique du détecteur. Le registre surveille la date de modification
+des fichiers et recharge un modèle lorsque ses poids changent sur le disque. Il
+conserve aussi, pour chaque modèle, le temps de chargement et la mémoire
+consommée.
+
+Les prédicteurs ultralytics ne doivent pas être partagés entre threads: le
+registre tient un pool de DETECTION_POOL_SIZE répliques du CarDetector (chacune
+avec ses propres modèles). Chaque requête ou tâche emprunte une réplique et la
+rend à la fin; la mémoire reste donc bornée quel que soit le nombre de threads
+du serveur.
+"""
+import os
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import backends
+
+logger = logging.getLogger(__name__)
+
+
+def current_rss_bytes():
+    """Retourne la mémoire résidente (RSS) du processus en octets, ou None."""
+    try:
+        import psutil
+        return psutil.Process(os.getpid()).memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _parameter_bytes(model):
+    """Taille des poids du modèle en mémoire (octets), ou None si inconnue."""
+    try:
+        return sum(p.numel() * p.element_size() for p in model.model.parameters())
+    except Exception:
+        return None
+
+
+class DetectorPoolTimeout(TimeoutError):
+    """Aucune réplique du détecteur n'est devenue libre dans le délai imparti."""
+
+
+class DetectorPool:
+    """
+    Pool de répliques du CarDetector, empruntées puis rendues par les threads.
+
+    Les répliques sont créées à la demande, jusqu'à `size`. Un emprunt attend
+    au plus `timeout` secondes qu'une réplique se libère, puis lève
+    DetectorPoolTimeout. Le pool mesure les temps d'attente et sa saturation.
+    """
+
+    def __init__(self, registry, size=None, timeout=None):
+        self.registry = registry
+        self.size = size
+        self.timeout = timeout
+        self._condition = threading.Condition()
+        self._replicas = []
+        self._available = []
+        self._reserved = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._waited_checkouts = 0
+        self._timeouts = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+
+    def _size(self):
+        if self.size is not None:
+            return self.size
+        return max(1, getattr(settings, 'DETECTION_POOL_SIZE', 1))
+
+    def _timeout(self):
+        if self.timeout is not None:
+            return self.timeout
+        return getattr(settings, 'DETECTION_POOL_TIMEOUT', 60)
+
+    def _create(self, replica):
+        from .car_detector import CarDetector
+
+        detector = CarDetector(registry=self.registry, replica=replica)
+        logger.info(f"Réplique {replica} du détecteur créée ({replica + 1}/{self._size()})")
+        return detector
+
+    def _add_replica(self):
+        """Crée une réplique hors verrou (chargement des modèles) et l'enregistre."""
+        replica = self._reserved
+        self._reserved += 1
+        self._condition.release()
+        try:
+            detector = self._create(replica)
+        except Exception:
+            self._condition.acquire()
+            self._reserved -= 1
+            self._condition.notify()
+            raise
+        self._condition.acquire()
+        self._replicas.append(detector)
+        return detector
+
+    def primary(self):
+        """Première réplique, hors emprunt (commandes de gestion, mono-thread)."""
+        with self._condition:
+            if not self._replicas:
+                self._available.append(self._add_replica())
+            return self._replicas[0]
+
+    def checkout(self, timeout=None):
+        """Emprunte une réplique (en créant une nouvelle si le pool n'est pas plein)."""
+        timeout = self._timeout() if timeout is None else timeout
+        start = time.perf_counter()
+        with self._condition:
+            waited = False
+            while not self._available and self._reserved >= self._size():
+                waited = True
+                self._waiting += 1
+                try:
+                    remaining = timeout - (time.perf_counter() - start)
+                    if remaining <= 0 or not self._condition.wait(remaining):
+                        if not self._available:
+                            self._timeouts += 1
+                            raise DetectorPoolTimeout(
+                                f"Aucun détecteur libre après {timeout:.1f}s ({self._size()} répliques occupées)"
+                            )
+                finally:
+                    self._waiting -= 1
+
+            detector = self._available.pop() if self._available else self._add_replica()
+            wait = time.perf_counter() - start
+            self._checkouts += 1
+            self._waited_checkouts += waited
+            self._wait_time += wait
+            self._max_wait = max(self._max_wait, wait)
+        return detector
+
+    def checkin(self, detector):
+        with self._condition:
+            # Une réplique antérieure à `clear()` n'est pas remise en circulation
+            if any(detector is replica for replica in self._replicas):
+                self._available.append(detector)
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            in_use = len(self._replicas) - len(self._available)
+            return {
+                'size': self._size(),
+                'replicas': len(self._replicas),
+                'in_use': in_use,
+                'waiting': self._waiting,
+                'saturation': in_use / self._size(),
+                'checkouts': self._checkouts,
+                'waited_checkouts': self._waited_checkouts,
+                'timeouts': self._timeouts,
+                'mean_wait_seconds': self._wait_time / self._checkouts if self._checkouts else 0.0,
+                'max_wait_seconds': self._max_wait,
+            }
+
+    def clear(self):
+        with self._condition:
+            self._replicas.clear()
+            self._available.clear()
+            self._reserved = 0
+            self._condition.notify_all()
+
+
+class BorrowedDetector:
+    """
+    Détecteur dont chaque appel de méthode emprunte une réplique au pool.
+
+    Pour les longs traitements (vidéo): une réplique n'est tenue que le temps
+    d'une étape sur un lot d'images, si bien que les requêtes d'image passent
+    entre deux lots au lieu d'attendre la fin de la vidéo.
+    """
+
+    def __init__(self, registry, timeout=None):
+        self._registry = registry
+        self._timeout = timeout
+
+    def __getattr__(self, name):
+        with self._registry.detector(self._timeout) as detector:
+            value = getattr(detector, name)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            with self._registry.detector(self._timeout) as detector:
+                return getattr(detector, name)(*args, **kwargs)
+        return call
+
+
+class ModelRegistry:
+    """
+    Cache des modèles YOLO indexé par (fichier de poids, moteur d'inférence,
+    mode INT8, réplique).
+
+    Les modèles sont rechargés automatiquement si le fichier de poids est
+    modifié (mtime ou taille différente). Les détecteurs sont fournis par
+    `detector()`, qui emprunte une réplique au pool (`pool`): une réplique
+    n'est utilisée que par un thread à la fois.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}
+        self.pool = DetectorPool(self)
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _load(self, key, signature):
+        path, backend, quantized, replica = key
+        rss_before = current_rss_bytes()
+        start = time.perf_counter()
+        model = backends.load_model(path, backend, quantized)
+        load_time = time.perf_counter() - start
+        rss_after = current_rss_bytes()
+
+        rss_delta = None
+        if rss_before is not None and rss_after is not None:
+            rss_delta = max(0, rss_after - rss_before)
+
+        entry = {
+            'model': model,
+            'signature': signature,
+            'load_time': load_time,
+            'loaded_at': time.time(),
+            'parameter_bytes': _parameter_bytes(model),
+            'rss_delta_bytes': rss_delta,
+            'loads': self._entries.get(key, {}).get('loads', 0) + 1,
+        }
+        self._entries[key] = entry
+        logger.info(
+            f"Modèle chargé: {os.path.basename(path)} [{backend}{' int8' if quantized else ''}, "
+            f"réplique {replica}] "
+            f"en {load_time:.2f}s "
+            f"(poids: {entry['parameter_bytes']} o, RSS +{rss_delta} o)"
+        )
+        return model
+
+    def get_model(self, path, backend=None, quantized=False, replica=0):
+        """
+        Retourne le modèle YOLO du fichier `path`, chargé une seule fois par réplique.
+
+        `backend` désigne le moteur d'inférence (DETECTION_INFERENCE_BACKEND
+        par défaut); les poids sont exportés au besoin pour ce moteur.
+        `quantized` demande le modèle INT8 validé s'il existe. `replica`
+        distingue les copies du modèle utilisées par des threads différents.
+        """
+        key = (os.fspath(path), backend or backends.default_backend(), bool(quantized), replica)
+        signature = self._signature(key[0])
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['signature'] == signature:
+                return entry['model']
+            if entry is not None:
+                logger.info(f"Fichier de poids modifié, rechargement: {key[0]}")
+            return self._load(key, signature)
+
+    def refresh(self, detector):
+        """Réaffecte au détecteur les modèles dont les poids ont changé."""
+        for attr, path in detector.model_paths().items():
+            model = self.get_model(path, detector.backend, detector.is_quantized(attr), detector.replica)
+            if getattr(detector, attr, None) is not model:
+                setattr(detector, attr, model)
+
+    def get_detector(self):
+        """
+        Retourne la première réplique du détecteur, sans l'emprunter au pool.
+
+        Réservé aux usages mono-thread (commandes de gestion); les vues et
+        les tâches passent par `detector()`.
+        """
+        detector = self.pool.primary()
+        self.refresh(detector)
+        return detector
+
+    @contextmanager
+    def detector(self, timeout=None):
+        """
+        Emprunte une réplique du détecteur pour la durée d'un bloc `with`.
+
+        Lève DetectorPoolTimeout si aucune réplique ne se libère à temps.
+        """
+        detector = self.pool.checkout(timeout)
+        try:
+            self.refresh(detector)
+            yield detector
+        finally:
+            self.pool.checkin(detector)
+
+    def borrowed_detector(self, timeout=None):
+        """Détecteur empruntant une réplique à chaque appel (voir BorrowedDetector)."""
+        return BorrowedDetector(self, timeout)
+
+    def stats(self):
+        """Temps de chargement et mémoire de chaque modèle chargé."""
+        with self._lock:
+            return [
+                {
+                    'model': os.path.basename(path),
+                    'path': path,
+                    'backend': backend,
+                    'quantized': quantized,
+                    'replica': replica,
+                    'load_time': round(entry['load_time'], 4),
+                    'loaded_at': entry['loaded_at'],
+                    'loads': entry['loads'],
+                    'parameter_bytes': entry['parameter_bytes'],
+                    'rss_delta_bytes': entry['rss_delta_bytes'],
+                }
+                for (path, backend, quantized, replica), entry in self._entries.items()
+            ]
+
+    def clear(self):
+        """Oublie tous les modèles chargés (ils seront rechargés au besoin)."""
+        with self._lock:
+            self._entries.clear()
+            self.pool.clear()
+
+
+# Registre unique du processus
+model_registry = ModelRegistry()
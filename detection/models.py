@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 from django.contrib.auth.models import User
 from vehicules.models import Vehicle
@@ -14,6 +15,75 @@ class Detection(models.Model):
         return f"{self.detected_plate} detected on {self.detection_date}"
 
 
+class DetectionJob(models.Model):
+    """
+    Tâche de détection exécutée en arrière-plan pour un fichier téléversé.
+
+    Le résultat stocké est le JSON que `detect_home` renvoie au client.
+    """
+    STATUS_PENDING = 'PENDING'
+    STATUS_RUNNING = 'RUNNING'
+    STATUS_DONE = 'DONE'
+    STATUS_FAILED = 'FAILED'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'En attente'),
+        (STATUS_RUNNING, 'En cours'),
+        (STATUS_DONE, 'Terminée'),
+        (STATUS_FAILED, 'Échouée'),
+    ]
+    MEDIA_CHOICES = [
+        ('image', 'Image'),
+        ('video', 'Vidéo'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        verbose_name="Agent"
+    )
+    media_type = models.CharField(
+        max_length=10,
+        choices=MEDIA_CHOICES,
+        default='image',
+        verbose_name="Type de média"
+    )
+    filename = models.CharField(
+        max_length=255,
+        verbose_name="Fichier (relatif à MEDIA_ROOT)"
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Statut"
+    )
+    progress = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Progression (%)"
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name="Résultat"
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name="Erreur"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Tâche de détection"
+        verbose_name_plural = "Tâches de détection"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Tâche {self.id} ({self.get_status_display()})"
+
+
 class Infraction(models.Model):
     """
     Modèle représentant un type d'infraction routière
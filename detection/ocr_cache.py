@@ -0,0 +1,197 @@
+"""
+Mémoïsation de l'OCR par empreinte perceptuelle des découpes de plaques.
+
+Les photos successives et les images d'une vidéo produisent des découpes de
+plaques presque identiques au pixel près. Chaque découpe est résumée par une
+empreinte (`plate_fingerprint`): sa forme à SHAPE_STEP pixels près, une
+vignette en niveaux de gris normalisée et l'empreinte de différence (dHash)
+de 32 x 8 bits de cette vignette. Une découpe déjà lue de même forme, à une
+distance de Hamming inférieure au seuil, et dont la vignette ne diffère que
+par le bruit (au plus MAX_CHANGED_PIXELS pixels d'écart marqué) donne son
+(texte, confiance) sans prétraitement ni inférence OCR.
+
+L'empreinte seule ne distingue pas deux plaques à un caractère près (un 3 et
+un 8 ne diffèrent que de quelques bits): la vignette tranche, un caractère
+différent changeant des dizaines de pixels.
+
+Pour ne pas comparer chaque découpe à toutes les entrées, l'empreinte est
+coupée en `seuil + 1` segments indexés (principe des tiroirs): deux
+empreintes à distance <= seuil ont au moins un segment identique. Seules les
+entrées partageant un segment avec la découpe sont comparées bit à bit,
+puis vignette contre vignette.
+"""
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+HASH_WIDTH = 32
+HASH_HEIGHT = 8
+HASH_BITS = HASH_WIDTH * HASH_HEIGHT
+# Écart de gris en deçà duquel deux colonnes voisines sont égales (le bruit
+# d'un fond uniforme ne fait pas basculer les bits)
+HASH_MARGIN = 8
+
+THUMBNAIL_SIZE = (96, 24)
+# Vérification des candidats: écart de gris marqué et nombre de pixels tolérés
+PIXEL_TOLERANCE = 64
+MAX_CHANGED_PIXELS = 4
+
+# Forme des découpes à SHAPE_STEP pixels près
+SHAPE_STEP = 8
+
+
+def plate_fingerprint(plate_img):
+    """Empreinte (forme, dHash, vignette) d'une découpe BGR, clé de `OcrCache`."""
+    gray = cv2.cvtColor(plate_img, cv2.COLOR_BGR2GRAY) if plate_img.ndim == 3 else plate_img
+    thumbnail = cv2.resize(gray, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA)
+    thumbnail = cv2.normalize(thumbnail, None, 0, 255, cv2.NORM_MINMAX)
+    small = cv2.resize(thumbnail, (HASH_WIDTH + 1, HASH_HEIGHT), interpolation=cv2.INTER_AREA).astype(np.int16)
+    bits = (small[:, 1:] > small[:, :-1] + HASH_MARGIN).flatten()
+    shape = tuple(round(size / SHAPE_STEP) for size in plate_img.shape[:2])
+    return shape, int.from_bytes(np.packbits(bits).tobytes(), 'big'), thumbnail
+
+
+def same_plate(thumbnail_a, thumbnail_b):
+    """Vrai si les deux vignettes ne diffèrent que par le bruit."""
+    changed = np.count_nonzero(cv2.absdiff(thumbnail_a, thumbnail_b) > PIXEL_TOLERANCE)
+    return changed <= MAX_CHANGED_PIXELS
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+def hash_segments(image_hash, count):
+    """Découpe l'empreinte en `count` segments: liste de (indice, valeur)."""
+    width = -(-HASH_BITS // count)
+    mask = (1 << width) - 1
+    return [(i, (image_hash >> (i * width)) & mask) for i in range(count)]
+
+
+class OcrCache:
+    """
+    Cache borné (LRU) des lectures OCR, interrogé par distance d'empreinte.
+
+    Les entrées sont liées à un jeton (poids du modèle OCR, seuil, taille d'entrée)
+    et à la forme de la découpe: un rechargement du modèle ou un autre réglage
+    ne réutilise pas les lectures précédentes.
+    """
+
+    def __init__(self, max_entries=None, max_distance=None):
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        # (jeton, forme, dHash) -> (vignette, lecture)
+        self._entries = OrderedDict()
+        # Index (jeton, forme, indice_segment, valeur) -> dHash, pour `_segments` segments
+        self._index = {}
+        self._segments = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.ocr_time = 0.0
+        self.ocr_reads = 0
+
+    def _capacity(self):
+        if self.max_entries is not None:
+            return self.max_entries
+        return getattr(settings, 'DETECTION_OCR_CACHE_SIZE', 512)
+
+    def _threshold(self):
+        if self.max_distance is not None:
+            return self.max_distance
+        return getattr(settings, 'DETECTION_OCR_CACHE_MAX_DISTANCE', 4)
+
+    @property
+    def enabled(self):
+        return self._capacity() > 0
+
+    def _index_add(self, token, shape, image_hash):
+        for segment in hash_segments(image_hash, self._segments):
+            self._index.setdefault((token, shape, *segment), set()).add(image_hash)
+
+    def _index_remove(self, token, shape, image_hash):
+        for segment in hash_segments(image_hash, self._segments):
+            bucket = self._index.get((token, shape, *segment))
+            if bucket is not None:
+                bucket.discard(image_hash)
+                if not bucket:
+                    del self._index[(token, shape, *segment)]
+
+    def _sync_index(self, threshold):
+        """Reconstruit l'index si le seuil (donc le nombre de segments) a changé."""
+        if self._segments == threshold + 1:
+            return
+        self._segments = threshold + 1
+        self._index = {}
+        for key in self._entries:
+            self._index_add(*key)
+
+    def lookup(self, token, fingerprint):
+        """Lecture (texte, confiance) d'une découpe proche (`plate_fingerprint`), ou None."""
+        threshold = self._threshold()
+        shape, image_hash, thumbnail = fingerprint
+        with self._lock:
+            self._sync_index(threshold)
+            candidates = set()
+            for segment in hash_segments(image_hash, self._segments):
+                candidates |= self._index.get((token, shape, *segment), set())
+            best_key = None
+            for distance, candidate in sorted((hamming(candidate, image_hash), candidate) for candidate in candidates):
+                if distance > threshold:
+                    break
+                if same_plate(self._entries[(token, shape, candidate)][0], thumbnail):
+                    best_key = (token, shape, candidate)
+                    break
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best_key)
+            self.hits += 1
+            return self._entries[best_key][1]
+
+    def store(self, token, fingerprint, output):
+        capacity = self._capacity()
+        shape, image_hash, thumbnail = fingerprint
+        key = (token, shape, image_hash)
+        with self._lock:
+            self._sync_index(self._threshold())
+            if key not in self._entries:
+                self._index_add(*key)
+            self._entries[key] = (thumbnail, output)
+            self._entries.move_to_end(key)
+            while len(self._entries) > capacity:
+                old_key, _ = self._entries.popitem(last=False)
+                self._index_remove(*old_key)
+
+    def record_ocr_time(self, seconds, reads):
+        """Comptabilise le temps réel passé en OCR (pour estimer le temps évité)."""
+        with self._lock:
+            self.ocr_time += seconds
+            self.ocr_reads += reads
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            per_read = self.ocr_time / self.ocr_reads if self.ocr_reads else 0.0
+            return {
+                'entries': len(self._entries),
+                'max_entries': self._capacity(),
+                'max_distance': self._threshold(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'ocr_seconds_per_read': per_read,
+                'ocr_seconds_saved': per_read * self.hits,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index = {}
+
+
+# Cache unique du processus
+ocr_cache = OcrCache()
@@ -0,0 +1,218 @@
+"""
+Exécution en pipeline des étapes du CarDetector pour les traitements par lots.
+
+Sans pipeline, chaque lot d'images passe par le modèle véhicule, le modèle de
+plaques, le prétraitement OpenCV puis le modèle OCR avant que le lot suivant
+ne commence. Ici chaque étape tourne dans ses propres threads, reliés par des
+files bornées: le lot N+1 passe par le modèle véhicule pendant que les
+plaques du lot N sont lues. Chaque modèle n'est utilisé que par une étape à
+un seul thread; seul le prétraitement (OpenCV, qui libère le GIL) peut avoir
+plusieurs workers.
+
+Le taux d'occupation de chaque étape (temps de travail / durée totale) est
+mesuré: l'étape la plus occupée est le goulot d'étranglement.
+"""
+import queue
+import threading
+import time
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _Failure:
+    """Exception levée par une étape, transmise jusqu'au consommateur."""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class PipelineStage:
+    def __init__(self, name, fn, workers=1):
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+
+
+class Pipeline:
+    """
+    Pipeline d'étapes `fn(élément) -> élément` reliées par des files bornées.
+
+    `run(éléments)` est un générateur qui rend les éléments traités dans leur
+    ordre d'entrée. Une exception levée par une étape arrête le pipeline et
+    est relevée par le générateur.
+    """
+
+    def __init__(self, stages, queue_size=None):
+        self.stages = stages
+        self.queue_size = queue_size or getattr(settings, 'DETECTION_PIPELINE_QUEUE_SIZE', 2)
+        self.wall_seconds = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _put(q, entry, stop):
+        """Dépose `entry` dans la file bornée, sauf si le pipeline est arrêté."""
+        while not stop.is_set():
+            try:
+                q.put(entry, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _worker(self, index, inbox, outbox, remaining, stop):
+        stage = self.stages[index]
+        while not stop.is_set():
+            try:
+                entry = inbox.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if entry is _DONE:
+                with self._lock:
+                    remaining[index] -= 1
+                    last = remaining[index] == 0
+                if last:
+                    following = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+                    for _ in range(following):
+                        self._put(outbox, _DONE, stop)
+                return
+
+            seq, value = entry
+            if not isinstance(value, _Failure):
+                started = time.perf_counter()
+                try:
+                    value = stage.fn(value)
+                except Exception as e:
+                    value = _Failure(e)
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    stage.items += 1
+                    stage.busy_seconds += elapsed
+            self._put(outbox, (seq, value), stop)
+
+    def _feed(self, items, inbox, stop):
+        try:
+            for seq, item in enumerate(items):
+                if stop.is_set():
+                    return
+                self._put(inbox, (seq, item), stop)
+        except Exception as e:
+            self._put(inbox, (-1, _Failure(e)), stop)
+        for _ in range(self.stages[0].workers):
+            self._put(inbox, _DONE, stop)
+
+    def run(self, items):
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        remaining = [stage.workers for stage in self.stages]
+        stop = threading.Event()
+
+        threads = [threading.Thread(target=self._feed, args=(items, queues[0], stop),
+                                    name='pipeline-feed', daemon=True)]
+        for index, stage in enumerate(self.stages):
+            for w in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._worker, args=(index, queues[index], queues[index + 1], remaining, stop),
+                    name=f'pipeline-{stage.name}-{w}', daemon=True,
+                ))
+
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+
+        try:
+            buffered = {}
+            next_seq = 0
+            while True:
+                entry = queues[-1].get()
+                if entry is _DONE:
+                    break
+                seq, value = entry
+                if isinstance(value, _Failure):
+                    raise value.error
+                buffered[seq] = value
+                # Les étapes à plusieurs workers peuvent désordonner les éléments
+                while next_seq in buffered:
+                    yield buffered.pop(next_seq)
+                    next_seq += 1
+        finally:
+            # Arrêt (fin normale, erreur ou abandon du générateur): les threads
+            # n'attendent jamais plus de 0,1 s sur une file
+            stop.set()
+            for thread in threads:
+                thread.join()
+            self.wall_seconds += time.perf_counter() - start
+
+    def stats(self):
+        """Occupation de chaque étape et goulot d'étranglement."""
+        with self._lock:
+            stages = {
+                stage.name: {
+                    'workers': stage.workers,
+                    'items': stage.items,
+                    'busy_seconds': stage.busy_seconds,
+                    'utilization': (
+                        stage.busy_seconds / (self.wall_seconds * stage.workers) if self.wall_seconds else 0.0
+                    ),
+                }
+                for stage in self.stages
+            }
+        bottleneck = max(stages, key=lambda name: stages[name]['utilization']) if stages else None
+        return {'wall_seconds': self.wall_seconds, 'stages': stages, 'bottleneck': bottleneck}
+
+    def log_stats(self):
+        stats = self.stats()
+        utilization = ', '.join(
+            f"{name} {stage['utilization']:.0%}" for name, stage in stats['stages'].items()
+        )
+        logger.info(f"Pipeline: occupation des étapes {utilization} (goulot: {stats['bottleneck']})")
+
+
+def detection_pipeline(detector, select_plates=None, preprocess_workers=None, queue_size=None):
+    """
+    Pipeline véhicule -> plaques -> prétraitement OCR -> OCR pour un CarDetector.
+
+    Chaque élément est un dict contenant au moins 'frames' (liste d'images);
+    le pipeline y ajoute 'results' (véhicules et plaques lues, comme
+    `analyze_frames`) et 'to_read' (plaques passées à l'OCR).
+
+    `select_plates(élément)` choisit les plaques à lire (toutes par défaut).
+    Il est appelé dans l'ordre des éléments, depuis l'unique thread de
+    l'étape plaques (ex: association aux pistes d'une vidéo).
+    """
+    def vehicle(item):
+        item['staged'] = detector.vehicle_stage(item['frames'])
+        return item
+
+    def plate(item):
+        item['results'] = detector.plate_stage(item['frames'], item.pop('staged'))
+        if select_plates is not None:
+            item['to_read'] = select_plates(item)
+        else:
+            item['to_read'] = [
+                plate for vehicles in item['results'] for vehicle in vehicles for plate in vehicle['plates']
+            ]
+        return item
+
+    def preprocess(item):
+        item['ocr'] = detector.prepare_ocr_batch([plate['image'] for plate in item['to_read']])
+        return item
+
+    def ocr(item):
+        outputs = detector.run_ocr_batch(item.pop('ocr'))
+        for plate, (text, confidence) in zip(item['to_read'], outputs):
+            plate['text'] = text
+            plate['confidence'] = confidence
+        return item
+
+    workers = preprocess_workers or getattr(settings, 'DETECTION_PREPROCESS_WORKERS', 2)
+    return Pipeline([
+        PipelineStage('vehicle', vehicle),
+        PipelineStage('plate', plate),
+        PipelineStage('preprocess', preprocess, workers=workers),
+        PipelineStage('ocr', ocr),
+    ], queue_size=queue_size)
@@ -0,0 +1,141 @@
+"""
+Fusion temporelle des lectures OCR d'une même plaque dans une vidéo.
+
+Les plaques détectées sur les images successives sont regroupées en pistes
+(une piste = une plaque physique) par recouvrement des boîtes, après
+prédiction du déplacement depuis la dernière observation. Chaque piste vote
+caractère par caractère, pondéré par la confiance OCR, pour produire une
+lecture finale. Une piste dont le vote est stable n'a plus besoin d'OCR.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+
+
+def box_iou(box_a, box_b):
+    """Intersection sur union de deux boîtes [x1, y1, x2, y2]."""
+    inter_w = min(box_a[2], box_b[2]) - max(box_a[0], box_b[0])
+    inter_h = min(box_a[3], box_b[3]) - max(box_a[1], box_b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+class PlateTrack:
+    """Piste d'une plaque physique suivie d'image en image."""
+
+    def __init__(self, track_id, frame_index, bbox):
+        self.track_id = track_id
+        self.bbox = list(bbox)
+        self.last_frame = frame_index
+        self.velocity = [0.0, 0.0, 0.0, 0.0]
+        self.readings = []
+        self.stable = False
+
+    def predict(self, frame_index):
+        """Boîte attendue à l'image `frame_index` selon la vitesse estimée."""
+        gap = frame_index - self.last_frame
+        return [c + v * gap for c, v in zip(self.bbox, self.velocity)]
+
+    def observe(self, frame_index, bbox):
+        gap = frame_index - self.last_frame
+        if gap > 0:
+            self.velocity = [(n - o) / gap for n, o in zip(bbox, self.bbox)]
+        self.bbox = list(bbox)
+        self.last_frame = frame_index
+
+    def add_reading(self, text, confidence, min_readings, stable_ratio):
+        if not text:
+            return
+        self.readings.append((text, max(confidence, 1e-3)))
+        self.stable = self._is_stable(min_readings, stable_ratio)
+
+    def _position_votes(self):
+        """Votes pondérés par position pour la longueur de lecture dominante."""
+        length_weights = defaultdict(float)
+        for text, confidence in self.readings:
+            length_weights[len(text)] += confidence
+        if not length_weights:
+            return []
+        length = max(length_weights, key=length_weights.get)
+
+        votes = [defaultdict(float) for _ in range(length)]
+        for text, confidence in self.readings:
+            if len(text) == length:
+                for position, char in enumerate(text):
+                    votes[position][char] += confidence
+        return votes
+
+    def voted_text(self):
+        """Lecture finale: caractère de poids maximal à chaque position."""
+        return ''.join(max(v, key=v.get) for v in self._position_votes())
+
+    def _is_stable(self, min_readings, stable_ratio):
+        if len(self.readings) < min_readings:
+            return False
+        votes = self._position_votes()
+        return bool(votes) and all(
+            max(v.values()) / sum(v.values()) >= stable_ratio for v in votes
+        )
+
+
+class PlateTracker:
+    """
+    Associe les plaques de chaque image aux pistes existantes.
+
+    Une plaque rejoint la piste dont la boîte prédite la recouvre le plus
+    (IoU >= `min_iou`); sinon une nouvelle piste est créée. Les pistes non
+    observées depuis `max_gap` images sont fermées.
+    """
+
+    def __init__(self, min_iou=None, max_gap=None, min_readings=None, stable_ratio=None):
+        self.min_iou = min_iou if min_iou is not None else getattr(settings, 'DETECTION_TRACK_MIN_IOU', 0.2)
+        self.max_gap = max_gap if max_gap is not None else getattr(settings, 'DETECTION_TRACK_MAX_GAP', 30)
+        self.min_readings = min_readings if min_readings is not None else getattr(settings, 'DETECTION_VOTE_MIN_READINGS', 3)
+        self.stable_ratio = stable_ratio if stable_ratio is not None else getattr(settings, 'DETECTION_VOTE_STABLE_RATIO', 0.7)
+        self.active = []
+        self.tracks = []
+        self.ocr_skipped = 0
+
+    def assign(self, frame_index, bboxes):
+        """Retourne la piste associée à chaque boîte de plaque de l'image."""
+        self.active = [t for t in self.active if frame_index - t.last_frame <= self.max_gap]
+
+        candidates = []
+        for b, bbox in enumerate(bboxes):
+            for track in self.active:
+                iou = box_iou(track.predict(frame_index), bbox)
+                if iou >= self.min_iou:
+                    candidates.append((iou, b, track))
+        candidates.sort(key=lambda c: c[0], reverse=True)
+
+        assigned = [None] * len(bboxes)
+        used = set()
+        for _, b, track in candidates:
+            if assigned[b] is None and track.track_id not in used:
+                assigned[b] = track
+                used.add(track.track_id)
+
+        for b, bbox in enumerate(bboxes):
+            track = assigned[b]
+            if track is None:
+                track = PlateTrack(len(self.tracks), frame_index, bbox)
+                self.tracks.append(track)
+                self.active.append(track)
+                assigned[b] = track
+            else:
+                track.observe(frame_index, bbox)
+        return assigned
+
+    def needs_ocr(self, track):
+        """Indique si une lecture OCR est encore utile pour cette piste."""
+        if track.stable:
+            self.ocr_skipped += 1
+            return False
+        return True
+
+    def add_reading(self, track, text, confidence):
+        track.add_reading(text, confidence, self.min_readings, self.stable_ratio)
@@ -0,0 +1,118 @@
+"""
+Traitements de détection partagés par les vues et les tâches en arrière-plan.
+
+Les images téléversées sont décodées en mémoire et analysées sans passer par
+le disque; l'enregistrement de l'original est une étape séparée
+(`persist_upload`). Les vidéos, lues par OpenCV depuis un fichier, sont
+enregistrées avant l'analyse. Chaque fonction de détection retourne le
+dictionnaire JSON renvoyé au client par `detect_home`.
+"""
+import logging
+
+from django.core.files.base import ContentFile
+from django.urls import reverse
+
+from .artifacts import artifact_url, artifact_writer
+from .metrics import images_total, inc, span
+from .model_registry import model_registry
+from .rendering import annotation_boxes, save_annotations
+from .video import process_video
+
+logger = logging.getLogger(__name__)
+
+
+def read_upload(uploaded_file):
+    """Octets d'un fichier téléversé (une seule copie, assemblée depuis ses morceaux)."""
+    data = b''.join(uploaded_file.chunks())
+    uploaded_file.seek(0)
+    return data
+
+
+def persist_upload(fs, name, data):
+    """Enregistre l'original téléversé dans MEDIA_ROOT; retourne le nom attribué."""
+    with span('persist_upload'):
+        return fs.save(name, ContentFile(data))
+
+
+def detect_image_file(fs, filename, image):
+    """
+    Analyse une image et prépare la réponse JSON.
+
+    `image` est l'image déjà décodée en mémoire (ou, à défaut, son chemin);
+    `filename` est le nom de l'original enregistré, qui sert aussi à nommer les
+    découpes de plaques et les boîtes enregistrées pour le rendu annoté.
+    """
+    # Processus de détection (modèles partagés par le registre du processus)
+    with model_registry.detector() as detector:
+        detection_results = detector.process_detection(image)
+    inc(images_total, kind='image')
+
+    # Traiter les résultats (découpes écrites en arrière-plan)
+    plates_data = []
+    for i, vehicle in enumerate(detection_results):
+        for j, plate in enumerate(vehicle['plates']):
+            # Sauvegarder l'image de plaque
+            plate_filename = artifact_writer.write('plate', f"plate_{i}_{j}_{filename}", plate['image'])
+
+            plates_data.append({
+                'plate_id': f"{i}_{j}",
+                'plate_image': artifact_url(plate_filename),
+                'plate_text': plate['text'],
+                'confidence': f"{plate['confidence']:.2f}",
+                'vehicle_id': i
+            })
+
+    # Boîtes enregistrées pour le rendu à la demande de l'image annotée
+    boxes = annotation_boxes(detection_results)
+    with span('save_annotations'):
+        save_annotations(filename, boxes)
+
+    # Préparer la réponse
+    return {
+        'original_image': fs.url(filename).lstrip('/'),
+        'processed_image': reverse('detection:render_result', args=[filename]).lstrip('/'),
+        'detections': boxes,
+        'vehicles_detected': len(detection_results),
+        'plates_detected': len(plates_data),
+        'plates': plates_data,
+        'success': True
+    }
+
+
+def detect_video_file(fs, filename, file_path, on_progress=None):
+    """
+    Analyse une vidéo enregistrée et prépare la réponse (une entrée par plaque).
+
+    `on_progress(frames_traitees, frames_attendues)` est appelé après chaque lot.
+    Une réplique du détecteur n'est empruntée que le temps de chaque étape d'un
+    lot: les requêtes d'image ne restent pas bloquées pendant toute la vidéo.
+    """
+    summary = process_video(model_registry.borrowed_detector(), file_path, on_progress=on_progress)
+    inc(images_total, kind='video')
+
+    plates_data = []
+    for i, plate in enumerate(summary['plates']):
+        # Sauvegarder la meilleure découpe de la plaque
+        plate_filename = artifact_writer.write('video_plate', f"plate_video_{i}_{filename}", plate['best_crop'])
+
+        plates_data.append({
+            'plate_id': f"video_{i}",
+            'plate_image': artifact_url(plate_filename),
+            'plate_text': plate['text'],
+            'confidence': f"{plate['best_confidence']:.2f}",
+            'first_frame': plate['first_frame'],
+            'last_frame': plate['last_frame'],
+            'first_time': round(plate['first_time'], 2),
+            'last_time': round(plate['last_time'], 2),
+            'occurrences': plate['occurrences'],
+        })
+
+    return {
+        'original_video': fs.url(filename).lstrip('/'),
+        'frames_processed': summary['frames_processed'],
+        'duration': round(summary['duration'], 2),
+        'processing_time': round(summary['processing_time'], 2),
+        'plates_detected': len(plates_data),
+        'plates': plates_data,
+        'success': True
+    }
@@ -0,0 +1,163 @@
+"""
+Profilage à la demande d'une requête de détection, réservé au personnel.
+
+Un membre du personnel ajoute l'en-tête `X-Detection-Profile: 1` ou le
+paramètre `?profile=1` à un appel de `detect_home` ou `extract_manual_plate`.
+La vue s'exécute alors sous cProfile (profileur déterministe de la
+bibliothèque standard), dans le thread de la requête: la détection n'est ni
+confiée à une tâche en arrière-plan ni servie par le cache de résultats.
+
+Chaque profil est enregistré dans DETECTION_PROFILE_DIR (hors MEDIA_ROOT,
+donc jamais servi publiquement): le fichier `.prof` (pstats, lisible par
+snakeviz ou `python -m pstats`) et un `.json` de métadonnées (vue,
+utilisateur, durée, taille de l'envoi, contexte renseigné par la vue). Seuls
+les DETECTION_PROFILE_KEEP profils les plus récents sont conservés.
+"""
+import os
+import io
+import json
+import time
+import uuid
+import pstats
+import cProfile
+import logging
+import threading
+from functools import wraps
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Detection-Profile'
+
+# cProfile ne supporte qu'un profileur actif à la fois par processus (Python 3.12+)
+_profile_lock = threading.Lock()
+
+
+def profile_dir():
+    return str(getattr(settings, 'DETECTION_PROFILE_DIR', os.path.join(settings.BASE_DIR, 'profiles')))
+
+
+def profiling_requested(request):
+    """Vrai si un membre du personnel demande le profilage de cette requête."""
+    if not getattr(settings, 'DETECTION_PROFILING', True):
+        return False
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated or not user.is_staff:
+        return False
+    flag = request.headers.get(PROFILE_HEADER) or request.GET.get('profile')
+    return flag not in (None, '', '0', 'false')
+
+
+def is_profiling(request):
+    """Vrai pendant l'exécution profilée de la requête (la vue peut alors renseigner `profile_context`)."""
+    return getattr(request, 'profile_context', None) is not None
+
+
+def _response_summary(response):
+    """Volumes de la réponse JSON d'une détection (véhicules, plaques)."""
+    if not response.get('Content-Type', '').startswith('application/json'):
+        return {}
+    try:
+        content = json.loads(response.content)
+    except (ValueError, AttributeError):
+        return {}
+    return {key: content[key] for key in ('vehicles_detected', 'plates_detected') if key in content}
+
+
+def save_profile(profiler, metadata):
+    """Enregistre le profil et ses métadonnées; retourne le nom du profil."""
+    folder = profile_dir()
+    os.makedirs(folder, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}_{metadata['view']}_{uuid.uuid4().hex[:8]}"
+    profiler.dump_stats(os.path.join(folder, f"{name}.prof"))
+    with open(os.path.join(folder, f"{name}.json"), 'w') as f:
+        json.dump(dict(metadata, name=name), f, indent=2)
+    _prune(folder)
+    return name
+
+
+def _prune(folder):
+    """Supprime les profils au-delà des DETECTION_PROFILE_KEEP plus récents."""
+    keep = getattr(settings, 'DETECTION_PROFILE_KEEP', 50)
+    for name in [profile['name'] for profile in recent_profiles()][keep:]:
+        for extension in ('.prof', '.json'):
+            try:
+                os.remove(os.path.join(folder, name + extension))
+            except OSError:
+                pass
+
+
+def recent_profiles(limit=None):
+    """Métadonnées des profils enregistrés, du plus récent au plus ancien."""
+    folder = profile_dir()
+    if not os.path.isdir(folder):
+        return []
+    profiles = []
+    for filename in os.listdir(folder):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(folder, filename)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda profile: profile.get('timestamp', 0), reverse=True)
+    return profiles[:limit] if limit else profiles
+
+
+def profile_path(name):
+    """Chemin du fichier `.prof` d'un profil, ou None (nom inconnu ou invalide)."""
+    if os.path.basename(name) != name:
+        return None
+    path = os.path.join(profile_dir(), f"{name}.prof")
+    return path if os.path.exists(path) else None
+
+
+def profile_text(name, sort='cumulative', limit=60):
+    """Résumé texte (pstats) d'un profil enregistré."""
+    stream = io.StringIO()
+    stats = pstats.Stats(profile_path(name), stream=stream)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def profiled_view(name):
+    """
+    Décorateur de vue: exécute la requête sous cProfile si le personnel le
+    demande (voir `profiling_requested`) et ajoute l'en-tête
+    `X-Detection-Profile: <nom>` à la réponse.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not profiling_requested(request):
+                return view(request, *args, **kwargs)
+
+            if not _profile_lock.acquire(blocking=False):
+                logger.warning(f"Profilage de {name} ignoré: un autre profil est en cours")
+                return view(request, *args, **kwargs)
+            try:
+                request.profile_context = {}
+                profiler = cProfile.Profile()
+                start = time.perf_counter()
+                response = profiler.runcall(view, request, *args, **kwargs)
+                duration = time.perf_counter() - start
+            finally:
+                _profile_lock.release()
+
+            profile_name = save_profile(profiler, {
+                'view': name,
+                'user': request.user.get_username(),
+                'timestamp': time.time(),
+                'duration': duration,
+                'status': response.status_code,
+                'request_bytes': int(request.META.get('CONTENT_LENGTH') or 0),
+                'context': request.profile_context,
+                **_response_summary(response),
+            })
+            logger.info(f"Profil {profile_name} enregistré ({name}, {duration:.2f} s)")
+            response[PROFILE_HEADER] = profile_name
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,232 @@
+"""
+Mode INT8 quantifié des modèles YOLO, avec garde-fou de précision.
+
+Un modèle est quantifié (quantification statique ONNX Runtime) à partir de
+son export ONNX, calibré sur un dossier local d'images. Le modèle quantifié
+est ensuite comparé au modèle flottant: rappel des boîtes et concordance des
+plaques lues. Il n'est activé que si la perte reste sous
+DETECTION_QUANTIZATION_MAX_ACCURACY_DROP; le verdict est enregistré dans un
+rapport JSON à côté du modèle.
+
+La quantification produit un fichier candidat temporaire: il ne remplace le
+modèle INT8 en place (et son rapport) qu'après avoir passé le garde-fou. Un
+modèle refusé laisse intact le modèle précédemment accepté.
+"""
+import os
+import json
+import logging
+import tempfile
+
+import cv2
+import numpy as np
+from django.conf import settings
+
+from . import backends
+from .benchmark import without_ocr_cache
+from .plate_tracker import box_iou
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAMES = ('vehicle', 'plate', 'ocr')
+
+
+def quantized_path(weights_path):
+    root, _ = os.path.splitext(os.fspath(weights_path))
+    return f"{root}.int8.onnx"
+
+
+def report_path(weights_path):
+    root, _ = os.path.splitext(os.fspath(weights_path))
+    return f"{root}.int8.json"
+
+
+def rejected_report_path(weights_path):
+    root, _ = os.path.splitext(os.fspath(weights_path))
+    return f"{root}.int8.rejected.json"
+
+
+def _weights_signature(weights_path):
+    stat = os.stat(weights_path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def read_report(weights_path):
+    """Rapport de validation du modèle quantifié, ou None."""
+    try:
+        with open(report_path(weights_path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_enabled(weights_path):
+    """
+    Vrai si le modèle quantifié existe, a passé le garde-fou de précision et
+    correspond toujours aux poids actuels.
+    """
+    report = read_report(weights_path)
+    return bool(
+        report
+        and report.get('accepted')
+        and report.get('weights_signature') == _weights_signature(weights_path)
+        and os.path.exists(quantized_path(weights_path))
+    )
+
+
+def resolve_quantized_path(weights_path):
+    """Chemin du modèle INT8 validé, ou None (retour au modèle flottant)."""
+    if is_enabled(weights_path):
+        return quantized_path(weights_path)
+    logger.warning(
+        f"Modèle INT8 non validé pour {os.path.basename(weights_path)}, "
+        f"utilisation du modèle flottant"
+    )
+    return None
+
+
+def _letterbox(image, size=640):
+    """Redimensionne avec bandes (comme ultralytics) et retourne un tenseur NCHW."""
+    h, w = image.shape[:2]
+    scale = min(size / h, size / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+    top, left = (size - new_h) // 2, (size - new_w) // 2
+    canvas[top:top + new_h, left:left + new_w] = resized
+    tensor = canvas[:, :, ::-1].transpose(2, 0, 1).astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor[None])
+
+
+class ImageCalibrationReader:
+    """Lecteur de calibration ONNX Runtime à partir d'images BGR."""
+
+    def __init__(self, input_name, images, size=640):
+        self._items = iter([{input_name: _letterbox(img, size)} for img in images])
+
+    def get_next(self):
+        return next(self._items, None)
+
+
+def quantize_model(weights_path, calibration_images):
+    """
+    Quantifie en INT8 l'export ONNX de `weights_path` dans un fichier candidat
+    temporaire et retourne son chemin (installé par `validate` s'il est accepté).
+    """
+    import onnxruntime
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    fp32_path = backends.resolve_model_path(weights_path, backends.ONNX)
+    input_name = onnxruntime.InferenceSession(
+        fp32_path, providers=['CPUExecutionProvider']
+    ).get_inputs()[0].name
+
+    root, _ = os.path.splitext(os.fspath(weights_path))
+    fd, target = tempfile.mkstemp(dir=os.path.dirname(root), prefix=f"{os.path.basename(root)}.int8.",
+                                  suffix='.candidate.onnx')
+    os.close(fd)
+    quantize_static(
+        fp32_path,
+        target,
+        ImageCalibrationReader(input_name, calibration_images),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    logger.info(f"Modèle INT8 candidat créé: {target} ({len(calibration_images)} images de calibration)")
+    return target
+
+
+def calibration_inputs(detector, images, limit=200):
+    """
+    Entrées de calibration de chaque modèle, produites par le modèle flottant.
+
+    véhicule: images complètes; plaque: découpes de véhicules;
+    OCR: plaques prétraitées comme en production.
+    """
+    inputs = {'vehicle': [], 'plate': [], 'ocr': []}
+    for image in images:
+        inputs['vehicle'].append(image)
+        crops = detector._vehicle_crops(image, detector.detect_vehicles(image))
+        inputs['plate'].extend(crop[3] for crop in crops)
+        for vehicles in detector.locate_plates([image]):
+            for vehicle in vehicles:
+                for plate in vehicle['plates']:
+                    processed = detector.preprocess_plate_for_ocr(plate['image'])
+                    if processed is not None:
+                        inputs['ocr'].append(processed)
+    return {name: values[:limit] for name, values in inputs.items()}
+
+
+def _box_recall(reference_boxes, candidate_boxes, min_iou=0.5):
+    """Part des boîtes de référence retrouvées par le modèle candidat."""
+    if not reference_boxes:
+        return 1.0
+    found = sum(
+        1 for ref in reference_boxes
+        if any(box_iou(ref, cand) >= min_iou for cand in candidate_boxes)
+    )
+    return found / len(reference_boxes)
+
+
+def evaluate(reference, candidate, images):
+    """
+    Compare deux détecteurs sur des images.
+
+    Retourne le rappel des boîtes de plaques et la concordance des plaques
+    lues (textes identiques, image par image). Le cache OCR est désactivé sur
+    les deux détecteurs: partagé, il servirait au candidat les lectures de la
+    référence.
+    """
+    ref_boxes, cand_boxes = [], []
+    agreements = 0
+    for image in images:
+        with without_ocr_cache(reference, candidate):
+            ref = reference.analyze_frames([image])[0]
+            cand = candidate.analyze_frames([image])[0]
+        ref_plates = [p for v in ref for p in v['plates']]
+        cand_plates = [p for v in cand for p in v['plates']]
+        ref_boxes.append([p['bbox'] for p in ref_plates])
+        cand_boxes.append([p['bbox'] for p in cand_plates])
+        if sorted(p['text'] for p in ref_plates) == sorted(p['text'] for p in cand_plates):
+            agreements += 1
+
+    recalls = [_box_recall(r, c) for r, c in zip(ref_boxes, cand_boxes)]
+    return {
+        'box_recall': sum(recalls) / len(recalls) if recalls else 1.0,
+        'plate_string_agreement': agreements / len(images) if images else 1.0,
+        'images': len(images),
+    }
+
+
+def validate(weights_path, metrics, max_drop=None, candidate=None):
+    """
+    Applique le garde-fou de précision et enregistre le rapport JSON.
+
+    Accepté, le modèle `candidate` (produit par `quantize_model`) remplace le
+    modèle INT8 en place avant l'écriture du rapport. Refusé, il est supprimé
+    et le rapport est écrit à part (`.int8.rejected.json`), sans toucher au
+    modèle précédemment accepté.
+    """
+    if max_drop is None:
+        max_drop = getattr(settings, 'DETECTION_QUANTIZATION_MAX_ACCURACY_DROP', 0.02)
+    accuracy_drop = max(1.0 - metrics['box_recall'], 1.0 - metrics['plate_string_agreement'])
+    report = {
+        **metrics,
+        'accuracy_drop': accuracy_drop,
+        'max_accuracy_drop': max_drop,
+        'accepted': accuracy_drop <= max_drop,
+        'weights_signature': _weights_signature(weights_path),
+    }
+    if report['accepted'] and candidate is not None:
+        os.replace(candidate, quantized_path(weights_path))
+    elif candidate is not None:
+        os.remove(candidate)
+    target = report_path(weights_path) if report['accepted'] else rejected_report_path(weights_path)
+    with open(target, 'w') as f:
+        json.dump(report, f, indent=2)
+    if not report['accepted']:
+        logger.warning(
+            f"Modèle INT8 refusé pour {os.path.basename(weights_path)}: "
+            f"perte {accuracy_drop:.3f} > {max_drop:.3f}"
+        )
+    return report
@@ -0,0 +1,178 @@
+"""
+Garde-fou précision / latence du CarDetector sur un corpus de plaques étiqueté.
+
+Le corpus est un dossier d'images accompagné de `labels.json` (format de
+`generate_synthetic_plates`: une entrée par image avec 'image' et 'text', ou
+'plates' pour plusieurs plaques). Chaque image passe par les étapes de
+production (`benchmark.detailed_stage_timings`), sans cache OCR. Le rapport
+donne le taux de plaques lues exactement, le taux d'erreur par caractère (CER),
+la précision des lectures (les lectures sans plaque attendue sont des faux
+positifs) et les temps par étape; `compare()` le confronte à un rapport de référence
+enregistré et liste les dépassements de budget.
+"""
+import os
+import json
+
+import cv2
+from django.conf import settings
+
+from .benchmark import DETAILED_STAGES, detailed_stage_timings, percentiles, without_ocr_cache
+
+
+def load_corpus(folder):
+    """Liste de (nom, image BGR, textes attendus) du corpus `folder`."""
+    with open(os.path.join(folder, 'labels.json')) as f:
+        labels = json.load(f)
+    samples = labels['samples'] if isinstance(labels, dict) else labels
+
+    corpus = []
+    for sample in samples:
+        image = cv2.imread(os.path.join(folder, sample['image']))
+        if image is None:
+            continue
+        expected = sample.get('plates') or [sample['text']]
+        corpus.append((sample['image'], image, list(expected)))
+    return corpus
+
+
+def generated_corpus(count, seed=0, **options):
+    """Corpus synthétique (voir `synthetic.generate_corpus`) au format de `load_corpus`."""
+    from .synthetic import generate_corpus
+
+    return [
+        (f"sample_{i:04d}", sample['image'], [sample['text']])
+        for i, sample in enumerate(generate_corpus(count, seed=seed, **options))
+    ]
+
+
+def edit_distance(a, b):
+    """Distance de Levenshtein entre deux chaînes."""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def match_plates(expected, predicted):
+    """
+    Associe les plaques attendues aux lectures, paires les plus proches d'abord.
+
+    Retourne une liste de (attendu, lu ou "") dans l'ordre des plaques
+    attendues, suivie des lectures restées sans plaque attendue ("", lu).
+    """
+    candidates = sorted(
+        (edit_distance(text, read), i, j)
+        for i, text in enumerate(expected) for j, read in enumerate(predicted)
+    )
+    reads = [""] * len(expected)
+    used_expected, used_predicted = set(), set()
+    for _, i, j in candidates:
+        if i in used_expected or j in used_predicted:
+            continue
+        reads[i] = predicted[j]
+        used_expected.add(i)
+        used_predicted.add(j)
+    extra = [("", read) for j, read in enumerate(predicted) if j not in used_predicted]
+    return list(zip(expected, reads)) + extra
+
+
+def evaluate(detector, corpus):
+    """Rapport de précision (exact, CER, précision des lectures) et de latence (p50/p95 par étape) du corpus."""
+    with without_ocr_cache(detector):
+        samples = {stage: [] for stage in DETAILED_STAGES}
+        totals = []
+        plates = exact = errors = characters = reads = false_positives = 0
+        failures = []
+        for name, image, expected in corpus:
+            texts, timings, _, _ = detailed_stage_timings(detector, image)
+            for stage, value in timings.items():
+                samples[stage].append(value)
+            totals.append(sum(timings.values()))
+
+            reads += len(texts)
+            for wanted, read in match_plates(expected, texts):
+                # Lecture sans plaque attendue: faux positif, ses caractères comptent comme insertions
+                if wanted:
+                    plates += 1
+                    exact += wanted == read
+                    characters += len(wanted)
+                else:
+                    false_positives += 1
+                errors += edit_distance(wanted, read)
+                if wanted != read:
+                    failures.append({'image': name, 'expected': wanted, 'read': read})
+
+    return {
+        'images': len(corpus),
+        'plates': plates,
+        'exact_match_rate': exact / plates if plates else 0.0,
+        'char_error_rate': errors / characters if characters else 0.0,
+        'reads': reads,
+        'false_positives': false_positives,
+        'precision': exact / reads if reads else 0.0,
+        'stages': {stage: percentiles(values, (50, 95)) for stage, values in samples.items()},
+        'total': percentiles(totals, (50, 95)),
+        'mismatches': failures,
+    }
+
+
+def budgets():
+    """Écarts tolérés par rapport à la référence (réglages DETECTION_REGRESSION_*)."""
+    return {
+        'max_accuracy_drop': getattr(settings, 'DETECTION_REGRESSION_MAX_ACCURACY_DROP', 0.01),
+        'max_cer_increase': getattr(settings, 'DETECTION_REGRESSION_MAX_CER_INCREASE', 0.01),
+        'max_precision_drop': getattr(settings, 'DETECTION_REGRESSION_MAX_PRECISION_DROP', 0.01),
+        'max_latency_increase': getattr(settings, 'DETECTION_REGRESSION_MAX_LATENCY_INCREASE', 0.2),
+    }
+
+
+def compare(report, baseline, limits=None):
+    """
+    Liste des dépassements de budget du rapport face à la référence (vide = OK).
+
+    La latence est comparée sur le p95 de chaque étape et du total, en
+    proportion de la référence.
+    """
+    limits = limits or budgets()
+    problems = []
+
+    drop = baseline['exact_match_rate'] - report['exact_match_rate']
+    if drop > limits['max_accuracy_drop']:
+        problems.append(
+            f"plaques exactes: {report['exact_match_rate']:.1%} contre {baseline['exact_match_rate']:.1%} "
+            f"(baisse {drop:.1%} > {limits['max_accuracy_drop']:.1%})"
+        )
+
+    # Référence antérieure à la mesure de la précision: pas de comparaison
+    if 'precision' in baseline:
+        drop = baseline['precision'] - report['precision']
+        if drop > limits['max_precision_drop']:
+            problems.append(
+                f"précision des lectures: {report['precision']:.1%} contre {baseline['precision']:.1%} "
+                f"(baisse {drop:.1%} > {limits['max_precision_drop']:.1%}, "
+                f"{report['false_positives']} faux positif(s))"
+            )
+
+    rise = report['char_error_rate'] - baseline['char_error_rate']
+    if rise > limits['max_cer_increase']:
+        problems.append(
+            f"CER: {report['char_error_rate']:.2%} contre {baseline['char_error_rate']:.2%} "
+            f"(hausse {rise:.2%} > {limits['max_cer_increase']:.2%})"
+        )
+
+    latencies = dict(report['stages'], total=report['total'])
+    reference = dict(baseline['stages'], total=baseline['total'])
+    for stage, values in latencies.items():
+        before, after = (reference.get(stage) or {}).get('p95'), values.get('p95')
+        if not before or after is None:
+            continue
+        increase = after / before - 1
+        if increase > limits['max_latency_increase']:
+            problems.append(
+                f"latence p95 '{stage}': {after * 1000:.1f} ms contre {before * 1000:.1f} ms "
+                f"(+{increase:.0%} > +{limits['max_latency_increase']:.0%})"
+            )
+    return problems
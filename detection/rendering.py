@@ -0,0 +1,121 @@
+"""
+Rendu à la demande de l'image annotée d'une détection.
+
+La détection ne produit que des boîtes structurées, enregistrées à côté de
+l'original (`result_<fichier>.json`). L'image annotée n'est dessinée, encodée
+et mise en cache sur le disque que lorsqu'un client la demande, à la largeur
+et au format voulus: le coût de l'annotation sort du chemin de la détection.
+"""
+import os
+import json
+import time
+import threading
+import logging
+
+import cv2
+from django.conf import settings
+
+from .artifacts import artifact_writer, encode_params, write_atomic
+from .metrics import span
+
+logger = logging.getLogger(__name__)
+
+_render_lock = threading.Lock()
+
+
+def annotation_boxes(detection_results):
+    """Boîtes des véhicules et des plaques, sans les découpes (sérialisables en JSON)."""
+    return [
+        {
+            'vehicle_bbox': [int(v) for v in vehicle['vehicle_bbox']],
+            'mode': vehicle.get('mode', 'vehicle'),
+            'plates': [
+                {'bbox': [int(v) for v in plate['bbox']], 'text': plate['text']}
+                for plate in vehicle['plates']
+            ],
+        }
+        for vehicle in detection_results
+    ]
+
+
+def annotations_path(filename):
+    return os.path.join(settings.MEDIA_ROOT, f"result_{filename}.json")
+
+
+def save_annotations(filename, boxes):
+    with open(annotations_path(filename), 'w') as f:
+        json.dump(boxes, f)
+
+
+def load_annotations(filename):
+    """Boîtes enregistrées pour l'original `filename`, ou None."""
+    try:
+        with open(annotations_path(filename)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def draw_annotations(image, boxes):
+    """Retourne une copie de l'image annotée avec les véhicules et les plaques."""
+    result_image = image.copy()
+    for i, vehicle in enumerate(boxes):
+        # En mode direct, le « véhicule » est l'image entière: pas de cadre
+        if vehicle.get('mode') != 'direct':
+            x1, y1, x2, y2 = vehicle['vehicle_bbox']
+            cv2.rectangle(result_image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.putText(result_image, f'Vehicle {i+1}', (x1, y1-10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+
+        for plate in vehicle['plates']:
+            abs_x1, abs_y1, abs_x2, abs_y2 = plate['bbox']
+            cv2.rectangle(result_image, (abs_x1, abs_y1), (abs_x2, abs_y2), (0, 0, 255), 2)
+
+            display_text = plate['text'] if plate['text'] else "N/A"
+            cv2.putText(result_image, display_text, (abs_x1, abs_y1 - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
+    return result_image
+
+
+def rendered_filename(filename, width, fmt):
+    """Nom du rendu en cache, clé sur le nom complet de l'original (foo.jpg et foo.png restent distincts)."""
+    return f"result_{filename}_{width or 'full'}.{fmt}"
+
+
+def render_annotated(filename, width=None, fmt='jpg'):
+    """
+    Chemin de l'image annotée de `filename` (rendue au premier appel, puis en cache).
+
+    `width` réduit l'image (jamais d'agrandissement). Retourne None si
+    l'original ou ses boîtes sont introuvables.
+    """
+    output_path = os.path.join(settings.MEDIA_ROOT, rendered_filename(filename, width, fmt))
+    if os.path.exists(output_path):
+        return output_path
+
+    with _render_lock:
+        if os.path.exists(output_path):
+            return output_path
+
+        boxes = load_annotations(filename)
+        image = cv2.imread(os.path.join(settings.MEDIA_ROOT, filename))
+        if boxes is None or image is None:
+            return None
+
+        with span('render'):
+            result_image = draw_annotations(image, boxes)
+            height, original_width = result_image.shape[:2]
+            if width and width < original_width:
+                size = (width, max(1, round(height * width / original_width)))
+                result_image = cv2.resize(result_image, size, interpolation=cv2.INTER_AREA)
+
+        start = time.perf_counter()
+        ok, encoded = cv2.imencode(f'.{fmt}', result_image, encode_params(fmt))
+        if not ok:
+            logger.error(f"Échec de l'encodage {fmt} de l'image annotée: {filename}")
+            return None
+        artifact_writer.record('render', encoded.nbytes, time.perf_counter() - start)
+
+        # Écriture atomique: une requête concurrente ne lit jamais un fichier partiel
+        write_atomic(output_path, encoded.tobytes())
+        return output_path
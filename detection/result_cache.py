@@ -0,0 +1,138 @@
+"""
+Cache des résultats de détection indexé par le contenu du fichier téléversé.
+
+Les agents renvoient souvent la même photo depuis la tablette du poste de
+contrôle. La clé combine l'empreinte SHA-256 des octets reçus et la version
+des modèles (poids, moteur, mode INT8, tailles d'entrée, découpage en tuiles,
+mode de recherche des plaques): un changement de modèle invalide donc le
+cache. L'éviction est de type LRU, bornée par le nombre d'entrées.
+"""
+import os
+import hashlib
+import threading
+import logging
+from collections import OrderedDict
+from urllib.parse import unquote
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def detection_version_key():
+    """Empreinte de la configuration des modèles influant sur les résultats."""
+    from .car_detector import model_weight_paths
+
+    parts = []
+    for name, path in sorted(model_weight_paths().items()):
+        try:
+            stat = os.stat(path)
+            parts.append(f"{name}:{stat.st_mtime_ns}:{stat.st_size}")
+        except OSError:
+            parts.append(f"{name}:absent")
+    for setting in ('DETECTION_INFERENCE_BACKEND', 'DETECTION_QUANTIZED_MODELS',
+                    'DETECTION_STAGE_IMGSZ', 'DETECTION_TILING_MIN_SIDE', 'DETECTION_TILE_SIZE',
+                    'DETECTION_TILE_OVERLAP', 'DETECTION_PLATE_MODE', 'DETECTION_DIRECT_MIN_PLATE_RATIO'):
+        parts.append(f"{setting}={getattr(settings, setting, None)!r}")
+    return hashlib.sha256('|'.join(parts).encode()).hexdigest()[:16]
+
+
+def content_key(uploaded_file):
+    """
+    Clé de cache d'un fichier téléversé (contenu + version des modèles).
+
+    Accepte le fichier téléversé ou ses octets déjà lus en mémoire.
+    """
+    digest = hashlib.sha256()
+    if isinstance(uploaded_file, (bytes, bytearray, memoryview)):
+        digest.update(uploaded_file)
+    else:
+        for chunk in uploaded_file.chunks():
+            digest.update(chunk)
+        uploaded_file.seek(0)
+    return f"{digest.hexdigest()}:{detection_version_key()}"
+
+
+class ResultCache:
+    """Cache LRU en mémoire (par processus) des réponses JSON de détection."""
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _capacity(self):
+        if self.max_entries is not None:
+            return self.max_entries
+        return getattr(settings, 'DETECTION_RESULT_CACHE_SIZE', 256)
+
+    @staticmethod
+    def _files_exist(response):
+        """Vérifie que les fichiers référencés par la réponse existent toujours."""
+        from .artifacts import artifact_writer
+        from .rendering import annotations_path
+
+        media_prefix = settings.MEDIA_URL.strip('/') + '/'
+        media = [response.get('original_image'), response.get('original_video')]
+        files = [
+            os.path.join(settings.MEDIA_ROOT, unquote(path[len(media_prefix):] if path.startswith(media_prefix) else path))
+            for path in filter(None, media)
+        ]
+        # L'image annotée est rendue à la demande: ses boîtes doivent être présentes
+        if response.get('original_image'):
+            files.append(annotations_path(os.path.basename(files[0])))
+        if not all(os.path.exists(path) for path in files):
+            return False
+        # Découpes servies par detection:artifact (écrites ou en cours d'écriture)
+        return all(
+            artifact_writer.exists(unquote(plate['plate_image'].rstrip('/').rsplit('/', 1)[-1]))
+            for plate in response.get('plates', []) if plate.get('plate_image')
+        )
+
+    def get(self, key):
+        """Réponse mise en cache pour `key`, ou None."""
+        with self._lock:
+            response = self._entries.get(key)
+            if response is not None and not self._files_exist(response):
+                del self._entries[key]
+                response = None
+            if response is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def put(self, key, response):
+        capacity = self._capacity()
+        if capacity <= 0:
+            return
+        with self._lock:
+            self._entries[key] = response
+            self._entries.move_to_end(key)
+            while len(self._entries) > capacity:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self._capacity(),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Cache unique du processus
+result_cache = ResultCache()
@@ -0,0 +1,180 @@
+"""
+Générateur d'images synthétiques de plaques congolaises (corpus étiqueté hors ligne).
+
+Les bancs d'essai et la CI ne peuvent pas utiliser de photos réelles de
+citoyens. Ce module dessine des plaques au format `congolese_plate_pattern`
+(4 chiffres, 2 lettres, 2 chiffres, préfixe « CGO » facultatif), les dégrade
+(flou, perspective, bruit, éclairage) et les incruste sur un fond imitant un
+véhicule, à une taille contrôlée. Chaque échantillon porte son texte attendu
+(sans le préfixe, comme le rend l'OCR) et la boîte de la plaque.
+"""
+import string
+
+import cv2
+import numpy as np
+
+PLATE_ASPECT = 4.5  # largeur / hauteur d'une plaque
+
+DEFAULT_OPTIONS = {
+    'prefix_probability': 0.3,
+    'blur': 1.0,          # sigma maximal du flou gaussien (pixels de plaque)
+    'perspective': 0.08,  # déplacement maximal des coins (fraction de la taille)
+    'noise': 6.0,         # écart-type maximal du bruit gaussien (niveaux de gris)
+    'lighting': 0.3,      # variation maximale de gain et dégradé d'éclairage
+    'plate_width': (120, 240),
+    'image_size': (1280, 960),
+}
+
+
+def random_plate_text(rng, prefix_probability=0.3):
+    """
+    Tire un numéro de plaque: (texte affiché, texte attendu).
+
+    Le texte affiché peut porter le préfixe « CGO »; le texte attendu est le
+    numéro seul (0000AA00), tel que retourné par le CarDetector.
+    """
+    digits = ''.join(rng.choice(list(string.digits), 4))
+    letters = ''.join(rng.choice(list(string.ascii_uppercase), 2))
+    suffix = ''.join(rng.choice(list(string.digits), 2))
+    label = f"{digits}{letters}{suffix}"
+    shown = f"{digits} {letters} {suffix}"
+    if rng.random() < prefix_probability:
+        shown = f"CGO {shown}"
+    return shown, label
+
+
+def render_plate(text, width=480):
+    """Dessine une plaque nette (fond clair, bordure et caractères noirs)."""
+    height = int(width / PLATE_ASPECT)
+    plate = np.full((height, width, 3), 235, dtype=np.uint8)
+    border = max(2, height // 16)
+    cv2.rectangle(plate, (border, border), (width - border - 1, height - border - 1), (20, 20, 20), border)
+
+    font = cv2.FONT_HERSHEY_DUPLEX
+    thickness = max(2, height // 12)
+    (text_w, text_h), _ = cv2.getTextSize(text, font, 1.0, thickness)
+    scale = min((width - 6 * border) / text_w, (height * 0.6) / text_h)
+    (text_w, text_h), _ = cv2.getTextSize(text, font, scale, thickness)
+    origin = ((width - text_w) // 2, (height + text_h) // 2)
+    cv2.putText(plate, text, origin, font, scale, (15, 15, 15), thickness, cv2.LINE_AA)
+    return plate
+
+
+def apply_perspective(image, strength, rng):
+    """Déforme l'image en déplaçant ses coins d'au plus `strength` de sa taille."""
+    if strength <= 0:
+        return image
+    height, width = image.shape[:2]
+    src = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+    jitter = rng.uniform(-strength, strength, (4, 2)) * [width, height]
+    dst = np.float32(src + jitter)
+    matrix = cv2.getPerspectiveTransform(src, dst)
+    return cv2.warpPerspective(image, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE)
+
+
+def apply_blur(image, sigma):
+    if sigma <= 0:
+        return image
+    return cv2.GaussianBlur(image, (0, 0), sigmaX=sigma)
+
+
+def apply_noise(image, sigma, rng):
+    if sigma <= 0:
+        return image
+    noisy = image.astype(np.float32) + rng.normal(0, sigma, image.shape)
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+def apply_lighting(image, amount, rng):
+    """Gain global et dégradé horizontal (ombre ou reflet) d'amplitude `amount`."""
+    if amount <= 0:
+        return image
+    height, width = image.shape[:2]
+    gain = 1 + rng.uniform(-amount, amount)
+    gradient = np.linspace(1 - amount / 2, 1 + amount / 2, width, dtype=np.float32)
+    if rng.random() < 0.5:
+        gradient = gradient[::-1]
+    lit = image.astype(np.float32) * gain * gradient[np.newaxis, :, np.newaxis]
+    return np.clip(lit, 0, 255).astype(np.uint8)
+
+
+def vehicle_background(width, height, rng):
+    """
+    Fond imitant une scène de rue: chaussée, carrosserie, vitres et roues.
+
+    Retourne (image, (x, y)) où (x, y) est le centre de l'emplacement de plaque
+    (bas de la carrosserie).
+    """
+    sky = rng.integers(120, 200)
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    image[:] = np.linspace(sky, 60, height, dtype=np.uint8)[:, np.newaxis, np.newaxis]
+
+    body_color = tuple(int(c) for c in rng.integers(30, 220, 3))
+    body_w = int(width * rng.uniform(0.45, 0.75))
+    body_h = int(body_w * rng.uniform(0.45, 0.6))
+    x1 = int(rng.integers(0, max(1, width - body_w)))
+    y1 = int(min(height - body_h - 1, height * rng.uniform(0.25, 0.45)))
+    x2, y2 = x1 + body_w, y1 + body_h
+    cv2.rectangle(image, (x1, y1), (x2, y2), body_color, -1)
+    cv2.rectangle(image, (x1 + body_w // 8, y1 - body_h // 3), (x2 - body_w // 8, y1),
+                  tuple(max(0, c - 30) for c in body_color), -1)
+    cv2.rectangle(image, (x1 + body_w // 6, y1 - body_h // 4), (x2 - body_w // 6, y1 - body_h // 20),
+                  (70, 60, 50), -1)
+    wheel = max(4, body_h // 5)
+    for cx in (x1 + body_w // 5, x2 - body_w // 5):
+        cv2.circle(image, (cx, y2), wheel, (15, 15, 15), -1)
+    return image, ((x1 + x2) // 2, y2 - body_h // 4)
+
+
+def composite(background, plate, center, plate_width):
+    """Incruste la plaque redimensionnée à `plate_width`; retourne (image, bbox)."""
+    image = background.copy()
+    plate_height = max(1, int(plate_width * plate.shape[0] / plate.shape[1]))
+    resized = cv2.resize(plate, (plate_width, plate_height), interpolation=cv2.INTER_AREA)
+
+    height, width = image.shape[:2]
+    x1 = int(np.clip(center[0] - plate_width // 2, 0, width - plate_width))
+    y1 = int(np.clip(center[1] - plate_height // 2, 0, height - plate_height))
+    image[y1:y1 + plate_height, x1:x1 + plate_width] = resized
+    return image, [x1, y1, x1 + plate_width, y1 + plate_height]
+
+
+def generate_sample(rng, **options):
+    """
+    Un échantillon étiqueté: {'image', 'plate_image', 'text', 'shown_text', 'bbox'}.
+
+    `options` complète DEFAULT_OPTIONS (flou, perspective, bruit, éclairage,
+    largeur de plaque (min, max) et taille d'image (largeur, hauteur)).
+    """
+    options = {**DEFAULT_OPTIONS, **options}
+    shown, label = random_plate_text(rng, options['prefix_probability'])
+
+    plate = render_plate(shown)
+    plate = apply_perspective(plate, rng.uniform(0, options['perspective']), rng)
+    plate = apply_lighting(plate, rng.uniform(0, options['lighting']), rng)
+
+    image_w, image_h = options['image_size']
+    min_w, max_w = options['plate_width']
+    plate_width = int(min(image_w, rng.integers(min_w, max_w + 1)))
+    background, center = vehicle_background(image_w, image_h, rng)
+    image, bbox = composite(background, plate, center, plate_width)
+
+    # Dégradations de prise de vue, sur l'image entière
+    image = apply_blur(image, rng.uniform(0, options['blur']))
+    image = apply_noise(image, rng.uniform(0, options['noise']), rng)
+
+    x1, y1, x2, y2 = bbox
+    return {
+        'image': image,
+        'plate_image': image[y1:y2, x1:x2],
+        'text': label,
+        'shown_text': shown,
+        'bbox': bbox,
+    }
+
+
+def generate_corpus(count, seed=0, **options):
+    """Produit `count` échantillons reproductibles (même graine, même corpus)."""
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        yield generate_sample(rng, **options)
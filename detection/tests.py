@@ -1,3 +1,860 @@
-from django.test import TestCase
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import cv2
+import numpy as np
+from django.contrib.auth.models import Permission, User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .artifacts import ArtifactWriter
+from .benchmark import DETAILED_STAGES, detailed_stage_timings
+from .car_detector import CarDetector, parse_imgsz
+from .jobs import run_detection_job
+from .metrics import Counter, inc, metrics, span, stage_seconds
+from .model_registry import DetectorPool, DetectorPoolTimeout, ModelRegistry
+from .models import DetectionJob
+from .ocr_cache import OcrCache, plate_fingerprint
+from .pipeline import Pipeline, PipelineStage
+from .plate_tracker import PlateTracker
+from .regression import compare, edit_distance, evaluate, match_plates
+from .rendering import save_annotations
+from .result_cache import ResultCache, content_key
+from .synthetic import render_plate
+from .tiling import merge_detections, tile_origins
+from .views import profile_download, render_result
+
+
+def _use_temporary_media_root(test, **extra_settings):
+    """MEDIA_ROOT temporaire (et réglages supplémentaires) le temps d'un test."""
+    media = tempfile.TemporaryDirectory()
+    test.addCleanup(media.cleanup)
+    settings_override = override_settings(MEDIA_ROOT=media.name, **extra_settings)
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+    return media.name
+
+
+def _agent(username, is_staff=False):
+    """Utilisateur autorisé à lancer des détections."""
+    user = User.objects.create_user(username, password='secret', is_staff=is_staff)
+    user.user_permissions.add(
+        Permission.objects.get(content_type__app_label='detection', codename='add_detection')
+    )
+    return user
+
+
+def _image_upload(name='voiture.png'):
+    _, encoded = cv2.imencode('.png', np.full((60, 80, 3), 127, np.uint8))
+    return SimpleUploadedFile(name, encoded.tobytes(), content_type='image/png')
+
+
+class _StubDetector:
+    """Détecteur factice: aucune détection, mémorise l'image reçue."""
+
+    def __init__(self):
+        self.images = []
+
+    def process_detection(self, image):
+        self.images.append(image)
+        return []
+
+
+def _stub_registry(detector):
+    return SimpleNamespace(detector=lambda: nullcontext(detector))
+
+
+class PlateTrackerTests(SimpleTestCase):
+    def setUp(self):
+        self.tracker = PlateTracker(min_iou=0.2, max_gap=30, min_readings=3, stable_ratio=0.7)
+
+    def test_assign_follows_moving_plate(self):
+        first = self.tracker.assign(0, [[100, 100, 200, 130]])[0]
+        second = self.tracker.assign(1, [[110, 100, 210, 130]])[0]
+        # La vitesse estimée permet de suivre la plaque malgré un saut de deux images
+        third = self.tracker.assign(3, [[130, 100, 230, 130]])[0]
+        self.assertIs(first, second)
+        self.assertIs(first, third)
+        self.assertEqual(len(self.tracker.tracks), 1)
+
+    def test_distant_plate_opens_new_track(self):
+        first = self.tracker.assign(0, [[100, 100, 200, 130]])[0]
+        other = self.tracker.assign(1, [[600, 400, 700, 430]])[0]
+        self.assertIsNot(first, other)
+        self.assertEqual(len(self.tracker.tracks), 2)
+
+    def test_track_closed_after_max_gap(self):
+        tracker = PlateTracker(min_iou=0.2, max_gap=2, min_readings=3, stable_ratio=0.7)
+        first = tracker.assign(0, [[100, 100, 200, 130]])[0]
+        later = tracker.assign(5, [[100, 100, 200, 130]])[0]
+        self.assertIsNot(first, later)
+
+    def test_vote_weighted_by_confidence(self):
+        track = self.tracker.assign(0, [[0, 0, 100, 30]])[0]
+        self.tracker.add_reading(track, '1234AB01', 0.9)
+        self.tracker.add_reading(track, '1234A801', 0.3)
+        self.tracker.add_reading(track, '1234AB01', 0.8)
+        self.assertEqual(track.voted_text(), '1234AB01')
+
+    def test_vote_uses_dominant_length(self):
+        track = self.tracker.assign(0, [[0, 0, 100, 30]])[0]
+        self.tracker.add_reading(track, '1234AB01', 0.9)
+        self.tracker.add_reading(track, '234AB01', 0.5)
+        self.tracker.add_reading(track, '', 1.0)
+        self.assertEqual(track.voted_text(), '1234AB01')
+        self.assertEqual(len(track.readings), 2)
+
+    def test_stable_track_skips_ocr(self):
+        track = self.tracker.assign(0, [[0, 0, 100, 30]])[0]
+        for _ in range(2):
+            self.tracker.add_reading(track, '1234AB01', 0.9)
+        self.assertTrue(self.tracker.needs_ocr(track))
+        self.tracker.add_reading(track, '1234AB01', 0.9)
+        self.assertFalse(self.tracker.needs_ocr(track))
+        self.assertEqual(self.tracker.ocr_skipped, 1)
+
+    def test_disagreeing_readings_stay_unstable(self):
+        track = self.tracker.assign(0, [[0, 0, 100, 30]])[0]
+        for text in ('1234AB01', '1234AB02', '1234AB03'):
+            self.tracker.add_reading(track, text, 0.9)
+        self.assertFalse(track.stable)
+
+    def test_explicit_zero_thresholds_are_kept(self):
+        tracker = PlateTracker(min_iou=0, max_gap=0, min_readings=0, stable_ratio=0)
+        self.assertEqual(
+            (tracker.min_iou, tracker.max_gap, tracker.min_readings, tracker.stable_ratio),
+            (0, 0, 0, 0),
+        )
+
+
+class ParseImgszTests(SimpleTestCase):
+    def test_square(self):
+        self.assertEqual(parse_imgsz(640), 640)
+        self.assertEqual(parse_imgsz('320'), 320)
+
+    def test_rectangular(self):
+        self.assertEqual(parse_imgsz('96x320'), (96, 320))
+        self.assertEqual(parse_imgsz('96X320'), (96, 320))
+        self.assertEqual(parse_imgsz([96, 320]), (96, 320))
+
+
+class _FakeTensor:
+    def __init__(self, values):
+        self.values = np.array(values, dtype=float)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.values
+
+
+class _FakePlateModel:
+    """
+    Modèle de plaques factice: une plaque au centre bas de chaque image. Comme
+    YOLO, un lot d'images de formes différentes change le remplissage, ce qui
+    décale ici la boîte de quelques pixels.
+    """
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, images, **kwargs):
+        self.batches.append([image.shape for image in images])
+        shift = 0 if len({image.shape for image in images}) == 1 else 3
+        results = []
+        for image in images:
+            height, width = image.shape[:2]
+            box = SimpleNamespace(
+                xyxy=[_FakeTensor([width * 0.25 + shift, height * 0.6, width * 0.75, height * 0.8])],
+                conf=[0.9],
+            )
+            results.append(SimpleNamespace(boxes=[box]))
+        return results
+
+
+class PlateBatchTests(SimpleTestCase):
+    def setUp(self):
+        self.detector = CarDetector.__new__(CarDetector)
+        self.detector.plate_model = _FakePlateModel()
+        self.detector.stage_imgsz = {'plate': 640}
+        self.detector.plate_batch_size = 8
+        self.detector._plate_model_lock = threading.Lock()
+
+    def test_batch_matches_single_region(self):
+        regions = [np.zeros(shape, np.uint8) for shape in ((300, 400, 3), (150, 200, 3), (480, 300, 3), (90, 120, 3))]
+        batched = self.detector.detect_plates_batch(regions)
+        single = [self.detector.detect_plates(region) for region in regions]
+        self.assertEqual(batched, single)
+        self.assertEqual(batched[1], [{'bbox': [50, 90, 150, 120], 'confidence': 0.9}])
+
+    def test_regions_of_similar_proportions_share_a_batch(self):
+        regions = [np.zeros(shape, np.uint8) for shape in ((300, 400, 3), (150, 200, 3), (480, 300, 3))]
+        self.detector.detect_plates_batch(regions)
+        self.assertEqual(
+            sorted(self.detector.plate_model.batches),
+            [[(480, 640, 3), (480, 640, 3)], [(640, 400, 3)]],
+        )
+
+
+def _detection(bbox, confidence, tile, class_id=2):
+    return {'bbox': bbox, 'confidence': confidence, 'class_id': class_id, 'tile': tile}
+
+
+class TilingTests(SimpleTestCase):
+    # Image 2000 x 1500 découpée en tuiles de 1280 (recouvrement 0,2)
+    IMAGE_SIZE = (2000, 1500)
+    LEFT = [0, 0, 1280, 1280]
+    RIGHT = [720, 0, 2000, 1280]
+
+    def test_tile_origins_cover_the_axis(self):
+        self.assertEqual(tile_origins(800, 1280, 0.2), [0])
+        self.assertEqual(tile_origins(3000, 1280, 0.2), [0, 1024, 1720])
+
+    def test_distinct_overlapping_vehicles_are_kept(self):
+        # Deux voitures côte à côte (IoU ~0,28): aucune ne doit être supprimée
+        merged = merge_detections([
+            _detection([800, 100, 1200, 400], 0.9, self.LEFT),
+            _detection([1050, 150, 1250, 400], 0.8, self.RIGHT),
+        ], self.IMAGE_SIZE)
+        self.assertEqual([d['bbox'] for d in merged], [[800, 100, 1200, 400], [1050, 150, 1250, 400]])
+
+    def test_duplicate_across_sources_is_suppressed(self):
+        merged = merge_detections([
+            _detection([105, 98, 302, 251], 0.8, None),
+            _detection([100, 100, 300, 250], 0.9, self.LEFT),
+        ], self.IMAGE_SIZE)
+        self.assertEqual(merged, [{'bbox': [100, 100, 300, 250], 'confidence': 0.9, 'class_id': 2}])
+
+    def test_same_source_is_not_suppressed(self):
+        # La NMS du modèle a déjà traité chaque entrée
+        merged = merge_detections([
+            _detection([100, 100, 300, 250], 0.9, self.LEFT),
+            _detection([105, 98, 302, 251], 0.8, self.LEFT),
+        ], self.IMAGE_SIZE)
+        self.assertEqual(len(merged), 2)
+
+    def test_different_classes_are_not_suppressed(self):
+        merged = merge_detections([
+            _detection([100, 100, 300, 250], 0.9, self.LEFT, class_id=2),
+            _detection([105, 98, 302, 251], 0.8, None, class_id=7),
+        ], self.IMAGE_SIZE)
+        self.assertEqual(len(merged), 2)
+
+    def test_vehicle_cut_by_tile_edge_is_merged(self):
+        # La tuile de gauche ne voit que la moitié du véhicule (IoU 0,36 avec la boîte entière)
+        merged = merge_detections([
+            _detection([1100, 200, 1280, 600], 0.9, self.LEFT),
+            _detection([1100, 200, 1600, 600], 0.88, self.RIGHT),
+            _detection([1102, 205, 1598, 598], 0.85, None),
+        ], self.IMAGE_SIZE)
+        self.assertEqual([d['bbox'] for d in merged], [[1100, 200, 1600, 600]])
+
+    def test_distant_vehicle_on_tile_edge_is_kept(self):
+        # Véhicule lointain vu seulement par la tuile: aucune boîte de l'image entière ne le couvre
+        merged = merge_detections([
+            _detection([1260, 900, 1280, 915], 0.6, self.LEFT),
+        ], self.IMAGE_SIZE)
+        self.assertEqual(len(merged), 1)
+
+
+class _FakeVehicleModel:
+    """Modèle véhicule factice: enregistre la forme des entrées de chaque passage."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, images, **kwargs):
+        self.batches.append([image.shape[:2] for image in images])
+        return [SimpleNamespace(boxes=None) for _ in images]
+
+
+class VehicleTilingTests(SimpleTestCase):
+    def test_full_image_is_not_batched_with_its_tiles(self):
+        detector = CarDetector.__new__(CarDetector)
+        detector.vehicle_model = _FakeVehicleModel()
+        detector.stage_imgsz = {'vehicle': 640}
+        detector.tiling_min_side, detector.tile_size, detector.tile_overlap = 1600, 1280, 0.2
+
+        detector.detect_vehicles_batch([np.zeros((1500, 2000, 3), np.uint8)])
+        self.assertEqual(
+            sorted(detector.vehicle_model.batches),
+            [[(1280, 1280)] * 4, [(1500, 2000)]],
+        )
+
+
+class OcrCacheTests(SimpleTestCase):
+    HASH = int('f0' * 32, 16)
+    SHAPE = (5, 20)
+    THUMBNAIL = np.zeros((24, 96), np.uint8)
+
+    def setUp(self):
+        self.cache = OcrCache(max_entries=2, max_distance=4)
+        self.cache.store('ocr', self._fingerprint(self.HASH), ('1234AB01', 0.9))
+
+    def _fingerprint(self, image_hash, shape=SHAPE, thumbnail=THUMBNAIL):
+        return shape, image_hash, thumbnail
+
+    @staticmethod
+    def _crop(text, noise=0.0):
+        plate = cv2.resize(render_plate(text), (160, 35), interpolation=cv2.INTER_AREA)
+        if noise:
+            noisy = plate * 0.9 + 10 + np.random.default_rng(0).normal(0, noise, plate.shape)
+            _, encoded = cv2.imencode('.jpg', np.clip(noisy, 0, 255).astype(np.uint8),
+                                      [cv2.IMWRITE_JPEG_QUALITY, 80])
+            plate = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+        return plate
+
+    def test_exact_and_near_hits(self):
+        self.assertEqual(self.cache.lookup('ocr', self._fingerprint(self.HASH)), ('1234AB01', 0.9))
+        self.assertEqual(self.cache.lookup('ocr', self._fingerprint(self.HASH ^ 0b111)), ('1234AB01', 0.9))
+        self.assertEqual(self.cache.stats()['hits'], 2)
+
+    def test_distant_hash_misses(self):
+        self.assertIsNone(self.cache.lookup('ocr', self._fingerprint(self.HASH ^ 0b11111)))
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_other_token_or_shape_misses(self):
+        self.assertIsNone(self.cache.lookup('autre modèle', self._fingerprint(self.HASH)))
+        self.assertIsNone(self.cache.lookup('ocr', self._fingerprint(self.HASH, shape=(10, 40))))
+
+    def test_different_thumbnail_misses(self):
+        thumbnail = self.THUMBNAIL.copy()
+        thumbnail[8:16, 40:50] = 255
+        self.assertIsNone(self.cache.lookup('ocr', self._fingerprint(self.HASH, thumbnail=thumbnail)))
+
+    def test_plates_one_character_apart_do_not_collide(self):
+        cache = OcrCache(max_entries=16)
+        cache.store('ocr', plate_fingerprint(self._crop('1234 AB 01')), ('1234AB01', 0.9))
+        for text in ('1284 AB 01', '1234 AE 01', '1234 AB 07'):
+            with self.subTest(text=text):
+                self.assertIsNone(cache.lookup('ocr', plate_fingerprint(self._crop(text))))
+        # La même plaque, bruitée et recompressée, reste servie par le cache
+        self.assertEqual(cache.lookup('ocr', plate_fingerprint(self._crop('1234 AB 01', noise=4))), ('1234AB01', 0.9))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.store('ocr', self._fingerprint(1), ('5678CD02', 0.8))
+        self.cache.store('ocr', self._fingerprint(2), ('9012EF03', 0.7))
+        self.assertIsNone(self.cache.lookup('ocr', self._fingerprint(self.HASH)))
+        self.assertIsNone(self.cache.lookup('ocr', self._fingerprint(self.HASH ^ 0b111)))
+        self.assertEqual(self.cache.lookup('ocr', self._fingerprint(2)), ('9012EF03', 0.7))
+
+    def test_threshold_change_rebuilds_index(self):
+        self.cache.max_distance = 0
+        self.assertIsNone(self.cache.lookup('ocr', self._fingerprint(self.HASH ^ 0b1)))
+        self.assertEqual(self.cache.lookup('ocr', self._fingerprint(self.HASH)), ('1234AB01', 0.9))
+
+    def test_clear(self):
+        self.cache.clear()
+        self.assertIsNone(self.cache.lookup('ocr', self._fingerprint(self.HASH)))
+
+
+def _jitter(value):
+    time.sleep(random.random() / 200)
+    return value
+
+
+class PipelineTests(SimpleTestCase):
+    def test_preserves_input_order(self):
+        pipeline = Pipeline([
+            PipelineStage('a', lambda x: x + 1),
+            PipelineStage('b', _jitter, workers=3),
+            PipelineStage('c', lambda x: x * 2),
+        ], queue_size=2)
+        self.assertEqual(list(pipeline.run(range(50))), [(i + 1) * 2 for i in range(50)])
+        self.assertEqual(pipeline.stats()['stages']['b']['items'], 50)
+
+    def test_stage_error_is_raised(self):
+        def fail_on_five(value):
+            if value == 5:
+                raise ValueError('étape')
+            return value
+
+        pipeline = Pipeline([PipelineStage('a', fail_on_five), PipelineStage('b', _jitter, workers=2)], queue_size=2)
+        with self.assertRaises(ValueError):
+            list(pipeline.run(range(100)))
+
+    def test_feed_error_is_raised(self):
+        def items():
+            yield 1
+            raise KeyError('source')
+
+        pipeline = Pipeline([PipelineStage('a', _jitter)], queue_size=2)
+        with self.assertRaises(KeyError):
+            list(pipeline.run(items()))
+
+    def test_abandoned_run_stops_threads(self):
+        pipeline = Pipeline([PipelineStage('a', _jitter, workers=2)], queue_size=2)
+        results = pipeline.run(range(100))
+        self.assertEqual(next(results), 0)
+        results.close()
+        self.assertGreater(pipeline.wall_seconds, 0)
+
+
+class _FakeDetectorPool(DetectorPool):
+    """Pool sans modèles: chaque réplique est un simple objet numéroté."""
+
+    def _create(self, replica):
+        return SimpleNamespace(replica=replica, name=lambda: f"réplique {replica}")
+
+
+class DetectorPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.pool = _FakeDetectorPool(registry=None, size=2, timeout=1)
+
+    def test_returned_replica_is_reused(self):
+        detector = self.pool.checkout()
+        self.pool.checkin(detector)
+        self.assertIs(self.pool.checkout(), detector)
+        self.assertEqual(self.pool.stats()['replicas'], 1)
+
+    def test_grows_to_size_then_times_out(self):
+        first, second = self.pool.checkout(), self.pool.checkout()
+        self.assertIsNot(first, second)
+        with self.assertRaises(DetectorPoolTimeout):
+            self.pool.checkout(timeout=0.05)
+        stats = self.pool.stats()
+        self.assertEqual((stats['replicas'], stats['in_use'], stats['timeouts']), (2, 2, 1))
+
+    def test_waiting_checkout_gets_released_replica(self):
+        held = [self.pool.checkout(), self.pool.checkout()]
+        timer = threading.Timer(0.05, self.pool.checkin, args=[held[0]])
+        timer.start()
+        try:
+            self.assertIs(self.pool.checkout(timeout=2), held[0])
+        finally:
+            timer.cancel()
+        self.assertEqual(self.pool.stats()['waited_checkouts'], 1)
+
+    def test_replica_from_before_clear_is_dropped(self):
+        detector = self.pool.checkout()
+        self.pool.clear()
+        self.pool.checkin(detector)
+        self.assertIsNot(self.pool.checkout(), detector)
+        self.assertEqual(self.pool.stats()['replicas'], 1)
+
+    def test_borrowed_detector_holds_replica_per_call(self):
+        registry = ModelRegistry()
+        registry.pool = _FakeDetectorPool(registry, size=1, timeout=0.05)
+        registry.refresh = lambda detector: None
+        borrowed = registry.borrowed_detector()
+
+        self.assertEqual(borrowed.name(), "réplique 0")
+        self.assertEqual(borrowed.replica, 0)
+        # Entre deux appels, la réplique unique reste disponible pour les autres requêtes
+        self.assertEqual(registry.pool.stats()['in_use'], 0)
+        detector = registry.pool.checkout()
+        with self.assertRaises(DetectorPoolTimeout):
+            borrowed.name()
+        registry.pool.checkin(detector)
+
+
+class RegressionTests(SimpleTestCase):
+    LIMITS = {
+        'max_accuracy_drop': 0.01, 'max_cer_increase': 0.01,
+        'max_precision_drop': 0.01, 'max_latency_increase': 0.2,
+    }
+
+    @staticmethod
+    def _report(exact, cer, ocr_p95, precision=0.9):
+        return {
+            'exact_match_rate': exact,
+            'char_error_rate': cer,
+            'precision': precision,
+            'false_positives': 0,
+            'stages': {'ocr': {'p50': ocr_p95 / 2, 'p95': ocr_p95}},
+            'total': {'p50': ocr_p95, 'p95': 2 * ocr_p95},
+        }
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance('1234AB01', '1234AB01'), 0)
+        self.assertEqual(edit_distance('1234AB01', '1234A801'), 1)
+        self.assertEqual(edit_distance('1234AB01', '234AB01'), 1)
+        self.assertEqual(edit_distance('', 'ABC'), 3)
+
+    def test_match_plates_pairs_closest_reads(self):
+        self.assertEqual(
+            match_plates(['1234AB01', '5678CD02', '9012EF03'], ['5678CD02', '1234A801']),
+            [('1234AB01', '1234A801'), ('5678CD02', '5678CD02'), ('9012EF03', '')],
+        )
+        # Lecture en trop: rendue sans plaque attendue
+        self.assertEqual(
+            match_plates(['1234AB01'], ['1234AB01', 'XYZ']),
+            [('1234AB01', '1234AB01'), ('', 'XYZ')],
+        )
+
+    def test_evaluate_counts_false_positives(self):
+        corpus = [('a.png', None, ['1234AB01']), ('b.png', None, ['5678CD02'])]
+        reads = iter([['1234AB01', 'XYZ'], ['5678CD02']])
+        with mock.patch('detection.regression.without_ocr_cache', lambda detector: nullcontext()), \
+                mock.patch('detection.regression.detailed_stage_timings',
+                           lambda detector, image: (next(reads), {stage: 0.01 for stage in DETAILED_STAGES}, 0, 0)):
+            report = evaluate(None, corpus)
+
+        self.assertEqual((report['plates'], report['exact_match_rate']), (2, 1.0))
+        self.assertEqual((report['reads'], report['false_positives']), (3, 1))
+        self.assertAlmostEqual(report['precision'], 2 / 3)
+        self.assertAlmostEqual(report['char_error_rate'], 3 / 16)
+        self.assertEqual(report['mismatches'], [{'image': 'a.png', 'expected': '', 'read': 'XYZ'}])
+
+    def test_compare_within_budget(self):
+        baseline = self._report(0.90, 0.05, 0.010)
+        self.assertEqual(compare(self._report(0.895, 0.055, 0.011), baseline, self.LIMITS), [])
+
+    def test_compare_reports_regressions(self):
+        baseline = self._report(0.90, 0.05, 0.010)
+        problems = compare(self._report(0.80, 0.10, 0.020, precision=0.7), baseline, self.LIMITS)
+        self.assertEqual(len(problems), 5)
+
+    def test_compare_reports_precision_drop_alone(self):
+        baseline = self._report(0.90, 0.05, 0.010)
+        problems = compare(self._report(0.90, 0.05, 0.010, precision=0.6), baseline, self.LIMITS)
+        self.assertEqual(len(problems), 1)
+        self.assertIn('précision', problems[0])
+        # Référence sans précision enregistrée: pas de comparaison
+        del baseline['precision']
+        self.assertEqual(compare(self._report(0.90, 0.05, 0.010, precision=0.6), baseline, self.LIMITS), [])
+
+
+class DetailedStageTimingsTests(SimpleTestCase):
+    def test_reports_each_production_stage(self):
+        plate = {'image': np.zeros((20, 80, 3), np.uint8)}
+        detector = SimpleNamespace(
+            ocr_cache=object(),
+            vehicle_stage=lambda frames: 'staged',
+            plate_stage=lambda frames, staged: [[{'plates': [plate]}]],
+            prepare_ocr_batch=lambda images: ([("", 0.0)], [(0, images[0], None)]),
+            infer_ocr_batch=lambda prepared: (prepared[0], ['résultat']),
+            decode_ocr_batch=lambda inferred: [('1234AB01', 0.9)],
+        )
+        cache = detector.ocr_cache
+        texts, timings, vehicles, plates = detailed_stage_timings(detector, np.zeros((10, 10, 3), np.uint8))
+        self.assertEqual((texts, vehicles, plates), (['1234AB01'], 1, 1))
+        self.assertEqual(tuple(timings), DETAILED_STAGES)
+        self.assertIs(detector.ocr_cache, cache)
+
+
+class ArtifactWriterTests(SimpleTestCase):
+    def setUp(self):
+        self.media = _use_temporary_media_root(self, DETECTION_ARTIFACT_FORMAT='png')
+        self.writer = ArtifactWriter(workers=2)
+
+    def test_overlapping_writes_keep_the_latest_pending(self):
+        released = [threading.Event(), threading.Event()]
+        calls = iter(released)
+        encode = cv2.imencode
+
+        def blocking_imencode(*args, **kwargs):
+            next(calls).wait(2)
+            return encode(*args, **kwargs)
+
+        image = np.zeros((10, 20, 3), np.uint8)
+        marker = os.path.join(self.media, '.crop.png.pending')
+        with mock.patch('detection.artifacts.cv2.imencode', side_effect=blocking_imencode):
+            name = self.writer.write('manual', 'crop', image)
+            self.writer.write('manual', 'crop', image)
+            released[0].set()
+            time.sleep(0.1)
+            # La première écriture est finie, la seconde non: le marqueur reste
+            self.assertTrue(os.path.exists(marker))
+            self.assertFalse(self.writer.wait(name, timeout=0.05))
+            released[1].set()
+            self.assertTrue(self.writer.wait(name, timeout=2))
+        self.assertFalse(os.path.exists(marker))
+        self.assertTrue(os.path.exists(os.path.join(self.media, name)))
+
+
+class DetectionJobTests(TestCase):
+    def setUp(self):
+        self.media = _use_temporary_media_root(self)
+        self.owner = _agent('agent')
+        self.job = DetectionJob.objects.create(user=self.owner, filename='voiture.png')
+
+    def _status(self, user):
+        self.client.force_login(user)
+        return self.client.get(reverse('detection:job_status', args=[self.job.id]))
+
+    def test_status_restricted_to_owner_and_staff(self):
+        self.assertEqual(self._status(_agent('autre')).status_code, 403)
+        self.assertEqual(self._status(self.owner).status_code, 200)
+        self.assertEqual(self._status(_agent('chef', is_staff=True)).status_code, 200)
+
+    @override_settings(DETECTION_JOB_TIMEOUT=60)
+    def test_stale_job_is_marked_failed(self):
+        DetectionJob.objects.filter(id=self.job.id).update(
+            status=DetectionJob.STATUS_RUNNING, updated_at=timezone.now() - timedelta(seconds=120),
+        )
+        self.assertEqual(self._status(self.owner).json()['status'], DetectionJob.STATUS_FAILED)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, DetectionJob.STATUS_FAILED)
+
+    @override_settings(DETECTION_JOB_TIMEOUT=60)
+    def test_recent_job_is_not_expired(self):
+        self.assertEqual(self._status(self.owner).json()['status'], DetectionJob.STATUS_PENDING)
+
+    @override_settings(DETECTION_ASYNC_JOBS=True, DETECTION_JOB_QUEUE_SIZE=0)
+    def test_full_queue_answers_503(self):
+        self.client.force_login(self.owner)
+        response = self.client.post(
+            reverse('detection:detect_home'), {'media': _image_upload()},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        self.assertEqual(response.status_code, 503)
+        rejected = DetectionJob.objects.exclude(id=self.job.id).get()
+        self.assertEqual(rejected.status, DetectionJob.STATUS_FAILED)
+
+    def test_job_completes_with_the_decoded_image(self):
+        detector = _StubDetector()
+        image = np.zeros((60, 80, 3), np.uint8)
+        with mock.patch('detection.processing.model_registry', _stub_registry(detector)), \
+                mock.patch('detection.jobs.close_old_connections'):
+            run_detection_job(self.job.id, image=image)
+
+        self.job.refresh_from_db()
+        self.assertEqual((self.job.status, self.job.progress), (DetectionJob.STATUS_DONE, 100))
+        self.assertEqual(self.job.result['vehicles_detected'], 0)
+        # L'image décodée est analysée directement, sans relecture du fichier
+        self.assertIs(detector.images[0], image)
+
+
+class ResultCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.media = _use_temporary_media_root(self)
+        self.cache = ResultCache(max_entries=2)
+
+    def _response(self, filename):
+        # Original et boîtes enregistrées, comme après `detect_image_file`
+        for name in (filename, f"result_{filename}.json"):
+            with open(os.path.join(self.media, name), 'w') as f:
+                f.write('{}' if name.endswith('.json') else '')
+        return {'original_image': f"media/{filename}", 'plates': [], 'success': True}
+
+    def test_hit_returns_stored_response(self):
+        response = self._response('voiture.jpg')
+        self.cache.put('clé', response)
+        self.assertEqual(self.cache.get('clé'), response)
+        self.assertIsNone(self.cache.get('autre clé'))
+        self.assertEqual((self.cache.stats()['hits'], self.cache.stats()['misses']), (1, 1))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for key in ('a', 'b'):
+            self.cache.put(key, self._response(f"{key}.jpg"))
+        self.cache.get('a')
+        self.cache.put('c', self._response('c.jpg'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_miss_when_files_are_gone(self):
+        self.cache.put('clé', self._response('voiture.jpg'))
+        os.remove(os.path.join(self.media, 'voiture.jpg'))
+        self.assertIsNone(self.cache.get('clé'))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_miss_when_plate_artifact_is_gone(self):
+        response = dict(self._response('voiture.jpg'), plates=[{'plate_image': 'detection/artifacts/plate_0_0.jpg'}])
+        self.cache.put('clé', response)
+        self.assertIsNone(self.cache.get('clé'))
+
+    def test_model_settings_change_the_key(self):
+        with override_settings(DETECTION_TILE_SIZE=1280):
+            before = content_key(b'image')
+            self.assertEqual(content_key(b'image'), before)
+        with override_settings(DETECTION_TILE_SIZE=640):
+            self.assertNotEqual(content_key(b'image'), before)
+        with override_settings(DETECTION_TILE_SIZE=1280, DETECTION_PLATE_MODE='direct'):
+            self.assertNotEqual(content_key(b'image'), before)
+
+
+class RenderResultTests(TestCase):
+    def setUp(self):
+        self.media = _use_temporary_media_root(self)
+        self.agent = _agent('agent')
+        self.client.force_login(self.agent)
+        cv2.imwrite(os.path.join(self.media, 'voiture.png'), np.full((60, 80, 3), 127, np.uint8))
+        save_annotations('voiture.png', [{
+            'vehicle_bbox': [10, 10, 70, 50], 'mode': 'vehicle',
+            'plates': [{'bbox': [20, 30, 50, 40], 'text': 'AB123CD'}],
+        }])
+
+    def _render(self, filename='voiture.png', **params):
+        return self.client.get(reverse('detection:render_result', args=[filename]), params)
+
+    def _decoded(self, response):
+        data = b''.join(response.streaming_content)
+        response.close()
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+    def test_renders_requested_format(self):
+        response = self._render(format='png')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(self._decoded(response).shape[:2], (60, 80))
+        self.assertEqual(self._render(format='JPEG')['Content-Type'], 'image/jpeg')
+
+    def test_rejects_unsupported_format(self):
+        self.assertEqual(self._render(format='gif').status_code, 400)
+
+    def test_width_reduces_but_never_enlarges(self):
+        self.assertEqual(self._decoded(self._render(width=40, format='png')).shape[:2], (30, 40))
+        self.assertEqual(self._decoded(self._render(width=4000, format='png')).shape[:2], (60, 80))
+
+    def test_rejects_invalid_width(self):
+        for width in ('0', '-5', '8193', 'large'):
+            with self.subTest(width=width):
+                self.assertEqual(self._render(width=width).status_code, 400)
+
+    def test_rejects_path_in_filename(self):
+        request = RequestFactory().get('/detection/render/')
+        request.user = self.agent
+        for filename in ('../settings.py', 'sub/voiture.png'):
+            with self.subTest(filename=filename):
+                self.assertEqual(render_result(request, filename).status_code, 400)
+
+    def test_unknown_detection_answers_404(self):
+        self.assertEqual(self._render('absente.png').status_code, 404)
+        # Original présent mais sans boîtes enregistrées
+        os.remove(os.path.join(self.media, 'result_voiture.png.json'))
+        self.assertEqual(self._render(width=20).status_code, 404)
+
+
+# Ligne d'échantillon: nom{étiquettes} valeur
+_SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_]+="[^"]*",?)*\})? (-?[0-9.e+-]+|\+Inf)$')
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(metrics, '_enabled', True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _get(self, **headers):
+        return self.client.get(reverse('detection:metrics'), **headers)
+
+    @override_settings(DETECTION_METRICS_TOKEN='')
+    def test_without_token_reserved_to_staff(self):
+        self.assertEqual(self._get().status_code, 403)
+        self.client.force_login(_agent('agent'))
+        self.assertEqual(self._get().status_code, 403)
+        self.client.force_login(_agent('chef', is_staff=True))
+        self.assertEqual(self._get().status_code, 200)
+
+    @override_settings(DETECTION_METRICS_TOKEN='jeton')
+    def test_token_required_when_configured(self):
+        self.assertEqual(self._get().status_code, 401)
+        self.assertEqual(self._get(HTTP_AUTHORIZATION='Bearer autre').status_code, 401)
+        self.assertEqual(self._get(HTTP_AUTHORIZATION='Bearer jeton').status_code, 200)
+
+    def test_disabled_metrics_answer_404(self):
+        self.client.force_login(_agent('chef', is_staff=True))
+        with mock.patch.object(metrics, '_enabled', False):
+            self.assertEqual(self._get().status_code, 404)
+
+    @override_settings(DETECTION_METRICS_TOKEN='jeton')
+    def test_exposition_is_prometheus_text(self):
+        with span('test'):
+            pass
+        response = self._get(HTTP_AUTHORIZATION='Bearer jeton')
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        lines = response.content.decode().splitlines()
+        self.assertIn('# TYPE detection_stage_seconds histogram', lines)
+        self.assertTrue(any(line.startswith('detection_stage_seconds_count{stage="test"}') for line in lines))
+        for line in lines:
+            if line.startswith('# '):
+                self.assertRegex(line, r'^# (HELP|TYPE) [a-zA-Z_:][a-zA-Z0-9_:]* .+$')
+            else:
+                self.assertRegex(line, _SAMPLE_LINE)
+
+    def test_span_and_inc_feed_metrics(self):
+        counter = Counter('detection_test_total', "Compteur de test", ['kind'])
+        inc(counter, kind='image')
+        inc(counter, 2, kind='image')
+        inc(counter, 0, kind='video')
+        self.assertEqual(list(counter.samples()), ['detection_test_total{kind="image"} 3'])
+
+        before = stage_seconds._series.get(('test_span',), {}).get('count', 0)
+        with span('test_span'):
+            pass
+        self.assertEqual(stage_seconds._series[('test_span',)]['count'], before + 1)
+
+    def test_span_and_inc_are_noops_when_disabled(self):
+        counter = Counter('detection_test_total', "Compteur de test")
+        with mock.patch.object(metrics, '_enabled', False):
+            inc(counter)
+            with span('test_disabled') as measured:
+                pass
+        self.assertIsNone(measured)
+        self.assertEqual(list(counter.samples()), [])
+        self.assertNotIn(('test_disabled',), stage_seconds._series)
+
+
+@override_settings(DETECTION_ASYNC_JOBS=True, DETECTION_PROFILING=True)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        _use_temporary_media_root(self)
+        profiles = tempfile.TemporaryDirectory()
+        self.addCleanup(profiles.cleanup)
+        settings_override = override_settings(DETECTION_PROFILE_DIR=profiles.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.profiles = profiles.name
+
+        self.detector = _StubDetector()
+        for target, value in (
+            ('detection.processing.model_registry', _stub_registry(self.detector)),
+            ('detection.views.result_cache', mock.Mock(**{'get.return_value': None})),
+            ('detection.views.submit_detection_job', mock.Mock()),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _detect(self, user):
+        from . import views
+
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse('detection:detect_home') + '?profile=1', {'media': _image_upload()},
+            HTTP_X_REQUESTED_WITH='XMLHttpRequest',
+        )
+        return response, views.result_cache, views.submit_detection_job
+
+    def test_flag_ignored_for_non_staff(self):
+        response, _, submit = self._detect(_agent('agent'))
+        self.assertEqual(response.status_code, 202)
+        self.assertNotIn('X-Detection-Profile', response)
+        submit.assert_called_once()
+        self.assertEqual(os.listdir(self.profiles), [])
+
+    def test_staff_profile_bypasses_cache_and_job(self):
+        response, cache, submit = self._detect(_agent('chef', is_staff=True))
+        self.assertEqual(response.status_code, 200)
+        cache.get.assert_not_called()
+        submit.assert_not_called()
+        self.assertEqual(len(self.detector.images), 1)
+
+        name = response['X-Detection-Profile']
+        self.assertTrue(os.path.exists(os.path.join(self.profiles, f"{name}.prof")))
+        download = self.client.get(reverse('detection:profile_download', args=[name]), {'format': 'text'})
+        self.assertEqual(download.status_code, 200)
+
+    def test_download_rejects_path_traversal(self):
+        staff = _agent('chef', is_staff=True)
+        with open(os.path.join(os.path.dirname(self.profiles), 'secret.prof'), 'w'):
+            pass
+        self.addCleanup(os.remove, os.path.join(os.path.dirname(self.profiles), 'secret.prof'))
+        request = RequestFactory().get('/detection/profiles/')
+        request.user = staff
+        with self.assertRaises(Http404):
+            profile_download(request, '../secret')
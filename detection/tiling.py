@@ -0,0 +1,111 @@
+"""
+Découpage en tuiles des images haute résolution pour le modèle véhicule.
+
+Sur une photo de 12 MP réduite à 640 pixels, les véhicules lointains ne font
+que quelques pixels. Les grandes images sont donc découpées en tuiles qui se
+chevauchent; les boîtes des tuiles (et de l'image entière, pour les véhicules
+proches coupés par les tuiles) sont dédupliquées par une NMS inter-tuiles
+(IoU, même classe, sources différentes), après retrait des morceaux de
+véhicules coupés par un bord de tuile.
+"""
+
+
+def tile_origins(length, tile_size, overlap):
+    """Positions de départ des tuiles sur un axe, la dernière collée au bord."""
+    if length <= tile_size:
+        return [0]
+    step = max(1, int(tile_size * (1 - overlap)))
+    origins = list(range(0, length - tile_size, step))
+    origins.append(length - tile_size)
+    return origins
+
+
+def split_tiles(image, tile_size, overlap):
+    """Découpe l'image: liste de (x, y, tuile) couvrant toute l'image."""
+    height, width = image.shape[:2]
+    return [
+        (x, y, image[y:y + tile_size, x:x + tile_size])
+        for y in tile_origins(height, tile_size, overlap)
+        for x in tile_origins(width, tile_size, overlap)
+    ]
+
+
+def iou(box_a, box_b):
+    """Intersection sur union de deux boîtes [x1, y1, x2, y2]."""
+    inter_w = min(box_a[2], box_b[2]) - max(box_a[0], box_b[0])
+    inter_h = min(box_a[3], box_b[3]) - max(box_a[1], box_b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    inter = inter_w * inter_h
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+def intersection_over_smaller(box_a, box_b):
+    """Intersection rapportée à l'aire de la plus petite des deux boîtes."""
+    inter_w = min(box_a[2], box_b[2]) - max(box_a[0], box_b[0])
+    inter_h = min(box_a[3], box_b[3]) - max(box_a[1], box_b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return inter_w * inter_h / float(min(area_a, area_b))
+
+
+def touches_inner_edge(bbox, tile, image_size, margin=2):
+    """Vrai si la boîte touche un bord de la tuile [x1, y1, x2, y2] qui n'est pas un bord de l'image."""
+    width, height = image_size
+    x1, y1, x2, y2 = tile
+    return (
+        (x1 > 0 and bbox[0] <= x1 + margin)
+        or (y1 > 0 and bbox[1] <= y1 + margin)
+        or (x2 < width and bbox[2] >= x2 - margin)
+        or (y2 < height and bbox[3] >= y2 - margin)
+    )
+
+
+def merge_detections(detections, image_size, threshold=0.5, containment=0.8):
+    """
+    NMS inter-tuiles sur des détections {'bbox', 'confidence', 'class_id', 'tile'}.
+
+    `tile` identifie l'entrée du modèle qui a produit la boîte (None pour
+    l'image entière, le rectangle [x1, y1, x2, y2] pour une tuile) et
+    `image_size` vaut (largeur, hauteur).
+
+    Un véhicule coupé par un bord intérieur de tuile n'en laisse qu'une partie
+    dans la tuile, trop petite pour atteindre `threshold` d'IoU avec sa boîte
+    sur l'image entière: une boîte de tuile qui touche un bord intérieur et
+    dont au moins `containment` de la surface est couverte par une boîte de
+    l'image entière de même classe est retirée.
+
+    Le modèle a déjà appliqué sa NMS à chaque entrée: seules les boîtes de
+    sources différentes (deux tuiles qui se chevauchent, ou une tuile et
+    l'image entière) et de même classe sont ensuite dédupliquées. Parcourues
+    par confiance décroissante, les boîtes dont l'IoU avec une boîte conservée
+    atteint `threshold` sont supprimées; la boîte conservée reste inchangée.
+    La clé 'tile' est retirée du résultat.
+    """
+    full_image = [d for d in detections if d.get('tile') is None]
+    detections = [
+        d for d in detections
+        if d.get('tile') is None
+        or not touches_inner_edge(d['bbox'], d['tile'], image_size)
+        or not any(
+            other.get('class_id') == d.get('class_id')
+            and intersection_over_smaller(other['bbox'], d['bbox']) >= containment
+            for other in full_image
+        )
+    ]
+
+    kept = []
+    for detection in sorted(detections, key=lambda d: d['confidence'], reverse=True):
+        duplicate = any(
+            other.get('tile') != detection.get('tile')
+            and other.get('class_id') == detection.get('class_id')
+            and iou(other['bbox'], detection['bbox']) >= threshold
+            for other in kept
+        )
+        if not duplicate:
+            kept.append(detection)
+    return [{key: value for key, value in detection.items() if key != 'tile'} for detection in kept]
@@ -7,6 +7,14 @@ app_name = "detection"
 
 urlpatterns = [
     path('', views.detect_home, name='detect_home'),
+    path('render/<str:filename>', views.render_result, name='render_result'),
+    path('artifacts/<str:name>', views.artifact, name='artifact'),
+    path('jobs/<uuid:job_id>/', views.job_status, name='job_status'),
+    path('stats/', views.detection_stats, name='detection_stats'),
+    path('ready/', views.readiness, name='readiness'),
+    path('metrics/', views.prometheus_metrics, name='metrics'),
+    path('profiles/', views.profile_list, name='profile_list'),
+    path('profiles/<str:name>', views.profile_download, name='profile_download'),
     path('save-corrected-plates/', views.save_corrected_plates, name='save_corrected_plates'),
     path('extract-manual-plate/', views.extract_manual_plate, name='extract_manual_plate'),
     path('test-email/', views.test_email_system, name='test_email_system'),
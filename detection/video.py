@@ -0,0 +1,258 @@
+"""
+Détection de plaques dans une vidéo (champ Detection.video).
+
+Les images sont lues en flux avec OpenCV: seules les images échantillonnées
+sont décodées, puis envoyées par lots aux étapes du CarDetector. Seul le lot
+courant et la meilleure découpe de chaque plaque restent en mémoire. Les
+lectures d'une même plaque sont fusionnées par vote (voir plate_tracker).
+"""
+import time
+import threading
+import logging
+
+import cv2
+from django.conf import settings
+
+from .pipeline import detection_pipeline
+from .plate_tracker import PlateTracker
+
+logger = logging.getLogger(__name__)
+
+
+def iter_sampled_frames(video_path, sample_fps=None):
+    """
+    Parcourt la vidéo et produit (indice_image, horodatage_s, image) pour les
+    images échantillonnées à `sample_fps` images par seconde.
+
+    Les images ignorées sont seulement saisies (`grab`) sans être décodées.
+    """
+    sample_fps = sample_fps or getattr(settings, 'DETECTION_VIDEO_SAMPLE_FPS', 2)
+
+    capture = cv2.VideoCapture(str(video_path))
+    if not capture.isOpened():
+        logger.error(f"Impossible d'ouvrir la vidéo: {video_path}")
+        raise ValueError(f"Impossible d'ouvrir la vidéo: {video_path}")
+
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+    step = max(1, int(round(fps / sample_fps)))
+
+    try:
+        frame_index = 0
+        while True:
+            if frame_index % step == 0:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield frame_index, frame_index / fps, frame
+            elif not capture.grab():
+                break
+            frame_index += 1
+    finally:
+        capture.release()
+
+
+def video_properties(video_path):
+    """Retourne les propriétés de base de la vidéo (fps, nombre d'images, durée)."""
+    capture = cv2.VideoCapture(str(video_path))
+    try:
+        fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    finally:
+        capture.release()
+    return {
+        'fps': fps,
+        'frame_count': frame_count,
+        'duration': frame_count / fps if fps else 0.0,
+    }
+
+
+class PlateSummary:
+    """Résumé d'une piste de plaque sur l'ensemble de la vidéo."""
+
+    def __init__(self, track):
+        self.track = track
+        self.first_frame = None
+        self.last_frame = None
+        self.first_time = None
+        self.last_time = None
+        self.best_confidence = 0.0
+        self.best_crop = None
+        self.best_bbox = None
+        self.best_frame = None
+        self.occurrences = 0
+
+    def add(self, frame_index, timestamp, plate):
+        if self.first_frame is None:
+            self.first_frame = frame_index
+            self.first_time = timestamp
+        self.last_frame = frame_index
+        self.last_time = timestamp
+        self.occurrences += 1
+
+        # Les observations sans lecture OCR (piste stable) ne changent pas la meilleure découpe
+        if 'confidence' not in plate:
+            return
+        if self.best_crop is None or plate['confidence'] > self.best_confidence:
+            self.best_confidence = plate['confidence']
+            # Copier la découpe pour ne pas garder l'image complète en mémoire
+            self.best_crop = plate['image'].copy()
+            self.best_bbox = plate['bbox']
+            self.best_frame = frame_index
+
+    def merge(self, other):
+        """Fusionne la piste `other` (même lecture finale) dans ce résumé."""
+        if other.first_frame < self.first_frame:
+            self.first_frame, self.first_time = other.first_frame, other.first_time
+        if other.last_frame > self.last_frame:
+            self.last_frame, self.last_time = other.last_frame, other.last_time
+        self.occurrences += other.occurrences
+        if other.best_crop is not None and other.best_confidence > self.best_confidence:
+            self.best_confidence = other.best_confidence
+            self.best_crop = other.best_crop
+            self.best_bbox = other.best_bbox
+            self.best_frame = other.best_frame
+
+    def as_dict(self, text):
+        return {
+            'text': text,
+            'first_frame': self.first_frame,
+            'last_frame': self.last_frame,
+            'first_time': self.first_time,
+            'last_time': self.last_time,
+            'best_frame': self.best_frame,
+            'best_bbox': self.best_bbox,
+            'best_confidence': self.best_confidence,
+            'best_crop': self.best_crop,
+            'occurrences': self.occurrences,
+            'readings': len(self.track.readings),
+            'stable': self.track.stable,
+        }
+
+
+def process_video(detector, video_path, sample_fps=None, batch_size=None, max_frames=None,
+                  on_progress=None):
+    """
+    Détecte les plaques d'une vidéo et retourne un résumé par plaque.
+
+    Les plaques sont suivies d'image en image (PlateTracker) et leurs
+    lectures OCR fusionnées par vote; les pistes stables ne sont plus lues.
+    Avec DETECTION_PIPELINE, les lots passent par les étapes en pipeline
+    (voir detection.pipeline) et le résumé inclut l'occupation des étapes.
+
+    Args:
+        detector: instance de CarDetector
+        video_path: chemin du fichier vidéo
+        sample_fps: images analysées par seconde de vidéo
+        batch_size: nombre d'images échantillonnées traitées par lot
+        max_frames: nombre maximal d'images échantillonnées (None = toutes)
+        on_progress: appelé après chaque lot avec (images_analysées, images_attendues)
+
+    Returns:
+        dict: propriétés de la vidéo, statistiques et liste 'plates' triée par
+        première apparition (les plaques sans texte sont ignorées)
+    """
+    batch_size = batch_size or getattr(settings, 'DETECTION_VIDEO_BATCH_FRAMES', 8)
+    sample_fps = sample_fps or getattr(settings, 'DETECTION_VIDEO_SAMPLE_FPS', 2)
+    properties = video_properties(video_path)
+    expected_frames = int(properties['duration'] * sample_fps) + 1
+    if max_frames:
+        expected_frames = min(expected_frames, max_frames)
+
+    tracker = PlateTracker()
+    tracker_lock = threading.Lock()
+    summaries = {}
+    frames_processed = 0
+    ocr_reads = 0
+    start = time.perf_counter()
+
+    def batches():
+        batch = []
+        for count, sampled in enumerate(iter_sampled_frames(video_path, sample_fps), start=1):
+            batch.append(sampled)
+            if len(batch) >= batch_size or (max_frames and count >= max_frames):
+                yield {'batch': batch, 'frames': [b[2] for b in batch]}
+                batch = []
+            if max_frames and count >= max_frames:
+                return
+        if batch:
+            yield {'batch': batch, 'frames': [b[2] for b in batch]}
+
+    def select_plates(item):
+        # Association aux pistes, dans l'ordre des images
+        observations = []
+        with tracker_lock:
+            for (frame_index, timestamp, _), vehicles in zip(item['batch'], item['results']):
+                plates = [plate for vehicle in vehicles for plate in vehicle['plates']]
+                tracks = tracker.assign(frame_index, [plate['bbox'] for plate in plates])
+                observations.extend(
+                    (frame_index, timestamp, plate, track) for plate, track in zip(plates, tracks)
+                )
+            item['observations'] = observations
+
+            # OCR seulement pour les pistes dont le vote n'est pas encore stable
+            return [obs[2] for obs in observations if tracker.needs_ocr(obs[3])]
+
+    def collect(item):
+        nonlocal frames_processed, ocr_reads
+        frames_processed += len(item['batch'])
+        ocr_reads += len(item['to_read'])
+        with tracker_lock:
+            for frame_index, timestamp, plate, track in item['observations']:
+                if 'text' in plate:
+                    tracker.add_reading(track, plate['text'], plate['confidence'])
+                summary = summaries.setdefault(track.track_id, PlateSummary(track))
+                summary.add(frame_index, timestamp, plate)
+
+        if on_progress is not None:
+            on_progress(frames_processed, expected_frames)
+
+    pipeline = None
+    if getattr(settings, 'DETECTION_PIPELINE', True):
+        # Étapes en parallèle: le lot suivant est détecté pendant la lecture OCR du lot courant
+        pipeline = detection_pipeline(detector, select_plates=select_plates)
+        for item in pipeline.run(batches()):
+            collect(item)
+        pipeline.log_stats()
+    else:
+        for item in batches():
+            item['results'] = detector.locate_plates(item['frames'])
+            item['to_read'] = select_plates(item)
+            detector.read_plates(item['to_read'])
+            collect(item)
+
+    # Lecture finale par piste; les pistes de même lecture sont fusionnées
+    by_text = {}
+    for summary in summaries.values():
+        text = summary.track.voted_text()
+        if not text:
+            continue
+        if text in by_text:
+            by_text[text].merge(summary)
+        else:
+            by_text[text] = summary
+
+    processing_time = time.perf_counter() - start
+    ocr_stats = detector.ocr_cache.stats() if detector.ocr_cache is not None else None
+    if ocr_stats is not None:
+        logger.info(
+            f"Cache OCR: taux de succès {ocr_stats['hit_rate']:.0%}, "
+            f"~{ocr_stats['ocr_seconds_saved']:.1f}s d'OCR évitées depuis le démarrage"
+        )
+    logger.info(
+        f"Vidéo traitée: {frames_processed} images analysées en {processing_time:.1f}s "
+        f"({len(by_text)} plaque(s), {ocr_reads} lecture(s) OCR, {tracker.ocr_skipped} évitée(s))"
+    )
+
+    plates = sorted(
+        (summary.as_dict(text) for text, summary in by_text.items()),
+        key=lambda p: p['first_frame']
+    )
+    return {
+        **properties,
+        'frames_processed': frames_processed,
+        'processing_time': processing_time,
+        'ocr_reads': ocr_reads,
+        'ocr_skipped': tracker.ocr_skipped,
+        'pipeline': pipeline.stats() if pipeline is not None else None,
+        'plates': plates,
+    }
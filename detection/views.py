@@ -1,13 +1,24 @@
 import os
-import cv2
+import uuid
 from django.conf import settings
 from django.shortcuts import render
 from django.core.files.storage import FileSystemStorage
-from django.http import JsonResponse
-from .car_detector import CarDetector
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.crypto import constant_time_compare
+# Pas d'OpenCV, numpy, torch ni ultralytics au chargement du module: les vues sont
+# importées par la résolution d'URL de tout le site et par chaque commande manage.py.
+# Les modules de traitement sont importés dans les vues qui exécutent une détection.
+from .model_registry import DetectorPoolTimeout, model_registry
+from .jobs import JobQueueFull, expire_stale_job, submit_detection_job
+from .result_cache import content_key, result_cache
+from .warmup import process_readiness
+from .metrics import instrumented_view, metrics, span
+from .profiling import is_profiling, profiled_view
 from django.contrib.auth.decorators import login_required, permission_required
+from django.contrib.admin.views.decorators import staff_member_required
 from vehicules.models import Vehicle
-from .models import Detection
+from .models import Detection, DetectionJob
 from .email_utils import send_vehicle_found_email
 import logging
 
@@ -16,67 +27,105 @@ logger = logging.getLogger(__name__)
 
 @login_required
 @permission_required('detection.add_detection', raise_exception=True)
+@instrumented_view('detect_home')
+@profiled_view('detect_home')
 def detect_home(request):
     """Page d'accueil avec détection de véhicules et de plaques"""
     if request.method == 'POST' and request.FILES.get('media'):
+        from .car_detector import decode_image
+        from .processing import detect_image_file, detect_video_file, persist_upload, read_upload
+
         is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
         
         try:
-            # Créer le détecteur
-            detector = CarDetector()
-            
-            # Sauvegarder le fichier
             uploaded_file = request.FILES['media']
-            fs = FileSystemStorage()
-            filename = fs.save(uploaded_file.name, uploaded_file)
-            file_path = os.path.join(settings.MEDIA_ROOT, filename)
-            
-            # Vérifier le type de fichier
-            if not uploaded_file.content_type.startswith('image'):
-                error_msg = 'Seules les images sont acceptées.'
+            is_video = uploaded_file.content_type.startswith('video')
+
+            # Vérifier le type de fichier avant toute écriture sur le disque
+            if not is_video and not uploaded_file.content_type.startswith('image'):
+                error_msg = 'Seules les images et les vidéos sont acceptées.'
                 if is_ajax:
                     return JsonResponse({'error': error_msg}, status=400)
                 return render(request, 'detection/home_detect.html', {'error': error_msg})
-            
-            # Processus de détection
-            result_image, detection_results = detector.process_detection(file_path)
-            
-            # Traiter les résultats
-            plates_data = []
-            for i, vehicle in enumerate(detection_results):
-                for j, plate in enumerate(vehicle['plates']):
-                    # Sauvegarder l'image de plaque
-                    plate_filename = f"plate_{i}_{j}_{filename}"
-                    plate_path = os.path.join(settings.MEDIA_ROOT, plate_filename)
-                    cv2.imwrite(plate_path, plate['image'])
-                    
-                    plates_data.append({
-                        'plate_id': f"{i}_{j}",
-                        'plate_image': fs.url(plate_filename).lstrip('/'),
-                        'plate_text': plate['text'],
-                        'confidence': f"{plate['confidence']:.2f}",
-                        'vehicle_id': i
-                    })
-            
-            # Sauvegarder l'image avec détections
-            result_filename = f"result_{filename}"
-            result_path = os.path.join(settings.MEDIA_ROOT, result_filename)
-            cv2.imwrite(result_path, result_image)
-            
-            # Préparer la réponse
-            response = {
-                'original_image': fs.url(filename).lstrip('/'),
-                'processed_image': fs.url(result_filename).lstrip('/'),
-                'vehicles_detected': len(detection_results),
-                'plates_detected': len(plates_data),
-                'plates': plates_data,
-                'success': True
-            }
+
+            # Image: décodage directement depuis les octets reçus (pas d'aller-retour disque)
+            data = image = None
+            if not is_video:
+                with span('read_upload'):
+                    data = read_upload(uploaded_file)
+                with span('decode'):
+                    image = decode_image(data)
+                if image is None:
+                    error_msg = "Le fichier envoyé n'est pas une image lisible."
+                    if is_ajax:
+                        return JsonResponse({'error': error_msg}, status=400)
+                    return render(request, 'detection/home_detect.html', {'error': error_msg})
+
+            # Requête profilée: la détection s'exécute ici, sans cache ni tâche en arrière-plan
+            profiling = is_profiling(request)
+            if profiling:
+                request.profile_context.update({
+                    'content_type': uploaded_file.content_type,
+                    'upload_bytes': uploaded_file.size,
+                    'image_size': [image.shape[1], image.shape[0]] if image is not None else None,
+                })
+
+            # Même contenu déjà analysé avec les mêmes modèles: réponse immédiate, sans nouvelle copie
+            cache_key = content_key(data if data is not None else uploaded_file)
+            cached_response = None if profiling else result_cache.get(cache_key)
+            if cached_response is not None:
+                if is_ajax:
+                    return JsonResponse(cached_response)
+                return render(request, 'detection/home_detect.html', cached_response)
+
+            fs = FileSystemStorage()
+
+            # Requête AJAX: créer une tâche en arrière-plan et répondre immédiatement
+            if is_ajax and getattr(settings, 'DETECTION_ASYNC_JOBS', True) and not profiling:
+                # L'original est enregistré à part; le worker analyse l'image décodée en mémoire
+                if is_video:
+                    filename = fs.save(uploaded_file.name, uploaded_file)
+                else:
+                    filename = persist_upload(fs, uploaded_file.name, data)
+                with span('db'):
+                    job = DetectionJob.objects.create(
+                        user=request.user,
+                        media_type='video' if is_video else 'image',
+                        filename=filename,
+                    )
+                try:
+                    submit_detection_job(job.id, cache_key, image=image)
+                except JobQueueFull as e:
+                    DetectionJob.objects.filter(id=job.id).update(
+                        status=DetectionJob.STATUS_FAILED, error=str(e),
+                    )
+                    return JsonResponse({'error': f"Service de détection saturé, réessayez plus tard: {e}"}, status=503)
+                return JsonResponse({
+                    'job_id': str(job.id),
+                    'status': job.status,
+                    'progress': job.progress,
+                    'status_url': reverse('detection:job_status', args=[job.id]),
+                }, status=202)
+
+            # Les vidéos suivent un traitement par flux d'images (lues depuis le fichier)
+            if is_video:
+                filename = fs.save(uploaded_file.name, uploaded_file)
+                file_path = os.path.join(settings.MEDIA_ROOT, filename)
+                response = detect_video_file(fs, filename, file_path)
+            else:
+                filename = persist_upload(fs, uploaded_file.name, data)
+                response = detect_image_file(fs, filename, image)
+            result_cache.put(cache_key, response)
             
             if is_ajax:
                 return JsonResponse(response)
             return render(request, 'detection/home_detect.html', response)
             
+        except DetectorPoolTimeout as e:
+            error_msg = f"Service de détection saturé, réessayez plus tard: {str(e)}"
+            if is_ajax:
+                return JsonResponse({'error': error_msg}, status=503)
+            return render(request, 'detection/home_detect.html', {'error': error_msg})
         except Exception as e:
             error_msg = f"Erreur de détection: {str(e)}"
             if is_ajax:
@@ -86,9 +135,160 @@ def detect_home(request):
     return render(request, 'detection/home_detect.html')
 
 
+@login_required
+@permission_required('detection.add_detection', raise_exception=True)
+@instrumented_view('render_result')
+def render_result(request, filename):
+    """Image annotée d'une détection, rendue à la demande (?width=..., ?format=jpg|png|webp)"""
+    from .artifacts import CONTENT_TYPES
+    from .rendering import render_annotated
+
+    if os.path.basename(filename) != filename:
+        return JsonResponse({'error': 'Fichier invalide'}, status=400)
+
+    fmt = request.GET.get('format', 'jpg').lower().replace('jpeg', 'jpg')
+    if fmt not in CONTENT_TYPES:
+        return JsonResponse({'error': f"Format non supporté: {fmt}"}, status=400)
+
+    width = None
+    if request.GET.get('width'):
+        try:
+            width = int(request.GET['width'])
+        except ValueError:
+            width = 0
+        if not 0 < width <= 8192:
+            return JsonResponse({'error': 'Largeur invalide'}, status=400)
+
+    output_path = render_annotated(filename, width, fmt)
+    if output_path is None:
+        return JsonResponse({'error': 'Détection non trouvée'}, status=404)
+    return FileResponse(open(output_path, 'rb'), content_type=CONTENT_TYPES[fmt])
+
+
+@login_required
+@permission_required('detection.add_detection', raise_exception=True)
+@instrumented_view('artifact')
+def artifact(request, name):
+    """Sert un artefact (découpe de plaque) en attendant la fin de son écriture"""
+    from .artifacts import CONTENT_TYPES, artifact_writer
+
+    if os.path.basename(name) != name:
+        return JsonResponse({'error': 'Fichier invalide'}, status=400)
+
+    fmt = os.path.splitext(name)[1].lstrip('.').lower()
+    if fmt not in CONTENT_TYPES:
+        return JsonResponse({'error': f"Format non supporté: {fmt}"}, status=400)
+
+    if not artifact_writer.wait(name, timeout=getattr(settings, 'DETECTION_ARTIFACT_WAIT_TIMEOUT', 30)):
+        return JsonResponse({'error': 'Artefact en cours d\'écriture'}, status=503)
+
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    if not os.path.exists(path):
+        return JsonResponse({'error': 'Artefact non trouvé'}, status=404)
+    return FileResponse(open(path, 'rb'), content_type=CONTENT_TYPES[fmt])
+
+
+@login_required
+@permission_required('detection.add_detection', raise_exception=True)
+def job_status(request, job_id):
+    """Retourne l'état d'une tâche de détection (et son résultat une fois terminée)"""
+    try:
+        job = DetectionJob.objects.get(id=job_id)
+    except DetectionJob.DoesNotExist:
+        return JsonResponse({'error': 'Tâche non trouvée'}, status=404)
+
+    if job.user_id != request.user.id and not request.user.is_staff:
+        return JsonResponse({'error': 'Accès refusé'}, status=403)
+
+    expire_stale_job(job)
+    response = {
+        'job_id': str(job.id),
+        'status': job.status,
+        'progress': job.progress,
+    }
+    if job.status == DetectionJob.STATUS_DONE:
+        response.update(job.result or {})
+    elif job.status == DetectionJob.STATUS_FAILED:
+        response['error'] = f"Erreur de détection: {job.error}"
+    return JsonResponse(response)
+
+
+def readiness(request):
+    """Sonde du répartiteur de charge: 200 quand les modèles sont prêts, 503 sinon"""
+    state = process_readiness.as_dict()
+    return JsonResponse(state, status=200 if state['ready'] else 503)
+
+
+@staff_member_required
+def detection_stats(request):
+    """Statistiques internes du service de détection (modèles chargés, caches)"""
+    from .artifacts import artifact_writer
+    from .ocr_cache import ocr_cache
+
+    return JsonResponse({
+        'models': model_registry.stats(),
+        'pool': model_registry.pool.stats(),
+        'result_cache': result_cache.stats(),
+        'ocr_cache': ocr_cache.stats(),
+        'artifacts': artifact_writer.stats(),
+    })
+
+
+@staff_member_required
+def profile_list(request):
+    """Profils de requêtes récents (détection profilée avec ?profile=1 ou l'en-tête X-Detection-Profile)"""
+    from .profiling import recent_profiles
+
+    try:
+        limit = int(request.GET.get('limit', 20))
+    except ValueError:
+        return JsonResponse({'error': 'Paramètre limit invalide'}, status=400)
+    profiles = recent_profiles(limit)
+    for profile in profiles:
+        url = reverse('detection:profile_download', args=[profile['name']])
+        profile['download_url'] = url
+        profile['text_url'] = f"{url}?format=text"
+    return JsonResponse({'profiles': profiles})
+
+
+@staff_member_required
+def profile_download(request, name):
+    """Télécharge un profil (.prof pour pstats/snakeviz) ou son résumé texte (?format=text&sort=...)"""
+    from .profiling import profile_path, profile_text
+
+    path = profile_path(name)
+    if path is None:
+        raise Http404("Profil introuvable")
+    if request.GET.get('format') == 'text':
+        sort = request.GET.get('sort', 'cumulative')
+        if sort not in ('cumulative', 'tottime', 'ncalls'):
+            return JsonResponse({'error': 'Tri non pris en charge'}, status=400)
+        return HttpResponse(profile_text(name, sort=sort), content_type='text/plain; charset=utf-8')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f"{name}.prof",
+                        content_type='application/octet-stream')
+
+
+def prometheus_metrics(request):
+    """
+    Métriques du processus au format texte Prometheus (404 si DETECTION_METRICS est désactivé).
+
+    Accès par jeton (`Authorization: Bearer <DETECTION_METRICS_TOKEN>`) pour le
+    collecteur, sinon réservé au personnel connecté.
+    """
+    if not metrics.enabled:
+        raise Http404("Métriques désactivées")
+    token = getattr(settings, 'DETECTION_METRICS_TOKEN', '')
+    if token:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f"Bearer {token}"):
+            return HttpResponse(status=401)
+    elif not (request.user.is_authenticated and request.user.is_staff):
+        return HttpResponse(status=403)
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
 
 @login_required
 @permission_required('detection.add_detection', raise_exception=True)
+@instrumented_view('save_corrected_plates')
 def save_corrected_plates(request):
     """Sauvegarde les textes de plaques corrigés par l'utilisateur"""
     if request.method == 'POST':
@@ -97,6 +297,7 @@ def save_corrected_plates(request):
             data = json.loads(request.body)
             corrected_plates = data.get('plates', [])
             original_image = data.get('original_image', None)  # Image originale si disponible
+            original_video = data.get('original_video', None)  # Vidéo originale si disponible
             
             # Normaliser et rechercher chaque plaque dans les véhicules
             matches = []
@@ -117,18 +318,21 @@ def save_corrected_plates(request):
 
                 if vehicle:
                     # Créer une nouvelle détection dans la base de données
-                    detection = Detection.objects.create(
-                        image=original_image if original_image else None,
-                        detected_plate=normalized,
-                        found_vehicle=vehicle,
-                        user=request.user
-                    )
+                    with span('db'):
+                        detection = Detection.objects.create(
+                            image=original_image if original_image else None,
+                            video=original_video if original_video else None,
+                            detected_plate=normalized,
+                            found_vehicle=vehicle,
+                            user=request.user
+                        )
                     
                     # Vérifier si le véhicule est volé et envoyer un email automatiquement
                     email_sent = False
                     if vehicle.is_stolen:
                         try:
-                            email_sent = send_vehicle_found_email(vehicle, detection, request.user)
+                            with span('email'):
+                                email_sent = send_vehicle_found_email(vehicle, detection, request.user)
                             if email_sent:
                                 logger.info(f"Email envoyé avec succès pour le véhicule volé {vehicle.plate}")
                             else:
@@ -163,12 +367,14 @@ def save_corrected_plates(request):
                 else:
                     # Créer une détection même si aucun véhicule n'est trouvé
                     if normalized:  # Seulement si on a une plaque valide
-                        detection = Detection.objects.create(
-                            image=original_image if original_image else None,
-                            detected_plate=normalized,
-                            found_vehicle=None,
-                            user=request.user
-                        )
+                        with span('db'):
+                            detection = Detection.objects.create(
+                                image=original_image if original_image else None,
+                                video=original_video if original_video else None,
+                                detected_plate=normalized,
+                                found_vehicle=None,
+                                user=request.user
+                            )
                         entry.update({
                             'found': False,
                             'detection_id': detection.id,
@@ -214,12 +420,16 @@ def save_corrected_plates(request):
 
 @login_required
 @permission_required('detection.add_detection', raise_exception=True)
+@instrumented_view('extract_manual_plate')
+@profiled_view('extract_manual_plate')
 def extract_manual_plate(request):
     """Extrait le texte d'une région de plaque sélectionnée manuellement en utilisant l'algorithme de détection existant"""
     if request.method == 'POST':
         try:
             import json
             import logging
+            import cv2
+            from .artifacts import artifact_url, artifact_writer
             logger = logging.getLogger(__name__)
             
             data = json.loads(request.body)
@@ -266,7 +476,8 @@ def extract_manual_plate(request):
             if not os.path.exists(full_image_path):
                 return JsonResponse({'error': f'Fichier image non trouvé: {full_image_path}'}, status=404)
             
-            image = cv2.imread(full_image_path)
+            with span('decode'):
+                image = cv2.imread(full_image_path)
             
             if image is None:
                 return JsonResponse({'error': 'Impossible de charger l\'image'}, status=404)
@@ -284,63 +495,70 @@ def extract_manual_plate(request):
             
             # Extraire la région sélectionnée
             plate_region = image[y1:y2, x1:x2]
+            if is_profiling(request):
+                request.profile_context.update({
+                    'image_size': [img_width, img_height],
+                    'region_size': [x2 - x1, y2 - y1],
+                })
             
             if plate_region.size == 0:
                 return JsonResponse({'error': f'Région vide après extraction: {y1}:{y2}, {x1}:{x2}'}, status=400)
             
-            # Créer une instance du détecteur
-            detector = CarDetector()
-            
-            # Puisque la région est déjà sélectionnée manuellement, essayer d'abord de détecter
-            # des plaques dans cette région avec le modèle entraîné
-            plates = detector.detect_plates(plate_region)
-            
+            # Utiliser le détecteur partagé du processus
+            with model_registry.detector() as detector:
+                # Puisque la région est déjà sélectionnée manuellement, essayer d'abord de détecter
+                # des plaques dans cette région avec le modèle entraîné
+                plates = detector.detect_plates(plate_region)
+
+                if plates:
+                    # Si des plaques sont détectées, prendre la première (plus grande confiance)
+                    px1, py1, px2, py2 = plates[0]['bbox']
+                    # Extraire le texte avec OCR sur la plaque détectée
+                    plate_text, confidence = detector.extract_text(plate_region[py1:py2, px1:px2])
+                else:
+                    # Sinon, OCR direct sur toute la région sélectionnée
+                    plate_text, confidence = detector.extract_text(plate_region)
+            
+            # Écriture de la région en arrière-plan, au format des artefacts
+            # Nom unique par sélection (plusieurs sélections d'une même image ne s'écrasent pas),
+            # suivi du nom complet de l'original (extension comprise)
+            manual_stem = (
+                f"manual_selection_{x1}_{y1}_{x2}_{y2}_{uuid.uuid4().hex[:8]}_"
+                f"{os.path.basename(clean_image_path)}"
+            )
+
             if plates:
-                # Si des plaques sont détectées, prendre la première (plus grande confiance)
                 best_plate = plates[0]
                 px1, py1, px2, py2 = best_plate['bbox']
                 
-                # Extraire la région de la plaque détectée pour l'OCR
-                detected_plate_region = plate_region[py1:py2, px1:px2]
-                
-                # Extraire le texte avec OCR sur la plaque détectée
-                plate_text, confidence = detector.extract_text(detected_plate_region)
-                
                 # Sauvegarder l'image de la région MANUELLE complète (pas seulement la plaque détectée)
-                fs = FileSystemStorage()
-                plate_filename = f"manual_selection_{os.path.basename(image_path)}"
-                plate_path = os.path.join(settings.MEDIA_ROOT, plate_filename)
-                cv2.imwrite(plate_path, plate_region)  # Sauvegarder toute la région sélectionnée
+                plate_filename = artifact_writer.write('manual', manual_stem, plate_region)
                 
                 return JsonResponse({
                     'success': True,
                     'plate_text': plate_text,
                     'confidence': confidence,
-                    'plate_image': fs.url(plate_filename).lstrip('/'),
+                    'plate_image': artifact_url(plate_filename),
                     'coordinates': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
                     'detected_plate_coords': {'x1': px1, 'y1': py1, 'x2': px2, 'y2': py2},
                     'detection_method': 'automatic_in_manual_region'
                 })
             else:
-                # Si aucune plaque n'est détectée automatiquement, utiliser OCR direct sur toute la région
-                # Appliquer le préprocessing et l'OCR directement
-                plate_text, confidence = detector.extract_text(plate_region)
-                
+                # Aucune plaque détectée automatiquement: OCR direct sur toute la région
                 # Sauvegarder l'image de la région sélectionnée complète
-                fs = FileSystemStorage()
-                plate_filename = f"manual_selection_{os.path.basename(image_path)}"
-                plate_path = os.path.join(settings.MEDIA_ROOT, plate_filename)
-                cv2.imwrite(plate_path, plate_region)  # Sauvegarder toute la région sélectionnée
+                plate_filename = artifact_writer.write('manual', manual_stem, plate_region)
                 
                 return JsonResponse({
                     'success': True,
                     'plate_text': plate_text,
                     'confidence': confidence,
-                    'plate_image': fs.url(plate_filename).lstrip('/'),
+                    'plate_image': artifact_url(plate_filename),
                     'coordinates': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
                     'detection_method': 'ocr_only'
                 })
             
+        except DetectorPoolTimeout as e:
+            return JsonResponse({'error': str(e)}, status=503)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
     
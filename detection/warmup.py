@@ -0,0 +1,143 @@
+"""
+Préchargement des modèles et inférence de préchauffage au démarrage du worker.
+
+La première détection après un déploiement paie le chargement des trois
+modèles et la préparation du premier graphe d'inférence. Avec
+DETECTION_PRELOAD, `DetectionConfig.ready()` lance `warm_up()` en arrière-plan:
+chaque réplique du pool charge ses modèles puis exécute une inférence sur une
+image synthétique. L'état est exposé par la vue `readiness`, que le
+répartiteur de charge interroge avant d'envoyer des téléversements au worker.
+"""
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+STATE_LAZY = 'lazy'
+STATE_LOADING = 'loading'
+STATE_READY = 'ready'
+STATE_FAILED = 'failed'
+
+
+class Readiness:
+    """État de préchauffage du processus (temps de chargement et de préchauffage par modèle)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.state = STATE_LAZY
+        self.started_at = None
+        self.finished_at = None
+        self.error = None
+        self.models = {}
+
+    def set(self, state, error=None):
+        with self._lock:
+            self.state = state
+            self.error = error
+            if state == STATE_LOADING:
+                self.started_at = time.time()
+            elif state in (STATE_READY, STATE_FAILED):
+                self.finished_at = time.time()
+
+    def record(self, replica, stage, **timings):
+        with self._lock:
+            self.models.setdefault(f"{stage}:{replica}", {'replica': replica, 'stage': stage}).update(timings)
+
+    @property
+    def is_ready(self):
+        # Sans préchargement, les modèles sont chargés à la première requête
+        return self.state in (STATE_LAZY, STATE_READY)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'ready': self.is_ready,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'error': self.error,
+                'models': sorted(self.models.values(), key=lambda m: (m['replica'], m['stage'])),
+            }
+
+
+def synthetic_frame(size=640):
+    """Image BGR synthétique (dégradé et rectangle clair) pour le préchauffage."""
+    import numpy as np
+
+    gradient = np.tile(np.linspace(0, 255, size, dtype=np.uint8), (size, 1))
+    frame = np.dstack([gradient, gradient[::-1], np.full_like(gradient, 128)])
+    frame[size // 2:size // 2 + size // 10, size // 3:2 * size // 3] = 230
+    return frame
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def warm_detector(detector, readiness):
+    """Une inférence par modèle sur des entrées synthétiques (aucun cache n'est alimenté)."""
+    frame = synthetic_frame()
+    crop = frame[frame.shape[0] // 2:frame.shape[0] // 2 + 64, frame.shape[1] // 3:2 * frame.shape[1] // 3]
+    replica = detector.replica
+
+    readiness.record(replica, 'vehicle', warmup_seconds=_timed(detector.detect_vehicles_batch, [frame]))
+    readiness.record(replica, 'plate', warmup_seconds=_timed(detector.detect_plates_batch, [frame]))
+    processed = detector.preprocess_plate_for_ocr(crop)
+    if processed is not None:
+        readiness.record(replica, 'ocr', warmup_seconds=_timed(
+            detector.ocr_model, [processed], conf=0.25, imgsz=detector.stage_imgsz['ocr'], verbose=False
+        ))
+
+
+def warm_up(registry=None, readiness=None):
+    """
+    Charge toutes les répliques du pool et les préchauffe.
+
+    Les répliques sont empruntées ensemble (une par emplacement du pool),
+    puis rendues une fois prêtes.
+    """
+    if registry is None:
+        from .model_registry import model_registry as registry
+    readiness = readiness or process_readiness
+    readiness.set(STATE_LOADING)
+
+    detectors = []
+    try:
+        for _ in range(registry.pool.stats()['size']):
+            detectors.append(registry.pool.checkout())
+        for entry in registry.stats():
+            readiness.record(entry['replica'], _stage_of(entry['path'], detectors[0]),
+                             load_seconds=entry['load_time'])
+        for detector in detectors:
+            warm_detector(detector, readiness)
+        readiness.set(STATE_READY)
+        logger.info(f"Détection préchauffée: {len(detectors)} réplique(s) prête(s)")
+    except Exception as e:
+        logger.error(f"Échec du préchauffage des modèles de détection: {e}")
+        readiness.set(STATE_FAILED, error=str(e))
+    finally:
+        for detector in detectors:
+            registry.pool.checkin(detector)
+
+
+def _stage_of(path, detector):
+    for attr, model_path in detector.model_paths().items():
+        if model_path == path:
+            return attr.replace('_model', '')
+    return path
+
+
+def start_warm_up():
+    """Lance `warm_up()` dans un thread d'arrière-plan (le démarrage n'est pas bloqué)."""
+    # Non prêt dès maintenant: le répartiteur n'envoie rien avant la fin du préchauffage
+    process_readiness.set(STATE_LOADING)
+    thread = threading.Thread(target=warm_up, name='detection-warmup', daemon=True)
+    thread.start()
+    return thread
+
+
+# État unique du processus
+process_readiness = Readiness()
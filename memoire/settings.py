@@ -150,3 +150,87 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = config('EMAIL_HOST_USER')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 DEFAULT_FROM_EMAIL = config('EMAIL_HOST_USER', default='noreply@memoire.com')
+
+# Détection (CarDetector)
+# Nombre maximal de découpes de véhicules envoyées au modèle de plaques en une inférence
+DETECTION_PLATE_BATCH_SIZE = config('DETECTION_PLATE_BATCH_SIZE', default=16, cast=int)
+# Nombre maximal de plaques envoyées au modèle OCR en une inférence
+DETECTION_OCR_BATCH_SIZE = config('DETECTION_OCR_BATCH_SIZE', default=32, cast=int)
+# Vidéo: images analysées par seconde de vidéo et taille des lots d'images
+DETECTION_VIDEO_SAMPLE_FPS = config('DETECTION_VIDEO_SAMPLE_FPS', default=2.0, cast=float)
+DETECTION_VIDEO_BATCH_FRAMES = config('DETECTION_VIDEO_BATCH_FRAMES', default=8, cast=int)
+# Vidéo: suivi des plaques et vote des lectures OCR entre images
+DETECTION_TRACK_MIN_IOU = config('DETECTION_TRACK_MIN_IOU', default=0.2, cast=float)
+DETECTION_TRACK_MAX_GAP = config('DETECTION_TRACK_MAX_GAP', default=30, cast=int)
+DETECTION_VOTE_MIN_READINGS = config('DETECTION_VOTE_MIN_READINGS', default=3, cast=int)
+DETECTION_VOTE_STABLE_RATIO = config('DETECTION_VOTE_STABLE_RATIO', default=0.7, cast=float)
+# Tâches de détection en arrière-plan (requêtes AJAX) et nombre de workers par processus
+DETECTION_ASYNC_JOBS = config('DETECTION_ASYNC_JOBS', default=True, cast=bool)
+DETECTION_JOB_WORKERS = config('DETECTION_JOB_WORKERS', default=2, cast=int)
+# Tâches en attente ou en cours au-delà desquelles detect_home répond 503, et délai (s)
+# sans progression après lequel une tâche est marquée échouée
+DETECTION_JOB_QUEUE_SIZE = config('DETECTION_JOB_QUEUE_SIZE', default=16, cast=int)
+DETECTION_JOB_TIMEOUT = config('DETECTION_JOB_TIMEOUT', default=600, cast=int)
+# Moteur d'inférence des modèles YOLO: 'pytorch', 'onnx' ou 'openvino'
+# (exporter au préalable avec: python manage.py export_detection_models --backend onnx)
+DETECTION_INFERENCE_BACKEND = config('DETECTION_INFERENCE_BACKEND', default='pytorch')
+# Modèles exécutés en INT8 ('vehicle', 'plate', 'ocr'), seulement s'ils ont passé le garde-fou
+# (python manage.py quantize_detection_models --images <dossier>)
+DETECTION_QUANTIZED_MODELS = config('DETECTION_QUANTIZED_MODELS', default='', cast=lambda v: [m for m in v.split(',') if m])
+DETECTION_QUANTIZATION_MAX_ACCURACY_DROP = config('DETECTION_QUANTIZATION_MAX_ACCURACY_DROP', default=0.02, cast=float)
+# Taille d'entrée par étape: entier (carré) ou "HxW" (rectangulaire, ex: "96x320" pour l'OCR)
+# (mesurer avec: python manage.py sweep_inference_size --images <dossier> --stage ocr)
+DETECTION_STAGE_IMGSZ = {
+    'vehicle': config('DETECTION_VEHICLE_IMGSZ', default='640'),
+    'plate': config('DETECTION_PLATE_IMGSZ', default='640'),
+    'ocr': config('DETECTION_OCR_IMGSZ', default='640'),
+}
+# Tuiles pour le modèle véhicule au-delà de DETECTION_TILING_MIN_SIDE pixels (0 = jamais)
+DETECTION_TILING_MIN_SIDE = config('DETECTION_TILING_MIN_SIDE', default=2500, cast=int)
+DETECTION_TILE_SIZE = config('DETECTION_TILE_SIZE', default=1280, cast=int)
+DETECTION_TILE_OVERLAP = config('DETECTION_TILE_OVERLAP', default=0.2, cast=float)
+# Cache des résultats par contenu de fichier (nombre d'entrées LRU par processus, 0 = désactivé)
+DETECTION_RESULT_CACHE_SIZE = config('DETECTION_RESULT_CACHE_SIZE', default=256, cast=int)
+# Cache OCR par empreinte perceptuelle des plaques (entrées par processus, 0 = désactivé)
+DETECTION_OCR_CACHE_SIZE = config('DETECTION_OCR_CACHE_SIZE', default=512, cast=int)
+# Distance de Hamming maximale (sur 256 bits) pour réutiliser une lecture
+DETECTION_OCR_CACHE_MAX_DISTANCE = config('DETECTION_OCR_CACHE_MAX_DISTANCE', default=4, cast=int)
+# Détection des plaques: 'vehicle' (véhicules puis plaques), 'direct' (plaques sur l'image entière,
+# caméras fixes) ou 'auto' (direct pour les gros plans, où une plaque dépasse ce ratio de la largeur).
+# 'auto' ajoute une passe plaques sur l'image entière aux scènes à plusieurs véhicules: à réserver
+# aux points de contrôle qui photographient surtout des gros plans.
+DETECTION_PLATE_MODE = config('DETECTION_PLATE_MODE', default='vehicle')
+DETECTION_DIRECT_MIN_PLATE_RATIO = config('DETECTION_DIRECT_MIN_PLATE_RATIO', default=0.15, cast=float)
+# Artefacts (découpes de plaques, images annotées): format 'jpg', 'webp' ou 'png' et qualité
+DETECTION_ARTIFACT_FORMAT = config('DETECTION_ARTIFACT_FORMAT', default='jpg')
+DETECTION_JPEG_QUALITY = config('DETECTION_JPEG_QUALITY', default=90, cast=int)
+DETECTION_WEBP_QUALITY = config('DETECTION_WEBP_QUALITY', default=85, cast=int)
+# Écriture des artefacts en arrière-plan: workers par processus et attente maximale (s) avant de servir
+DETECTION_ARTIFACT_WORKERS = config('DETECTION_ARTIFACT_WORKERS', default=2, cast=int)
+DETECTION_ARTIFACT_WAIT_TIMEOUT = config('DETECTION_ARTIFACT_WAIT_TIMEOUT', default=30, cast=float)
+# Pipeline des étapes (vidéo): véhicule, plaques, prétraitement et OCR en parallèle sur des files bornées
+DETECTION_PIPELINE = config('DETECTION_PIPELINE', default=True, cast=bool)
+DETECTION_PIPELINE_QUEUE_SIZE = config('DETECTION_PIPELINE_QUEUE_SIZE', default=2, cast=int)
+DETECTION_PREPROCESS_WORKERS = config('DETECTION_PREPROCESS_WORKERS', default=2, cast=int)
+# Pool de répliques du détecteur par processus (une réplique = ses propres modèles en mémoire)
+# et attente maximale (s) d'une réplique libre avant de répondre 503
+DETECTION_POOL_SIZE = config('DETECTION_POOL_SIZE', default=1, cast=int)
+DETECTION_POOL_TIMEOUT = config('DETECTION_POOL_TIMEOUT', default=60, cast=float)
+# Préchargement et préchauffage des modèles au démarrage du worker (sonde: /detection/ready/)
+DETECTION_PRELOAD = config('DETECTION_PRELOAD', default=False, cast=bool)
+# Budgets de check_detection_regression face au rapport de référence
+# (baisse du taux de plaques exactes, hausse du CER, baisse de la précision des
+# lectures, hausse relative du p95 de latence)
+DETECTION_REGRESSION_MAX_ACCURACY_DROP = config('DETECTION_REGRESSION_MAX_ACCURACY_DROP', default=0.01, cast=float)
+DETECTION_REGRESSION_MAX_CER_INCREASE = config('DETECTION_REGRESSION_MAX_CER_INCREASE', default=0.01, cast=float)
+DETECTION_REGRESSION_MAX_PRECISION_DROP = config('DETECTION_REGRESSION_MAX_PRECISION_DROP', default=0.01, cast=float)
+DETECTION_REGRESSION_MAX_LATENCY_INCREASE = config('DETECTION_REGRESSION_MAX_LATENCY_INCREASE', default=0.2, cast=float)
+# Métriques Prometheus (/detection/metrics/): désactivées, les mesures ne coûtent qu'un test par étape;
+# jeton Bearer du collecteur (vide: endpoint réservé au personnel connecté)
+DETECTION_METRICS = config('DETECTION_METRICS', default=False, cast=bool)
+DETECTION_METRICS_TOKEN = config('DETECTION_METRICS_TOKEN', default='')
+# Profilage à la demande par le personnel (?profile=1 ou en-tête X-Detection-Profile),
+# profils conservés hors MEDIA_ROOT (liste: /detection/profiles/)
+DETECTION_PROFILING = config('DETECTION_PROFILING', default=True, cast=bool)
+DETECTION_PROFILE_DIR = config('DETECTION_PROFILE_DIR', default=os.path.join(BASE_DIR, 'profiles'))
+DETECTION_PROFILE_KEEP = config('DETECTION_PROFILE_KEEP', default=50, cast=int)
@@ -23,7 +23,8 @@ const API_ENDPOINTS = {
 const CONFIG = {
     minSelectionSize: 10,
     alertDuration: 5000,
-    previewMaxHeight: 300
+    previewMaxHeight: 300,
+    jobPollInterval: 1000
 };
 
 // ===== FONCTIONS UTILITAIRES =====
@@ -172,6 +173,16 @@ document.addEventListener('DOMContentLoaded', function() {
             e.stopPropagation();
             savePlatesOnly();
         }
+
+        // Image annotée: demandée au serveur (rendu à la demande) au premier clic seulement
+        const showBtn = e.target && e.target.closest ? e.target.closest('.show-processed-image') : null;
+        if (showBtn) {
+            e.preventDefault();
+            const img = showBtn.parentElement.querySelector('.processed-image');
+            img.src = showBtn.dataset.src;
+            img.classList.remove('d-none');
+            showBtn.remove();
+        }
     });
     
     const dropArea = document.getElementById('dropArea');
@@ -215,11 +226,13 @@ document.addEventListener('DOMContentLoaded', function() {
         
         if (file.type.startsWith('image/')) {
             displayPreview(file);
+        } else if (file.type.startsWith('video/')) {
+            displayVideoPreview(file);
         } else {
             if (window.showError) {
-                window.showError('Veuillez sélectionner une image (JPG, JPEG, PNG)');
+                window.showError('Veuillez sélectionner une image (JPG, JPEG, PNG) ou une vidéo (MP4, AVI)');
             } else {
-                alert('Veuillez sélectionner une image (JPG, JPEG, PNG)');
+                alert('Veuillez sélectionner une image (JPG, JPEG, PNG) ou une vidéo (MP4, AVI)');
             }
             mediaInput.value = '';
         }
@@ -234,6 +247,12 @@ document.addEventListener('DOMContentLoaded', function() {
         reader.readAsDataURL(file);
     }
 
+    function displayVideoPreview(file) {
+        const url = URL.createObjectURL(file);
+        preview.innerHTML = `<video src="${url}" controls class="img-fluid rounded shadow-sm" style="max-height: 300px;"></video>`;
+        resultsSection.style.display = 'none';
+    }
+
     // Soumission du formulaire
     uploadForm.addEventListener('submit', function(e) {
         e.preventDefault();
@@ -263,6 +282,13 @@ document.addEventListener('DOMContentLoaded', function() {
             }
         })
         .then(response => response.json())
+        .then(data => {
+            // Détection en arrière-plan: interroger l'état de la tâche
+            if (data.job_id && data.status_url) {
+                return pollDetectionJob(data.status_url, submitBtn);
+            }
+            return data;
+        })
         .then(data => {
             if (data.success) {
                 displayResults(data);
@@ -282,6 +308,26 @@ document.addEventListener('DOMContentLoaded', function() {
             submitBtn.innerHTML = originalText;
         });
     });
+
+    // Interroge l'état d'une tâche de détection jusqu'à sa fin
+    function pollDetectionJob(statusUrl, submitBtn) {
+        return new Promise((resolve, reject) => {
+            const poll = () => {
+                fetch(statusUrl, { headers: { 'X-Requested-With': 'XMLHttpRequest' } })
+                    .then(response => response.json())
+                    .then(data => {
+                        if (data.status === 'DONE' || data.status === 'FAILED' || data.error) {
+                            resolve(data);
+                            return;
+                        }
+                        submitBtn.innerHTML = `<span class="spinner-border spinner-border-sm me-2"></span>Analyse en cours... ${data.progress || 0}%`;
+                        setTimeout(poll, CONFIG.jobPollInterval);
+                    })
+                    .catch(reject);
+            };
+            poll();
+        });
+    }
     
     // Fonction d'affichage des résultats
     function displayResults(data) {
@@ -300,7 +346,21 @@ document.addEventListener('DOMContentLoaded', function() {
                     </div>
                     <div class="col-md-6 mb-3">
                         <h6>Détections (${data.vehicles_detected} véhicule(s))</h6>
-                        <img src="/${data.processed_image}" class="img-fluid rounded shadow">
+                        <!-- Image annotée rendue par le serveur seulement à la demande -->
+                        <button type="button" class="btn btn-outline-primary btn-sm show-processed-image"
+                                data-src="/${data.processed_image}">
+                            <i class="fas fa-eye me-1"></i>Afficher l'image annotée
+                        </button>
+                        <img class="img-fluid rounded shadow d-none processed-image">
+                    </div>
+                </div>
+            `;
+        } else if (data.original_video) {
+            resultsDiv.innerHTML += `
+                <div class="row mb-4">
+                    <div class="col-md-12 mb-3 text-center">
+                        <h6>Vidéo analysée (${data.frames_processed} image(s) en ${data.processing_time}s)</h6>
+                        <video src="/${data.original_video}" controls class="img-fluid rounded shadow" style="max-height: 400px;"></video>
                     </div>
                 </div>
             `;
@@ -590,15 +650,20 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
         
-        // Récupérer l'image originale depuis les données de la dernière détection
+        // Récupérer l'image (ou la vidéo) originale depuis les données de la dernière détection
         let originalImage = null;
+        let originalVideo = null;
         if (window.lastDetectionData && window.lastDetectionData.original_image) {
             originalImage = window.lastDetectionData.original_image;
         }
+        if (window.lastDetectionData && window.lastDetectionData.original_video) {
+            originalVideo = window.lastDetectionData.original_video;
+        }
         
         const dataToSend = {
             plates: plates,
-            original_image: originalImage
+            original_image: originalImage,
+            original_video: originalVideo
         };
         
         // Envoi de la requête